@@ -0,0 +1,55 @@
+<?php
+
+namespace App\Console\Commands;
+
+use Illuminate\Console\Command;
+
+class PythonWorker extends Command
+{
+    /**
+     * The name and signature of the console command.
+     *
+     * @var string
+     */
+    protected $signature = 'python:worker
+                            {--workers= : Number of worker processes (defaults to services.python.worker_processes)}
+                            {--socket= : Unix socket path (defaults to services.python.worker_socket)}';
+
+    /**
+     * The console command description.
+     *
+     * @var string
+     */
+    protected $description = 'Run the persistent Python worker used when PYTHON_BRIDGE_MODE=worker';
+
+    /**
+     * Execute the console command.
+     */
+    public function handle(): int
+    {
+        $pythonPath = base_path('python/venv/bin/python');
+
+        if (! file_exists($pythonPath)) {
+            $this->error("Python virtual environment not found at: {$pythonPath}");
+
+            return self::FAILURE;
+        }
+
+        $workers = (int) ($this->option('workers') ?? config('services.python.worker_processes', 2));
+        $socket = $this->option('socket') ?? config('services.python.worker_socket');
+
+        $this->info("Starting Python worker on {$socket} with {$workers} processes...");
+
+        $command = sprintf(
+            '%s %s serve --socket %s --workers %d',
+            escapeshellarg($pythonPath),
+            escapeshellarg(base_path('python/worker.py')),
+            escapeshellarg($socket),
+            $workers
+        );
+
+        passthru($command, $exitCode);
+
+        return $exitCode === 0 ? self::SUCCESS : self::FAILURE;
+    }
+}
@@ -106,10 +106,10 @@ public function handle(): int
         $this->newLine();
 
         // Export data
-        $this->info('Step 1: Exporting stock data to CSV...');
+        $this->info('Step 1: Exporting stock data ...');
         try {
-            $csvPath = $this->pythonBridge->exportStockData($stock, $startDate, $endDate);
-            $this->info("✓ Data exported: {$csvPath}");
+            $dataPath = $this->pythonBridge->exportStockData($stock, $startDate, $endDate);
+            $this->info("✓ Data exported: {$dataPath}");
         } catch (Exception $e) {
             $this->error("Failed to export data: {$e->getMessage()}");
 
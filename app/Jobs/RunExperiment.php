@@ -36,53 +36,53 @@ public function handle(PythonBridgeService $pythonBridge): void
 
             $allResults = [];
 
-            foreach ($stockIds as $stockId) {
-                try {
-                    $stock = Stock::findOrFail($stockId);
-
-                    Log::info("Running backtest for {$stock->symbol} in experiment #{$this->experiment->id}");
-
-                    // Step 1: Train the model for this stock
-                    $trainingResult = $pythonBridge->trainModel($stock);
-
-                    if (! $trainingResult['success']) {
-                        Log::error("Training failed for {$stock->symbol}: {$trainingResult['message']}");
-
-                        continue;
-                    }
-
-                    // Step 2: Run backtest
-                    $backtestResult = $pythonBridge->runBacktest($stock, (float) $this->experiment->initial_capital);
-
-                    if (! $backtestResult['success']) {
-                        Log::error("Backtest failed for {$stock->symbol}: {$backtestResult['message']}");
+            $stocks = Stock::whereIn('id', $stockIds)->get();
+            $config = $this->modelConfig($pythonBridge);
+
+            Log::info("Running {$stocks->count()} stocks in experiment #{$this->experiment->id}");
+
+            // Train and backtest all stocks in one Python process pool;
+            // results arrive as each stock finishes
+            $summary = $pythonBridge->runExperiment(
+                $stocks,
+                $config,
+                (float) $this->experiment->initial_capital,
+                $this->experiment->start_date,
+                $this->experiment->end_date,
+                function (Stock $stock, array $result) use (&$allResults, &$completedStocks, $stockCount) {
+                    $completedStocks++;
 
-                        continue;
+                    try {
+                        $trainingResult = $result['training'] ?? [];
+                        $backtestResult = $result['backtest'] ?? [];
+
+                        if (! ($trainingResult['success'] ?? false)) {
+                            Log::error("Training failed for {$stock->symbol}: ".($trainingResult['message'] ?? $trainingResult['error'] ?? 'Unknown error'));
+                        } elseif (! ($backtestResult['success'] ?? false)) {
+                            Log::error("Backtest failed for {$stock->symbol}: ".($backtestResult['message'] ?? 'Unknown error'));
+                        } else {
+                            // Store backtest results
+                            $this->storeBacktestResults($stock, $trainingResult, $backtestResult);
+
+                            $allResults[] = $backtestResult;
+                        }
+                    } catch (Exception $e) {
+                        // One stock's bad result must not abort the rest of the stream
+                        Log::error("Error processing stock {$stock->symbol}: {$e->getMessage()}");
                     }
 
-                    // Step 3: Store backtest results
-                    $this->storeBacktestResults($stock, $trainingResult, $backtestResult);
-
-                    $allResults[] = $backtestResult;
-
-                    $completedStocks++;
-
                     // Update progress
                     $progress = (int) (($completedStocks / $stockCount) * 100);
                     $this->experiment->updateProgress($progress);
-                } catch (Exception $e) {
-                    Log::error("Error processing stock #{$stockId}: {$e->getMessage()}");
-
-                    continue;
                 }
-            }
+            );
 
             if (empty($allResults)) {
                 throw new Exception('No stocks were successfully backtested');
             }
 
             // Calculate and store overall results
-            $overallResults = $this->calculateOverallResults($allResults);
+            $overallResults = $this->calculateOverallResults($allResults, $summary['portfolio'] ?? null);
             $this->experiment->markAsCompleted($overallResults);
 
             Log::info("Experiment #{$this->experiment->id} completed successfully");
@@ -92,6 +92,29 @@ public function handle(PythonBridgeService $pythonBridge): void
         }
     }
 
+    /**
+     * Configuration passed to training (the bridge's default when none is set)
+     *
+     * Empty hyperparameters or features fall back to the default
+     * configuration's: an empty PHP array would reach Python as a JSON list.
+     */
+    protected function modelConfig(PythonBridgeService $pythonBridge): array
+    {
+        $configuration = $this->experiment->configuration;
+
+        if ($configuration === null) {
+            return [];
+        }
+
+        $defaults = $pythonBridge->defaultModelConfig();
+
+        return [
+            'name' => $configuration->name,
+            'hyperparameters' => $configuration->hyperparameters ?: $defaults['hyperparameters'],
+            'features_enabled' => $configuration->features_enabled ?: $defaults['features_enabled'],
+        ];
+    }
+
     /**
      * Store backtest results in database
      */
@@ -105,8 +128,9 @@ protected function storeBacktestResults(Stock $stock, array $trainingResult, arr
             'experiment_id' => $this->experiment->id,
             'stock_id' => $stock->id,
             'model_configuration_id' => $this->experiment->model_configuration_id,
-            'start_date' => $this->experiment->start_date,
-            'end_date' => $this->experiment->end_date,
+            // The backtest covers the model's test period, not the whole experiment window
+            'start_date' => $backtestResult['data_summary']['start_date'] ?? $this->experiment->start_date,
+            'end_date' => $backtestResult['data_summary']['end_date'] ?? $this->experiment->end_date,
             'initial_capital' => $tradingMetrics['initial_capital'] ?? $this->experiment->initial_capital,
             'final_capital' => $tradingMetrics['final_capital'] ?? $this->experiment->initial_capital,
             'total_trades' => $tradingMetrics['total_trades'] ?? 0,
@@ -129,8 +153,11 @@ protected function storeBacktestResults(Stock $stock, array $trainingResult, arr
 
     /**
      * Calculate overall results from all stock results
+     *
+     * $portfolio is the shared-capital backtest of all stocks together
+     * (python/portfolio_backtest.py), when the experiment produced one.
      */
-    protected function calculateOverallResults(array $allResults): array
+    protected function calculateOverallResults(array $allResults, ?array $portfolio = null): array
     {
         $totalTrades = 0;
         $totalWinningTrades = 0;
@@ -163,7 +190,7 @@ protected function calculateOverallResults(array $allResults): array
         $avgAccuracy = count($accuracies) > 0 ? array_sum($accuracies) / count($accuracies) : 0;
         $winRate = $totalTrades > 0 ? ($totalWinningTrades / $totalTrades) * 100 : 0;
 
-        return [
+        $results = [
             'overall' => [
                 'total_trades' => $totalTrades,
                 'winning_trades' => $totalWinningTrades,
@@ -183,9 +210,51 @@ protected function calculateOverallResults(array $allResults): array
                     'trades' => $result['trading_metrics']['total_trades'] ?? 0,
                     'win_rate' => $result['trading_metrics']['win_rate'] ?? 0,
                     'accuracy' => isset($predictionMetrics['accuracy']) ? round($predictionMetrics['accuracy'] * 100, 2) : 0,
+                    'confidence_intervals' => $this->confidenceIntervals($result['robustness'] ?? null),
                 ];
             }, $allResults),
         ];
+
+        if ($portfolio['success'] ?? false) {
+            $results['portfolio'] = [
+                'allocation' => $portfolio['allocation'] ?? null,
+                'initial_capital' => $portfolio['initial_capital'] ?? null,
+                'final_capital' => round($portfolio['final_capital'] ?? 0, 2),
+                'total_return' => round($portfolio['total_return_pct'] ?? 0, 2),
+                'sharpe_ratio' => round($portfolio['sharpe_ratio'] ?? 0, 2),
+                'max_drawdown' => round($portfolio['max_drawdown'] ?? 0, 2),
+                'total_trades' => $portfolio['total_trades'] ?? 0,
+                'win_rate' => round($portfolio['win_rate'] ?? 0, 2),
+                'avg_positions_per_day' => round($portfolio['avg_positions_per_day'] ?? 0, 2),
+                'avg_exposure' => round($portfolio['avg_exposure_pct'] ?? 0, 2),
+            ];
+        } elseif ($portfolio !== null) {
+            Log::warning("Portfolio backtest failed for experiment #{$this->experiment->id}: ".($portfolio['message'] ?? 'Unknown error'));
+        }
+
+        return $results;
+    }
+
+    /**
+     * Bootstrap intervals of a stock's key metrics (python/robustness.py)
+     */
+    protected function confidenceIntervals(?array $robustness): ?array
+    {
+        if (! isset($robustness['bootstrap'])) {
+            return null;
+        }
+
+        $intervals = ['confidence' => $robustness['confidence'] ?? null];
+        foreach (['sharpe_ratio', 'max_drawdown', 'win_rate', 'total_profit_loss'] as $metric) {
+            if (isset($robustness['bootstrap'][$metric])) {
+                $intervals[$metric] = [
+                    round($robustness['bootstrap'][$metric]['lower'], 2),
+                    round($robustness['bootstrap'][$metric]['upper'], 2),
+                ];
+            }
+        }
+
+        return $intervals;
     }
 
     /**
@@ -6,9 +6,33 @@
 use Carbon\Carbon;
 use Exception;
 use Illuminate\Support\Facades\Log;
+use Illuminate\Support\LazyCollection;
 
 class PythonBridgeService
 {
+    /**
+     * Rows fetched per database query and buffered per file write when exporting
+     */
+    protected const EXPORT_CHUNK_SIZE = 1000;
+
+    /**
+     * Columnar export files (see python/price_store.py): column => file extension
+     */
+    protected const COLUMNAR_COLUMNS = [
+        'date' => 'i8',
+        'open' => 'f8',
+        'high' => 'f8',
+        'low' => 'f8',
+        'close' => 'f8',
+        'volume' => 'f8',
+        'adjusted_close' => 'f8',
+    ];
+
+    /**
+     * Columnar layout version (int64 epoch nanosecond dates, float64 volume)
+     */
+    protected const COLUMNAR_VERSION = 2;
+
     protected string $pythonPath;
 
     protected string $scriptsPath;
@@ -69,7 +93,18 @@ protected function extractJsonFromOutput(string $output): ?array
     }
 
     /**
-     * Export stock data to CSV for Python processing
+     * Export stock data for Python processing
+     *
+     * Writes the columnar binary price store (python/data/{SYMBOL}.ohlcv)
+     * by default, or a CSV file when services.python.export_format is 'csv'.
+     *
+     * Exports are incremental: a per-symbol watermark records the exported
+     * range plus a row count and checksum of that history. When the
+     * database still matches the watermark only rows after its last date
+     * are appended; otherwise (history edited, format changed, earlier
+     * start or end date requested) the export is rewritten.
+     * An export's start date only moves earlier, so appended exports keep
+     * their older history.
      */
     public function exportStockData(Stock $stock, ?Carbon $startDate = null, ?Carbon $endDate = null): string
     {
@@ -83,28 +118,166 @@ public function exportStockData(Stock $stock, ?Carbon $startDate = null, ?Carbon
             'end_date' => $endDate->format('Y-m-d'),
         ]);
 
-        // Fetch price data
-        $prices = $stock->prices()
-            ->whereBetween('date', [$startDate, $endDate])
+        // Ensure directory exists
+        $directory = base_path('python/data');
+        if (! is_dir($directory)) {
+            mkdir($directory, 0755, true);
+        }
+
+        $format = config('services.python.export_format', 'columnar') === 'csv' ? 'csv' : 'columnar';
+        $path = $format === 'csv'
+            ? "{$directory}/{$stock->symbol}.csv"
+            : "{$directory}/{$stock->symbol}.ohlcv";
+        $watermarkPath = "{$directory}/{$stock->symbol}.watermark.json";
+
+        $watermark = $this->readValidWatermark($stock, $watermarkPath, $format, $path, $startDate, $endDate);
+
+        if ($watermark !== null) {
+            // History unchanged: append rows after the watermark only
+            $exportStart = Carbon::parse($watermark['start_date']);
+            $newPrices = $this->priceCursor($stock, Carbon::parse($watermark['last_date'])->addDay(), $endDate);
+
+            $written = $format === 'csv'
+                ? $this->appendCsvExport($path, $newPrices)
+                : $this->appendColumnarExport($path, $newPrices);
+
+            Log::info("Appended {$written['rows']} new records to {$path}");
+
+            if ($written['rows'] === 0) {
+                return $path;
+            }
+        } else {
+            $exportStart = $startDate;
+            $prices = $this->priceCursor($stock, $startDate, $endDate);
+
+            $written = $format === 'csv'
+                ? $this->writeCsvExport($path, $prices)
+                : $this->writeColumnarExport($path, $prices);
+
+            if ($written['rows'] === 0) {
+                throw new Exception("No price data found for {$stock->symbol} in the specified date range");
+            }
+
+            Log::info("Exported {$written['rows']} records to {$path}");
+        }
+
+        $this->writeWatermark($stock, $watermarkPath, $format, $exportStart, Carbon::parse($written['last_date']));
+
+        return $path;
+    }
+
+    /**
+     * Stream a stock's prices in date order using chunked queries
+     */
+    protected function priceCursor(Stock $stock, Carbon $startDate, Carbon $endDate): LazyCollection
+    {
+        return $stock->prices()
+            ->whereBetween('date', [$startDate->copy()->startOfDay(), $endDate])
             ->orderBy('date')
-            ->get();
+            ->lazy(self::EXPORT_CHUNK_SIZE);
+    }
 
-        if ($prices->isEmpty()) {
-            throw new Exception("No price data found for {$stock->symbol} in the specified date range");
+    /**
+     * Row count and checksum of a stock's prices between two dates (inclusive)
+     *
+     * Computed with a single aggregate query so validating a watermark never
+     * reads the rows themselves.
+     */
+    protected function historyFingerprint(Stock $stock, Carbon $startDate, Carbon $endDate): array
+    {
+        $aggregate = $stock->prices()
+            ->whereBetween('date', [$startDate->copy()->startOfDay(), $endDate->copy()->endOfDay()])
+            ->selectRaw('COUNT(*) as row_count')
+            ->selectRaw('SUM(open + high + low + close + COALESCE(adjusted_close, close)) as price_sum')
+            ->selectRaw('SUM(volume) as volume_sum')
+            ->selectRaw('MAX(updated_at) as last_updated')
+            ->toBase()
+            ->first();
+
+        return [
+            'rows' => (int) $aggregate->row_count,
+            'checksum' => md5(json_encode([
+                (int) $aggregate->row_count,
+                round((float) $aggregate->price_sum, 4),
+                (int) $aggregate->volume_sum,
+                (string) $aggregate->last_updated,
+            ])),
+        ];
+    }
+
+    /**
+     * Load the watermark if the existing export can be extended in place
+     */
+    protected function readValidWatermark(Stock $stock, string $watermarkPath, string $format, string $path, Carbon $startDate, Carbon $endDate): ?array
+    {
+        if (! file_exists($watermarkPath) || ! file_exists($path)) {
+            return null;
         }
 
-        // Prepare CSV file path
-        $csvFilename = "{$stock->symbol}.csv";
-        $csvPath = base_path("python/data/{$csvFilename}");
+        $watermark = json_decode(file_get_contents($watermarkPath), true);
 
-        // Ensure directory exists
-        $directory = dirname($csvPath);
-        if (! is_dir($directory)) {
-            mkdir($directory, 0755, true);
+        if (! is_array($watermark) || ($watermark['format'] ?? null) !== $format) {
+            return null;
+        }
+
+        if ($format === 'columnar' && $this->columnarVersion($path) !== self::COLUMNAR_VERSION) {
+            Log::info("Rewriting export for {$stock->symbol}: older columnar layout");
+
+            return null;
+        }
+
+        if ($startDate->copy()->startOfDay()->lt(Carbon::parse($watermark['start_date']))) {
+            Log::info("Rewriting export for {$stock->symbol}: earlier start date requested");
+
+            return null;
+        }
+
+        if ($endDate->copy()->startOfDay()->lt(Carbon::parse($watermark['last_date']))) {
+            Log::info("Rewriting export for {$stock->symbol}: earlier end date requested");
+
+            return null;
         }
 
-        // Open file for writing
-        $handle = fopen($csvPath, 'w');
+        $fingerprint = $this->historyFingerprint(
+            $stock,
+            Carbon::parse($watermark['start_date']),
+            Carbon::parse($watermark['last_date'])
+        );
+
+        if ($fingerprint['rows'] !== $watermark['rows'] || $fingerprint['checksum'] !== $watermark['checksum']) {
+            Log::info("Rewriting export for {$stock->symbol}: exported history changed");
+
+            return null;
+        }
+
+        return $watermark;
+    }
+
+    /**
+     * Record the exported range and its fingerprint
+     */
+    protected function writeWatermark(Stock $stock, string $watermarkPath, string $format, Carbon $startDate, Carbon $lastDate): void
+    {
+        $fingerprint = $this->historyFingerprint($stock, $startDate, $lastDate);
+
+        $this->writeFileAtomically($watermarkPath, json_encode([
+            'symbol' => $stock->symbol,
+            'format' => $format,
+            'start_date' => $startDate->format('Y-m-d'),
+            'last_date' => $lastDate->format('Y-m-d'),
+            'rows' => $fingerprint['rows'],
+            'checksum' => $fingerprint['checksum'],
+            'exported_at' => Carbon::now()->toIso8601String(),
+        ], JSON_PRETTY_PRINT));
+    }
+
+    /**
+     * Write price rows as python/data/{SYMBOL}.csv
+     */
+    protected function writeCsvExport(string $csvPath, iterable $prices): array
+    {
+        $tmpPath = "{$csvPath}.tmp";
+        $handle = fopen($tmpPath, 'w');
 
         if (! $handle) {
             throw new Exception("Failed to create CSV file: {$csvPath}");
@@ -113,7 +286,40 @@ public function exportStockData(Stock $stock, ?Carbon $startDate = null, ?Carbon
         // Write header
         fputcsv($handle, ['date', 'open', 'high', 'low', 'close', 'volume', 'adjusted_close']);
 
-        // Write data rows
+        $written = $this->writeCsvRows($handle, $prices);
+
+        fclose($handle);
+        rename($tmpPath, $csvPath);
+
+        return $written;
+    }
+
+    /**
+     * Append price rows to an existing CSV export
+     */
+    protected function appendCsvExport(string $csvPath, iterable $prices): array
+    {
+        $handle = fopen($csvPath, 'a');
+
+        if (! $handle) {
+            throw new Exception("Failed to open CSV file: {$csvPath}");
+        }
+
+        $written = $this->writeCsvRows($handle, $prices);
+
+        fclose($handle);
+
+        return $written;
+    }
+
+    /**
+     * Write data rows to an open CSV handle
+     */
+    protected function writeCsvRows($handle, iterable $prices): array
+    {
+        $rows = 0;
+        $lastDate = null;
+
         foreach ($prices as $price) {
             fputcsv($handle, [
                 $price->date,
@@ -124,13 +330,206 @@ public function exportStockData(Stock $stock, ?Carbon $startDate = null, ?Carbon
                 $price->volume,
                 $price->adjusted_close ?? $price->close,
             ]);
+            $rows++;
+            $lastDate = $price->date;
         }
 
-        fclose($handle);
+        return ['rows' => $rows, 'last_date' => $lastDate];
+    }
+
+    /**
+     * Write price rows in the columnar layout read by python/price_store.py
+     *
+     * One little-endian array file per column (int64 epoch nanoseconds for
+     * dates, float64 volume and prices) plus meta.json, which is written last.
+     * Unknown volumes are stored as NaN.
+     */
+    protected function writeColumnarExport(string $storePath, iterable $prices): array
+    {
+        if (! is_dir($storePath)) {
+            mkdir($storePath, 0755, true);
+        }
+
+        $handles = [];
+        foreach (self::COLUMNAR_COLUMNS as $name => $extension) {
+            $handles[$name] = fopen("{$storePath}/{$name}.{$extension}.tmp", 'wb');
+        }
+
+        $written = $this->writeColumnarRows($handles, $prices);
+
+        foreach (self::COLUMNAR_COLUMNS as $name => $extension) {
+            fclose($handles[$name]);
+            rename("{$storePath}/{$name}.{$extension}.tmp", "{$storePath}/{$name}.{$extension}");
+        }
+
+        // meta.json last: readers treat its row count as authoritative
+        $this->writeColumnarMeta($storePath, $written['rows']);
+
+        return $written;
+    }
+
+    /**
+     * Append price rows to an existing columnar export
+     *
+     * Column files are first cut back to the committed row count (dropping
+     * anything left by an interrupted append), then extended; meta.json is
+     * rewritten last so readers never see a partially appended row.
+     */
+    protected function appendColumnarExport(string $storePath, iterable $prices): array
+    {
+        $meta = json_decode(file_get_contents("{$storePath}/meta.json"), true);
+        $committedRows = (int) $meta['rows'];
+
+        $handles = [];
+        foreach (self::COLUMNAR_COLUMNS as $name => $extension) {
+            $handles[$name] = fopen("{$storePath}/{$name}.{$extension}", 'c+b');
+            ftruncate($handles[$name], $committedRows * 8);
+            fseek($handles[$name], 0, SEEK_END);
+        }
+
+        $written = $this->writeColumnarRows($handles, $prices);
+
+        foreach ($handles as $handle) {
+            fclose($handle);
+        }
+
+        if ($written['rows'] > 0) {
+            $this->writeColumnarMeta($storePath, $committedRows + $written['rows']);
+        }
+
+        return $written;
+    }
+
+    /**
+     * Pack rows into the open column files, one chunk at a time
+     */
+    protected function writeColumnarRows(array $handles, iterable $prices): array
+    {
+        $rows = 0;
+        $lastDate = null;
+        $buffer = array_fill_keys(array_keys(self::COLUMNAR_COLUMNS), []);
+
+        foreach ($prices as $price) {
+            $timestamp = Carbon::parse($price->date, 'UTC');
+            $date = $timestamp->format('Y-m-d');
+            $buffer['date'][] = $timestamp->getTimestamp() * 1_000_000_000 + $timestamp->micro * 1000;
+            $buffer['open'][] = (float) $price->open;
+            $buffer['high'][] = (float) $price->high;
+            $buffer['low'][] = (float) $price->low;
+            $buffer['close'][] = (float) $price->close;
+            $buffer['volume'][] = $price->volume === null ? NAN : (float) $price->volume;
+            $buffer['adjusted_close'][] = (float) ($price->adjusted_close ?? $price->close);
+            $rows++;
+            $lastDate = $date;
+
+            if (count($buffer['date']) >= self::EXPORT_CHUNK_SIZE) {
+                $buffer = $this->flushColumnarBuffer($handles, $buffer);
+            }
+        }
+
+        $this->flushColumnarBuffer($handles, $buffer);
+
+        return ['rows' => $rows, 'last_date' => $lastDate];
+    }
+
+    /**
+     * Write buffered column values and return an empty buffer
+     */
+    protected function flushColumnarBuffer(array $handles, array $buffer): array
+    {
+        foreach (self::COLUMNAR_COLUMNS as $name => $extension) {
+            if (count($buffer[$name]) > 0) {
+                fwrite($handles[$name], pack($extension === 'i8' ? 'P*' : 'e*', ...$buffer[$name]));
+            }
+        }
+
+        return array_fill_keys(array_keys(self::COLUMNAR_COLUMNS), []);
+    }
+
+    /**
+     * Publish a columnar export's meta.json
+     */
+    protected function writeColumnarMeta(string $storePath, int $rows): void
+    {
+        $columns = [];
+        foreach (self::COLUMNAR_COLUMNS as $name => $extension) {
+            $columns[] = ['name' => $name, 'dtype' => "<{$extension}"];
+        }
+
+        $this->writeFileAtomically("{$storePath}/meta.json", json_encode([
+            'format' => 'ohlcv-columns',
+            'version' => self::COLUMNAR_VERSION,
+            'rows' => $rows,
+            'columns' => $columns,
+        ], JSON_PRETTY_PRINT));
+    }
 
-        Log::info("Exported {$prices->count()} records to {$csvPath}");
+    /**
+     * Layout version of an existing columnar export (0 if unreadable)
+     */
+    protected function columnarVersion(string $storePath): int
+    {
+        $metaPath = "{$storePath}/meta.json";
+        $meta = file_exists($metaPath) ? json_decode(file_get_contents($metaPath), true) : null;
 
-        return $csvPath;
+        return is_array($meta) ? (int) ($meta['version'] ?? 1) : 0;
+    }
+
+    /**
+     * Write a file via a temporary file and rename so readers never see partial data
+     */
+    protected function writeFileAtomically(string $path, string $contents): void
+    {
+        $tmpPath = "{$path}.tmp";
+
+        if (file_put_contents($tmpPath, $contents) === false) {
+            throw new Exception("Failed to write file: {$tmpPath}");
+        }
+
+        if (! rename($tmpPath, $path)) {
+            throw new Exception("Failed to move {$tmpPath} into place");
+        }
+    }
+
+    /**
+     * Model configuration used when none is given
+     */
+    public function defaultModelConfig(): array
+    {
+        return [
+            'name' => 'Default Configuration',
+            'hyperparameters' => [
+                'n_estimators' => 100,
+                'max_depth' => 5,
+                'learning_rate' => 0.1,
+                'subsample' => 0.8,
+                'colsample_bytree' => 0.8,
+                'train_test_split' => 0.8,
+            ],
+            'features_enabled' => [
+                'sma_10' => true,
+                'sma_50' => true,
+                'sma_200' => true,
+                'ema_12' => true,
+                'ema_26' => true,
+                'rsi_7' => true,
+                'rsi_14' => true,
+                'rsi_21' => true,
+                'macd' => true,
+                'macd_signal' => true,
+                'macd_histogram' => true,
+                'bb_upper' => true,
+                'bb_middle' => true,
+                'bb_lower' => true,
+                'bb_width' => true,
+                'atr' => true,
+                'stochastic_k' => true,
+                'stochastic_d' => true,
+                'volume_ratio' => true,
+                'obv' => true,
+            ],
+            'target_type' => 'open_to_close',
+        ];
     }
 
     /**
@@ -143,44 +542,22 @@ public function trainModel(Stock $stock, array $config = []): array
         Log::info("Training model for {$stock->symbol}");
 
         // Export data first
-        $csvPath = $this->exportStockData($stock);
+        $this->exportStockData($stock);
 
         // Use default configuration if not provided
         if (empty($config)) {
-            $config = [
-                'name' => 'Default Configuration',
-                'hyperparameters' => [
-                    'n_estimators' => 100,
-                    'max_depth' => 5,
-                    'learning_rate' => 0.1,
-                    'subsample' => 0.8,
-                    'colsample_bytree' => 0.8,
-                    'train_test_split' => 0.8,
-                ],
-                'features_enabled' => [
-                    'sma_10' => true,
-                    'sma_50' => true,
-                    'sma_200' => true,
-                    'ema_12' => true,
-                    'ema_26' => true,
-                    'rsi_7' => true,
-                    'rsi_14' => true,
-                    'rsi_21' => true,
-                    'macd' => true,
-                    'macd_signal' => true,
-                    'macd_histogram' => true,
-                    'bb_upper' => true,
-                    'bb_middle' => true,
-                    'bb_lower' => true,
-                    'bb_width' => true,
-                    'atr' => true,
-                    'stochastic_k' => true,
-                    'stochastic_d' => true,
-                    'volume_ratio' => true,
-                    'obv' => true,
-                ],
-                'target_type' => 'open_to_close',
-            ];
+            $config = $this->defaultModelConfig();
+        }
+
+        // Prefer the persistent worker when enabled
+        $result = $this->callWorker([
+            'op' => 'train',
+            'symbol' => $stock->symbol,
+            'config' => $config,
+        ]);
+
+        if ($result !== null) {
+            return $this->checkTrainingResult($stock, $result);
         }
 
         // Build Python command with config JSON
@@ -220,9 +597,17 @@ public function trainModel(Stock $stock, array $config = []): array
             throw new Exception('Failed to parse Python output: no valid JSON found');
         }
 
+        return $this->checkTrainingResult($stock, $result);
+    }
+
+    /**
+     * Throw on a failed training result, log and return a successful one
+     */
+    protected function checkTrainingResult(Stock $stock, array $result): array
+    {
         // Check for errors
         if (! ($result['success'] ?? false)) {
-            $errorMsg = $result['message'] ?? 'Unknown error occurred';
+            $errorMsg = $result['message'] ?? $result['error'] ?? 'Unknown error occurred';
             Log::error("Training failed for {$stock->symbol}", ['error' => $errorMsg]);
             throw new Exception("Training failed: {$errorMsg}");
         }
@@ -236,21 +621,46 @@ public function trainModel(Stock $stock, array $config = []): array
 
     /**
      * Run backtest for a stock
+     *
+     * Without a date window the model's test period (the rows it was not
+     * trained on) is backtested.
      */
-    public function runBacktest(Stock $stock, float $initialCapital = 10000.0): array
-    {
+    public function runBacktest(
+        Stock $stock,
+        float $initialCapital = 10000.0,
+        ?Carbon $startDate = null,
+        ?Carbon $endDate = null
+    ): array {
         $this->validatePythonEnvironment();
 
-        Log::info("Running backtest for {$stock->symbol}");
+        Log::info("Running backtest for {$stock->symbol}", [
+            'start_date' => $startDate?->format('Y-m-d') ?? 'test period',
+            'end_date' => $endDate?->format('Y-m-d') ?? 'test period',
+        ]);
+
+        // Prefer the persistent worker when enabled
+        $result = $this->callWorker([
+            'op' => 'backtest',
+            'symbol' => $stock->symbol,
+            'initial_capital' => $initialCapital,
+            'start_date' => $startDate?->format('Y-m-d'),
+            'end_date' => $endDate?->format('Y-m-d'),
+        ]);
 
-        // Build Python command
+        if ($result !== null) {
+            return $this->checkBacktestResult($stock, $result);
+        }
+
+        // Build Python command (empty dates fall back to the test period)
         $scriptPath = "{$this->scriptsPath}/backtest.py";
         $command = sprintf(
-            '%s %s %s %s 2>&1',
+            '%s %s %s %s %s %s 2>&1',
             escapeshellarg($this->pythonPath),
             escapeshellarg($scriptPath),
             escapeshellarg($stock->symbol),
-            escapeshellarg((string) $initialCapital)
+            escapeshellarg((string) $initialCapital),
+            escapeshellarg($startDate?->format('Y-m-d') ?? ''),
+            escapeshellarg($endDate?->format('Y-m-d') ?? '')
         );
 
         Log::debug("Executing Python command: {$command}");
@@ -273,6 +683,14 @@ public function runBacktest(Stock $stock, float $initialCapital = 10000.0): arra
             throw new Exception('Failed to parse Python output: no valid JSON found');
         }
 
+        return $this->checkBacktestResult($stock, $result);
+    }
+
+    /**
+     * Throw on a failed backtest result, log and return a successful one
+     */
+    protected function checkBacktestResult(Stock $stock, array $result): array
+    {
         // Check for errors
         if (! ($result['success'] ?? false)) {
             $errorMsg = $result['message'] ?? 'Unknown error occurred';
@@ -288,36 +706,290 @@ public function runBacktest(Stock $stock, float $initialCapital = 10000.0): arra
         return $result;
     }
 
+    /**
+     * Train and backtest many stocks in parallel (python/run_experiment.py)
+     *
+     * Exports every stock, then runs the whole experiment in one Python
+     * process pool. $onResult is called with (Stock, array $line) as each
+     * stock finishes; the summary line, with the shared-capital portfolio
+     * backtest of all stocks under "portfolio", is returned.
+     *
+     * @param  iterable<Stock>  $stocks
+     */
+    public function runExperiment(
+        iterable $stocks,
+        array $config,
+        float $initialCapital,
+        ?Carbon $startDate,
+        ?Carbon $endDate,
+        callable $onResult
+    ): array {
+        $this->validatePythonEnvironment();
+
+        // Leave a year of history before the window for indicator warm-up
+        $exportStart = $startDate?->copy()->subYear()->min(Carbon::now()->subYears(2));
+
+        $stocksBySymbol = [];
+        foreach ($stocks as $stock) {
+            $this->exportStockData($stock, $exportStart);
+            $stocksBySymbol[$stock->symbol] = $stock;
+        }
+
+        $spec = [
+            'symbols' => array_keys($stocksBySymbol),
+            'config' => empty($config) ? $this->defaultModelConfig() : $config,
+            'initial_capital' => $initialCapital,
+            'start_date' => $startDate?->format('Y-m-d'),
+            'end_date' => $endDate?->format('Y-m-d'),
+        ];
+
+        // Bootstrap confidence intervals for every stock's trading metrics
+        $resamples = (int) config('services.python.robustness_resamples', 10000);
+        if ($resamples > 0) {
+            $spec['robustness'] = ['resamples' => $resamples];
+        }
+
+        $command = sprintf(
+            '%s %s -',
+            escapeshellarg($this->pythonPath),
+            escapeshellarg("{$this->scriptsPath}/run_experiment.py")
+        );
+
+        Log::info('Running experiment for '.count($stocksBySymbol).' stocks', ['command' => $command]);
+
+        // Progress output goes to a log file so a full stderr pipe can't stall Python
+        $process = proc_open($command, [
+            0 => ['pipe', 'r'],
+            1 => ['pipe', 'w'],
+            2 => ['file', storage_path('logs/python-experiment.log'), 'a'],
+        ], $pipes, $this->scriptsPath);
+
+        if (! is_resource($process)) {
+            throw new Exception('Failed to start Python experiment script');
+        }
+
+        $summary = null;
+        try {
+            fwrite($pipes[0], json_encode($spec));
+            fclose($pipes[0]);
+
+            while (($line = fgets($pipes[1])) !== false) {
+                $result = json_decode($line, true);
+
+                if (! is_array($result)) {
+                    continue;
+                }
+
+                if (($result['event'] ?? null) === 'summary') {
+                    $summary = $result;
+                } elseif (isset($stocksBySymbol[$result['symbol'] ?? ''])) {
+                    $onResult($stocksBySymbol[$result['symbol']], $result);
+                }
+            }
+        } finally {
+            // Also reached when $onResult throws, so the process is never leaked
+            foreach ($pipes as $pipe) {
+                if (is_resource($pipe)) {
+                    fclose($pipe);
+                }
+            }
+            $exitCode = proc_close($process);
+        }
+
+        if ($summary === null) {
+            throw new Exception("Python experiment script exited with code {$exitCode} without a summary");
+        }
+
+        Log::info('Experiment finished', [
+            'succeeded' => $summary['succeeded'] ?? 0,
+            'failed' => $summary['failed'] ?? [],
+            'elapsed_seconds' => $summary['elapsed_seconds'] ?? null,
+        ]);
+
+        return $summary;
+    }
+
+    /**
+     * Predict the next session's direction from a stock's latest bars
+     */
+    public function predict(Stock $stock, int $limit = 1): array
+    {
+        $this->validatePythonEnvironment();
+
+        $request = [
+            'op' => 'predict',
+            'symbol' => $stock->symbol,
+            'limit' => $limit,
+        ];
+
+        $result = $this->callWorker($request);
+
+        if ($result === null) {
+            // No worker: run the request once in a fresh process
+            $command = sprintf(
+                '%s %s request %s 2>&1',
+                escapeshellarg($this->pythonPath),
+                escapeshellarg("{$this->scriptsPath}/worker.py"),
+                escapeshellarg(json_encode($request))
+            );
+
+            $output = shell_exec($command);
+            $result = $output !== null ? $this->extractJsonFromOutput($output) : null;
+
+            if ($result === null) {
+                throw new Exception('Failed to parse Python output: no valid JSON found');
+            }
+        }
+
+        if (! ($result['success'] ?? false)) {
+            $errorMsg = $result['message'] ?? 'Unknown error occurred';
+            Log::error("Prediction failed for {$stock->symbol}", ['error' => $errorMsg]);
+            throw new Exception("Prediction failed: {$errorMsg}");
+        }
+
+        return $result;
+    }
+
+    /**
+     * Send a request to the persistent Python worker (python/worker.py)
+     *
+     * Returns null when worker mode is disabled or the worker socket is not
+     * reachable, in which case callers fall back to spawning a process.
+     */
+    protected function callWorker(array $request): ?array
+    {
+        if (config('services.python.mode', 'process') !== 'worker') {
+            return null;
+        }
+
+        $socketPath = config('services.python.worker_socket');
+        $socket = @stream_socket_client("unix://{$socketPath}", $errorCode, $errorMessage, 5);
+
+        if (! $socket) {
+            Log::warning("Python worker unavailable at {$socketPath}, spawning a process instead", [
+                'error' => $errorMessage,
+            ]);
+
+            return null;
+        }
+
+        stream_set_timeout($socket, (int) config('services.python.worker_timeout', 3600));
+
+        Log::debug("Sending {$request['op']} request to Python worker", ['symbol' => $request['symbol'] ?? null]);
+
+        fwrite($socket, json_encode($request)."\n");
+        $line = fgets($socket);
+        fclose($socket);
+
+        if ($line === false) {
+            throw new Exception('Python worker closed the connection without a response');
+        }
+
+        $result = json_decode($line, true);
+
+        if (! is_array($result)) {
+            throw new Exception('Failed to parse Python worker response');
+        }
+
+        return $result;
+    }
+
+    /**
+     * Read a stock's model registry pointer (see python/model_registry.py)
+     */
+    protected function readModelPointer(Stock $stock): ?array
+    {
+        $pointerPath = base_path("python/models/registry/{$stock->symbol}.json");
+
+        if (! file_exists($pointerPath)) {
+            return null;
+        }
+
+        $pointer = json_decode(file_get_contents($pointerPath), true);
+
+        return is_array($pointer) ? $pointer : null;
+    }
+
     /**
      * Check if model exists for a stock
      */
     public function modelExists(Stock $stock): bool
     {
-        $modelPath = base_path("python/models/{$stock->symbol}_model.pkl");
-
-        return file_exists($modelPath);
+        return file_exists($this->getModelPath($stock));
     }
 
     /**
      * Get model file path for a stock
+     *
+     * The current registered booster, or a legacy pickled model.
      */
     public function getModelPath(Stock $stock): string
     {
+        $pointer = $this->readModelPointer($stock);
+
+        foreach ($pointer['versions'] ?? [] as $version) {
+            if ($version['version'] === $pointer['current']) {
+                return base_path("python/models/registry/objects/{$version['model_hash']}.ubj");
+            }
+        }
+
         return base_path("python/models/{$stock->symbol}_model.pkl");
     }
 
     /**
      * Delete model for a stock
+     *
+     * Removes every registered version, the metadata and any legacy model.
+     * Booster files are content-addressed, so one still referenced by
+     * another stock's pointer is kept.
      */
     public function deleteModel(Stock $stock): bool
     {
-        $modelPath = $this->getModelPath($stock);
+        $registryPath = base_path('python/models/registry');
+        $pointer = $this->readModelPointer($stock);
+        $deleted = false;
+
+        if ($pointer !== null) {
+            $referenced = [];
+            foreach (glob("{$registryPath}/*.json") ?: [] as $otherPointerPath) {
+                if (basename($otherPointerPath) === "{$stock->symbol}.json") {
+                    continue;
+                }
+                $otherPointer = json_decode(file_get_contents($otherPointerPath), true);
+                foreach ($otherPointer['versions'] ?? [] as $version) {
+                    $referenced[$version['model_hash']] = true;
+                }
+            }
 
-        if (file_exists($modelPath)) {
-            return unlink($modelPath);
+            foreach ($pointer['versions'] as $version) {
+                if (isset($referenced[$version['model_hash']])) {
+                    continue;
+                }
+                // Booster and its compiled tree arrays
+                foreach (['ubj', 'npz'] as $extension) {
+                    $objectPath = "{$registryPath}/objects/{$version['model_hash']}.{$extension}";
+                    if (file_exists($objectPath)) {
+                        unlink($objectPath);
+                    }
+                }
+            }
+
+            array_map('unlink', glob("{$registryPath}/{$stock->symbol}/*.json") ?: []);
+            if (is_dir("{$registryPath}/{$stock->symbol}")) {
+                rmdir("{$registryPath}/{$stock->symbol}");
+            }
+
+            $deleted = unlink("{$registryPath}/{$stock->symbol}.json");
+        }
+
+        foreach (['_model.pkl', '_metadata.json'] as $suffix) {
+            $path = base_path("python/models/{$stock->symbol}{$suffix}");
+            if (file_exists($path)) {
+                $deleted = unlink($path) || $deleted;
+            }
         }
 
-        return false;
+        return $deleted;
     }
 
     /**
@@ -41,4 +41,20 @@
         'rate_limit' => 5, // calls per minute (free tier)
     ],
 
+    'python' => [
+        // 'columnar' (binary price store) or 'csv'
+        'export_format' => env('PYTHON_EXPORT_FORMAT', 'columnar'),
+
+        // 'process' (spawn a Python process per call) or 'worker' (persistent
+        // daemon started with `php artisan python:worker`)
+        'mode' => env('PYTHON_BRIDGE_MODE', 'process'),
+        'worker_socket' => env('PYTHON_WORKER_SOCKET', base_path('python/worker.sock')),
+        'worker_processes' => env('PYTHON_WORKER_PROCESSES', 2),
+        'worker_timeout' => env('PYTHON_WORKER_TIMEOUT', 3600),
+
+        // Bootstrap resamples for each experiment stock's confidence
+        // intervals (python/robustness.py); 0 disables them
+        'robustness_resamples' => env('PYTHON_ROBUSTNESS_RESAMPLES', 10000),
+    ],
+
 ];
@@ -2,24 +2,32 @@
 """
 Backtest trading strategy using trained model
 
-Usage: python backtest.py AAPL
+Without a date window only the model's test period (recorded in its
+metadata at training time) is backtested.
+
+Usage: python backtest.py AAPL [INITIAL_CAPITAL] [START_DATE] [END_DATE]
 """
 
 import sys
-import json
 import logging
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 import numpy as np
-import joblib
 
 import config
-from feature_engineering import engineer_features, get_feature_list
+import model_cache
+import model_registry
+import robustness
+from feature_engineering import (
+    BASE_COLUMNS, TARGET_LOOKAHEAD, get_feature_list, get_feature_lookback, select_date_window,
+)
+from feature_cache import cached_engineer_features, get_cache_stats, lookup_engineered_features
+from trade_simulation import simulate_trades
 from utils import (
     logger,
-    load_data_from_csv,
+    load_price_data,
     calculate_metrics,
     calculate_trading_metrics,
     save_results,
@@ -30,12 +38,17 @@ from utils import (
 logger = logging.getLogger(__name__)
 
 
-def load_model(symbol: str):
+def load_model(symbol: str, use_cache: bool = True):
     """
     Load trained model for a stock
 
+    Models are kept in the in-process model cache (model_cache.py), so
+    repeated backtests of the same model only read it from disk once; a
+    retrained or re-pointed model is picked up automatically.
+
     Args:
         symbol: Stock symbol
+        use_cache: Read through the in-process model cache
 
     Returns:
         Tuple of (model, metadata)
@@ -43,34 +56,96 @@ def load_model(symbol: str):
     Raises:
         FileNotFoundError: If model file doesn't exist
     """
-    model_filename = f"{symbol}_model.pkl"
-    model_path = config.MODELS_DIR / model_filename
-    metadata_path = config.MODELS_DIR / f"{symbol}_metadata.json"
+    if use_cache:
+        return model_cache.get_model(symbol)
+    return model_registry.read_model(symbol)
 
-    if not model_path.exists():
-        raise FileNotFoundError(
-            f"Model not found: {model_path}. Please train the model first."
-        )
 
-    logger.info(f"Loading model from {model_path}")
+def config_from_metadata(metadata: dict) -> dict:
+    """
+    Rebuild the feature engineering configuration a model was trained with
 
-    # Load the model
-    model = joblib.load(model_path)
+    Args:
+        metadata: Model metadata dictionary
 
-    # Load metadata if it exists
-    metadata = {}
-    if metadata_path.exists():
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        logger.info(f"Model loaded. Version: {metadata.get('model_version', 'unknown')}")
-        logger.info(f"Trained at: {metadata.get('trained_at', 'unknown')}")
-    else:
-        logger.warning(f"Metadata file not found: {metadata_path}")
+    Returns:
+        Configuration dictionary
+    """
+    return {
+        'name': metadata.get('model_version', 'Unknown'),
+        'hyperparameters': metadata.get('hyperparameters', {}),
+        'features_enabled': metadata.get('features_enabled', {}),
+        'target_type': metadata.get('target_type', 'open_to_close')
+    }
+
+
+def backtest_window(metadata: dict, start_date=None, end_date=None) -> tuple:
+    """
+    Date window to backtest: the given bounds, or the model's test period
+
+    Without explicit dates a backtest covers only the rows the model was
+    not trained on (test_start/test_end recorded at training time). Models
+    trained before those were recorded fall back to the full history.
+
+    Args:
+        metadata: Model metadata dictionary
+        start_date: Optional first date to backtest
+        end_date: Optional last date to backtest
+
+    Returns:
+        Tuple of (start_date, end_date), either possibly None
+    """
+    if start_date is not None or end_date is not None:
+        return start_date, end_date
 
-    return model, metadata
+    start_date, end_date = metadata.get('test_start'), metadata.get('test_end')
+    if start_date is None:
+        logger.warning("Model metadata has no test period; backtesting the full history, training rows included")
+    return start_date, end_date
 
 
-def prepare_backtest_data(symbol: str, metadata: dict, config: dict):
+def cached_training_window(symbol: str, metadata: dict, config: dict, feature_names,
+                           start_date=None, end_date=None):
+    """
+    The backtest window sliced from the feature frame cached at training time
+
+    Training caches every column over its whole data window, a key a
+    windowed, column-subset backtest never produces itself. The frame is
+    only used when it has every price row of the window: it drops NaN rows
+    over all of its columns, the model's columns alone can only keep more.
+
+    Args:
+        symbol: Stock symbol
+        metadata: Model metadata dictionary (data_window)
+        config: Feature engineering configuration
+        feature_names: Columns the model uses (None = all)
+        start_date: First date of the window
+        end_date: Last date of the window
+
+    Returns:
+        The windowed feature frame, or None if it isn't cached or can't be used
+    """
+    data_window = metadata.get('data_window')
+    if data_window is None:
+        return None
+
+    df = load_price_data(symbol, start_date=data_window.get('start_date'), end_date=data_window.get('end_date'),
+                         warmup_rows=get_feature_lookback(config), lookahead_rows=TARGET_LOOKAHEAD)
+    df_features = lookup_engineered_features(df, config)
+    if df_features is None:
+        return None
+
+    df_features = select_date_window(df_features, start_date, end_date)
+    if len(df_features) != len(select_date_window(df, start_date, end_date)):
+        logger.info("Cached training features dropped rows of the window; engineering it instead")
+        return None
+
+    if feature_names is not None:
+        df_features = df_features[BASE_COLUMNS + list(feature_names) + ['target']]
+    return df_features
+
+
+def prepare_backtest_data(symbol: str, metadata: dict, config: dict, start_date=None, end_date=None):
     """
     Load and prepare data for backtesting
 
@@ -78,20 +153,38 @@ def prepare_backtest_data(symbol: str, metadata: dict, config: dict):
         symbol: Stock symbol
         metadata: Model metadata dictionary
         config: Feature engineering configuration
+        start_date: Optional first date to backtest
+        end_date: Optional last date to backtest
 
     Returns:
         Tuple of (df_features, X, y, feature_names)
     """
     logger.info(f"Preparing backtest data for {symbol}")
 
-    # Load raw data
-    df = load_data_from_csv(symbol)
+    feature_names = metadata.get('features_used')
+
+    # Reuse the frame training engineered when it is still cached
+    df_features = cached_training_window(symbol, metadata, config, feature_names, start_date, end_date)
+
+    if df_features is None:
+        # Load raw data: only the window plus the warm-up its features need
+        lookback = get_feature_lookback(config, feature_names)
+        df = load_price_data(symbol, start_date=start_date, end_date=end_date,
+                             warmup_rows=lookback, lookahead_rows=TARGET_LOOKAHEAD)
+
+        # EMA/MACD/OBV depend on the whole history, but the rows before the
+        # window are only scanned to carry their values
+        start_row = 0
+        if lookback is None and start_date is not None:
+            start_row = int(np.searchsorted(df['date'].to_numpy(dtype='datetime64[ns]'),
+                                            np.datetime64(pd.Timestamp(start_date), 'ns')))
 
-    # Engineer features (same as training)
-    df_features = engineer_features(df, config)
+        # Engineer only the features the model was trained on
+        df_features = cached_engineer_features(df, config, columns=feature_names, start_row=start_row)
+        df_features = select_date_window(df_features, start_date, end_date)
 
-    # Get feature columns (must match training features)
-    feature_names = metadata.get('features_used', get_feature_list(df_features))
+    if feature_names is None:
+        feature_names = get_feature_list(df_features)
 
     # Prepare features and target
     X = df_features[feature_names].values
@@ -111,6 +204,9 @@ def simulate_trading(df_features: pd.DataFrame, predictions: np.ndarray,
     - If predict UP (1): Buy at open, sell at close
     - If predict DOWN (0): Stay in cash (no trade)
 
+    Runs on the price/prediction arrays (trade_simulation.py); whole-share
+    sizing compounds the capital from trade to trade.
+
     Args:
         df_features: DataFrame with features and price data
         predictions: Model predictions (0 or 1)
@@ -122,47 +218,15 @@ def simulate_trading(df_features: pd.DataFrame, predictions: np.ndarray,
     """
     logger.info("Simulating trading...")
 
-    trades = []
-    capital = initial_capital
-
-    for i, (idx, row) in enumerate(df_features.iterrows()):
-        prediction = predictions[i]
-        confidence = prediction_probas[i]
-        actual = row['target']
-
-        # Only trade if we predict UP
-        if prediction == 1:
-            entry_price = row['open']
-            exit_price = row['close']
-
-            # Realistic position sizing: buy as many shares as capital allows
-            shares = int(capital // entry_price)  # Floor division for whole shares
-
-            if shares > 0:  # Only trade if we can afford at least 1 share
-                # Calculate profit/loss based on actual position size
-                profit_loss = (exit_price - entry_price) * shares
-                profit_loss_pct = ((exit_price - entry_price) / entry_price) * 100
-
-                # Determine if prediction was correct
-                was_correct = (prediction == actual)
-
-                # Update capital
-                capital += profit_loss
-
-                trades.append({
-                    'date': row['date'] if 'date' in row else None,
-                    'prediction': int(prediction),
-                    'actual': int(actual),
-                    'confidence': float(confidence),
-                    'entry_price': float(entry_price),
-                    'exit_price': float(exit_price),
-                    'profit_loss': float(profit_loss),
-                    'profit_loss_pct': float(profit_loss_pct),
-                    'was_correct': bool(was_correct),
-                    'capital': float(capital),
-                })
-
-    trades_df = pd.DataFrame(trades)
+    trades_df = simulate_trades(
+        df_features['open'].to_numpy(dtype=float),
+        df_features['close'].to_numpy(dtype=float),
+        predictions,
+        prediction_probas,
+        df_features['target'].to_numpy(),
+        df_features['date'].to_numpy() if 'date' in df_features.columns else None,
+        initial_capital,
+    )
 
     logger.info(f"Simulated {len(trades_df)} trades")
 
@@ -245,36 +309,79 @@ def calculate_backtest_metrics(trades_df: pd.DataFrame, y_true: np.ndarray,
     }
 
 
-def main(symbol: str, initial_capital: float = 10000.0):
+def predict_frame(symbol: str, start_date=None, end_date=None, loaded_model: tuple = None) -> dict:
+    """
+    Features and model predictions for a symbol's backtest window
+
+    Args:
+        symbol: Stock symbol
+        start_date: Optional first date to backtest
+        end_date: Optional last date to backtest (without either date the
+            window is the model's test period, see backtest_window)
+        loaded_model: Optional (model, metadata) already in memory
+
+    Returns:
+        Dict with df_features, y, predictions, prediction_probas,
+        feature_names, metadata and the window backtested
+    """
+    # Load trained model
+    model, metadata = loaded_model if loaded_model is not None else load_model(symbol)
+
+    # Reconstruct config from metadata (needed for feature engineering)
+    config = config_from_metadata(metadata)
+
+    # Prepare backtest data (by default only the model's test period)
+    start_date, end_date = backtest_window(metadata, start_date, end_date)
+    df_features, X, y, feature_names = prepare_backtest_data(symbol, metadata, config, start_date, end_date)
+
+    # Make predictions
+    logger.info("Making predictions...")
+    prediction_probas = model.predict_proba(X)[:, 1]
+    predictions = (prediction_probas > 0.5).astype(int)
+
+    return {
+        'df_features': df_features,
+        'y': y,
+        'predictions': predictions,
+        'prediction_probas': prediction_probas,
+        'feature_names': feature_names,
+        'metadata': metadata,
+        'window': {
+            'start_date': str(start_date)[:10] if start_date is not None else None,
+            'end_date': str(end_date)[:10] if end_date is not None else None,
+            'out_of_sample': (metadata.get('test_start') is not None and start_date is not None
+                              and str(start_date)[:10] >= metadata['test_start']),
+        },
+    }
+
+
+def main(symbol: str, initial_capital: float = 10000.0, start_date=None, end_date=None,
+         loaded_model: tuple = None, predicted: dict = None, robustness_options: dict = None):
     """
     Main backtesting pipeline
 
     Args:
         symbol: Stock symbol
         initial_capital: Starting capital for simulation
+        start_date: Optional first date to backtest
+        end_date: Optional last date to backtest (without either date the
+            window is the model's test period)
+        loaded_model: Optional (model, metadata) already in memory (e.g. the
+            worker's model cache); loaded from disk when omitted
+        predicted: Optional predict_frame() output for the same window
+        robustness_options: Resample the trades for confidence intervals
+            (robustness.py options; None skips it)
 
     Returns:
         Dictionary of backtest results
     """
     try:
-        # Load trained model
-        model, metadata = load_model(symbol)
-
-        # Reconstruct config from metadata (needed for feature engineering)
-        config = {
-            'name': metadata.get('model_version', 'Unknown'),
-            'hyperparameters': metadata.get('hyperparameters', {}),
-            'features_enabled': metadata.get('features_enabled', {}),
-            'target_type': metadata.get('target_type', 'open_to_close')
-        }
+        if predicted is None:
+            predicted = predict_frame(symbol, start_date, end_date, loaded_model)
 
-        # Prepare backtest data
-        df_features, X, y, feature_names = prepare_backtest_data(symbol, metadata, config)
-
-        # Make predictions
-        logger.info("Making predictions...")
-        predictions = model.predict(X)
-        prediction_probas = model.predict_proba(X)[:, 1]
+        df_features, y = predicted['df_features'], predicted['y']
+        predictions, prediction_probas = predicted['predictions'], predicted['prediction_probas']
+        feature_names, metadata = predicted['feature_names'], predicted['metadata']
 
         # Simulate trading
         trades_df = simulate_trading(df_features, predictions, prediction_probas, initial_capital)
@@ -306,12 +413,20 @@ def main(symbol: str, initial_capital: float = 10000.0):
             'data_summary': {
                 'total_samples': int(len(df_features)),
                 'num_features': int(len(feature_names)),
+                'start_date': str(df_features['date'].iloc[0].date()) if len(df_features) else None,
+                'end_date': str(df_features['date'].iloc[-1].date()) if len(df_features) else None,
             },
+            'backtest_window': predicted['window'],
             'prediction_metrics': metrics['prediction_metrics'],
             'trading_metrics': metrics['trading_metrics'],
             'recent_trades': trades_list,
+            'feature_cache': get_cache_stats(),
+            'model_cache': model_cache.get_cache_stats(),
         }
 
+        if robustness_options is not None and len(trades_df) > 1:
+            result['robustness'] = robustness.bootstrap_trades(trades_df, robustness_options)
+
         logger.info("Backtesting complete")
 
         return result
@@ -320,17 +435,66 @@ def main(symbol: str, initial_capital: float = 10000.0):
         return handle_error(e, "BACKTEST_ERROR")
 
 
+def predict(symbol: str, limit: int = 1, start_date=None, end_date=None, loaded_model: tuple = None):
+    """
+    Predict the next session's direction for the most recent bars
+
+    Args:
+        symbol: Stock symbol
+        limit: Number of most recent bars to return predictions for
+        start_date: Optional first date of the data to featurize
+        end_date: Optional last date (defaults to the latest bar)
+        loaded_model: Optional (model, metadata) already in memory
+
+    Returns:
+        Dictionary with one prediction per bar, oldest first
+    """
+    try:
+        model, metadata = loaded_model if loaded_model is not None else load_model(symbol)
+        config = config_from_metadata(metadata)
+
+        df_features, X, _, feature_names = prepare_backtest_data(symbol, metadata, config, start_date, end_date)
+        df_features, X = df_features.tail(limit), X[-limit:]
+
+        probas = model.predict_proba(X)[:, 1]
+        predictions = (probas > 0.5).astype(int)
+
+        return {
+            'success': True,
+            'symbol': symbol,
+            'stock_symbol': symbol,
+            'model_version': metadata.get('model_version', 'unknown'),
+            'features_used': feature_names,
+            'predictions': [
+                {
+                    'date': str(date.date()),
+                    'predicted_direction': 'up' if prediction == 1 else 'down',
+                    'prediction': int(prediction),
+                    'probability_up': float(proba),
+                    'confidence_score': float(max(proba, 1 - proba)),
+                }
+                for date, prediction, proba in zip(df_features['date'], predictions, probas)
+            ],
+        }
+
+    except Exception as e:
+        return handle_error(e, "PREDICT_ERROR")
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python backtest.py <SYMBOL> [INITIAL_CAPITAL]")
-        print("Example: python backtest.py AAPL 10000")
+        print("Usage: python backtest.py <SYMBOL> [INITIAL_CAPITAL] [START_DATE] [END_DATE]")
+        print("Example: python backtest.py AAPL 10000 2024-01-01 2024-12-31")
+        print("Without dates the model's test period is backtested")
         sys.exit(1)
 
     symbol = sys.argv[1].upper()
     initial_capital = float(sys.argv[2]) if len(sys.argv) > 2 else 10000.0
+    start_date = (sys.argv[3] or None) if len(sys.argv) > 3 else None
+    end_date = (sys.argv[4] or None) if len(sys.argv) > 4 else None
 
     # Run backtest
-    result = main(symbol, initial_capital)
+    result = main(symbol, initial_capital, start_date, end_date)
 
     # Output results as JSON
     save_results(result)
@@ -12,6 +12,9 @@ BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / 'data'
 MODELS_DIR = BASE_DIR / 'models'
 
+# Content-addressed model registry (model_registry.py)
+MODEL_REGISTRY_DIR = MODELS_DIR / 'registry'
+
 # Ensure directories exist
 DATA_DIR.mkdir(exist_ok=True)
 MODELS_DIR.mkdir(exist_ok=True)
@@ -30,6 +33,17 @@ XGBOOST_PARAMS = {
     'eval_metric': 'logloss',
 }
 
+# Early stopping and training budget defaults (overridable per config in
+# 'hyperparameters'). The validation slice is the tail of the training
+# split, so it never overlaps the test set. 0/None disables a setting.
+TRAINING_DEFAULTS = {
+    'early_stopping_rounds': 20,
+    'validation_fraction': 0.1,
+    'max_training_seconds': None,  # wall-clock budget
+    'max_trees': None,             # cap on n_estimators
+    'eval_train_set': False,       # also log train-set loss every round
+}
+
 # Train/test split ratio
 TEST_SIZE = 0.2
 RANDOM_STATE = 42
@@ -57,5 +71,131 @@ MIN_TRAINING_SAMPLES = 100
 # Model versioning
 MODEL_VERSION = '1.0.0'
 
+# Feature cache (shared by training and backtesting)
+# Bump FEATURE_CODE_VERSION whenever feature calculations change so stale
+# cached matrices are never reused.
+FEATURE_CODE_VERSION = '3'
+FEATURE_CACHE_ENABLED = True
+FEATURE_CACHE_DIR = DATA_DIR / 'feature_cache'
+FEATURE_CACHE_MAX_ENTRIES = 500
+FEATURE_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+
+# Symbols per (time x symbol) grid in panel feature engineering
+# (feature_engineering.engineer_panel_features)
+PANEL_BLOCK_SYMBOLS = 256
+
+# Quantized training matrix cache (dmatrix_cache.py)
+# QuantileDMatrix objects are kept in memory per process; the optional
+# disk layer stores their float32 inputs for other processes to map.
+DMATRIX_MAX_BIN = 256
+DMATRIX_CACHE_MAX_ENTRIES = 16
+DMATRIX_CACHE_MAX_BYTES = 1024 ** 3  # 1 GB of input arrays
+DMATRIX_CACHE_DISK = False
+DMATRIX_CACHE_DIR = DATA_DIR / 'dmatrix_cache'
+
+# Multi-symbol memory-mapped price archive (see price_archive.py)
+PRICE_ARCHIVE_DIR = DATA_DIR / 'price_archive'
+
+# Rows per chunk for the bounded-memory streaming backtest (streaming_pipeline.py)
+STREAM_CHUNK_ROWS = 100_000
+
+# Compile the trade simulation scan with numba when it is installed
+# (trade_simulation.py); pure Python/NumPy otherwise
+USE_NUMBA_SIMULATION = True
+
+# Persistent worker daemon (worker.py)
+WORKER_SOCKET_PATH = BASE_DIR / 'worker.sock'
+WORKER_POOL_SIZE = 2
+
+# Batches up to this many rows are scored with the compiled trees
+# (tree_ensemble.py) instead of the XGBoost predictor
+COMPILED_PREDICT_MAX_ROWS = 512
+
+# In-process cache of loaded models (model_cache.py)
+MODEL_CACHE_MAX_ENTRIES = 32
+MODEL_CACHE_MAX_BYTES = 512 * 1024 ** 2  # 512 MB of serialized models
+
+# Walk-forward validation (walk_forward.py); windows are in trading days
+WALK_FORWARD_PARAMS = {
+    'train_window': 504,      # ~2 years
+    'test_window': 21,        # ~1 month
+    'step': None,             # defaults to test_window
+    'expanding': False,       # True = train on all history up to each fold
+    'retrain_every': 12,      # fresh booster every N folds, warm starts in between
+    'warm_start_rounds': 10,  # trees added to the previous booster per warm fold
+}
+
+# Hyperparameter search (hyperparameter_search.py)
+# method: grid, random, halving (successive halving) or hyperband.
+# Boosting rounds are the budget that halving/hyperband hand out.
+HYPERPARAMETER_SEARCH = {
+    'method': 'halving',
+    'n_candidates': 27,           # random/halving candidates
+    'eta': 3,                     # halving reduction factor
+    'min_rounds': 10,
+    'max_rounds': 300,
+    'early_stopping_rounds': 20,  # grid/random candidates
+    'validation_fraction': 0.2,   # tail of the training split used for validation
+    'seed': 42,
+    'workers': None,              # None = one process per core
+}
+
+# Values per hyperparameter: a list, or {"low", "high", "log", "int"} for
+# random sampling
+SEARCH_SPACE = {
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.03, 0.1, 0.3],
+    'subsample': [0.7, 0.9],
+    'colsample_bytree': [0.7, 0.9],
+    'min_child_weight': [1, 5],
+}
+
+# Batched parameter sweep (parameter_sweep.py); rank_by is a trading metric
+SWEEP_GRID = {
+    'thresholds': [0.5, 0.55, 0.6, 0.65, 0.7],
+    'initial_capitals': [10000.0],
+    'position_fractions': [0.25, 0.5, 1.0],
+    'rank_by': 'sharpe_ratio',
+}
+
+# Shared-capital portfolio backtest (portfolio_backtest.py)
+# allocation: 'equal', 'confidence' (by P(up) - threshold) or 'top_k'
+PORTFOLIO_PARAMS = {
+    'allocation': 'equal',
+    'threshold': 0.5,
+    'top_k': None,          # most positions per day
+    'max_weight': None,     # cap per symbol, e.g. 0.25; the rest stays in cash
+    'whole_shares': True,
+}
+
+# Pooled out-of-core training over many symbols (pooled_training.py)
+# Peak memory is about chunk_rows raw bars plus three batch_rows x features
+# float32 buffers; XGBoost keeps its quantized pages under the cache dir.
+POOLED_TRAINING = {
+    'chunk_rows': STREAM_CHUNK_ROWS,  # price rows engineered at a time
+    'batch_rows': 250_000,            # rows per external-memory batch
+    'test_size': 0.2,                 # most recent share of the date range
+    'split_date': None,               # first test date (overrides test_size)
+    'validation_start': None,         # first early-stopping date (defaults to
+                                      # the last validation_fraction of train)
+    'assign_to_symbols': False,       # also register the model for each symbol
+}
+POOLED_TRAINING_CACHE_DIR = DATA_DIR / 'extmem_cache'
+
+# Monte Carlo robustness of trading metrics (robustness.py)
+ROBUSTNESS_PARAMS = {
+    'resamples': 10000,
+    'block_size': None,     # trades per bootstrap block; None = about n ** (1/3)
+    'confidence': 0.95,
+    'shuffle': False,       # also resample the trade order (drawdown)
+    'batch_size': 250,      # resamples per array batch (small enough to stay in cache)
+    'seed': 42,
+    'workers': None,        # processes; None = one per core
+}
+
+# Multi-symbol experiments (run_experiment.py)
+# None = one process per core, capped at the number of symbols
+EXPERIMENT_WORKERS = None
+
 # Logging
 LOG_LEVEL = 'INFO'
@@ -0,0 +1,218 @@
+"""
+Cache of quantized (hist) training matrices
+
+Handing NumPy arrays to XGBoost makes it sketch feature quantiles and
+quantize the data on every fit. get_quantile_dmatrix() builds a
+QuantileDMatrix once per (data, labels, feature names, max_bin, reference)
+and keeps it in a per-process LRU, so hyperparameter trials, walk-forward
+folds and repeated trainings on the same features reuse it.
+
+A matrix built with `ref=` reuses the reference's quantile cuts and only
+quantizes its own rows, which is how validation slices and walk-forward
+folds avoid a new sketch.
+
+XGBoost can't serialize a QuantileDMatrix, so the optional disk layer
+(DMATRIX_CACHE_DISK) stores the float32 input arrays under
+DMATRIX_CACHE_DIR/{key}/ instead. Other processes memory-map them
+(load_arrays) rather than rebuilding features, and quantize from there.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from config import (
+    DMATRIX_CACHE_DIR,
+    DMATRIX_CACHE_DISK,
+    DMATRIX_CACHE_MAX_BYTES,
+    DMATRIX_CACHE_MAX_ENTRIES,
+    DMATRIX_MAX_BIN,
+)
+
+logger = logging.getLogger(__name__)
+
+# key -> (QuantileDMatrix, input bytes)
+_matrices: "OrderedDict[str, Tuple[xgb.QuantileDMatrix, int]]" = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'disk_hits': 0}
+
+
+def matrix_key(X: np.ndarray, y: Optional[np.ndarray] = None,
+               feature_names: Optional[List[str]] = None,
+               max_bin: int = DMATRIX_MAX_BIN, ref_key: Optional[str] = None) -> str:
+    """
+    Hash the float32 feature matrix, labels, feature names, max_bin and reference
+
+    Args:
+        X: Feature matrix
+        y: Labels (optional)
+        feature_names: Column names
+        max_bin: Histogram bins per feature
+        ref_key: Key of the matrix whose quantile cuts are reused
+
+    Returns:
+        Hex digest identifying the quantized matrix
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps({
+        'shape': list(X.shape),
+        'feature_names': list(feature_names) if feature_names is not None else None,
+        'max_bin': max_bin,
+        'ref': ref_key,
+    }).encode())
+    digest.update(X.tobytes())
+    if y is not None:
+        digest.update(np.ascontiguousarray(y, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def _evict(max_entries: int, max_bytes: int) -> None:
+    total = sum(size for _, size in _matrices.values())
+    while _matrices and (len(_matrices) > max_entries or total > max_bytes):
+        _, (_, size) = _matrices.popitem(last=False)
+        total -= size
+        _stats['evictions'] += 1
+
+
+def get_quantile_dmatrix(X: np.ndarray, y: Optional[np.ndarray] = None,
+                         feature_names: Optional[List[str]] = None,
+                         ref: Optional[xgb.QuantileDMatrix] = None,
+                         max_bin: int = DMATRIX_MAX_BIN, n_jobs: int = -1,
+                         key: Optional[str] = None) -> xgb.QuantileDMatrix:
+    """
+    QuantileDMatrix for X/y from the in-process cache, built on a miss
+
+    Args:
+        X: Feature matrix
+        y: Labels (optional, e.g. for prediction-only matrices)
+        feature_names: Column names
+        ref: Matrix whose quantile cuts to reuse (validation/fold slices)
+        max_bin: Histogram bins per feature
+        n_jobs: Threads used for quantization
+        key: Precomputed matrix_key (skips hashing X)
+
+    Returns:
+        Cached or newly built QuantileDMatrix (treat as read-only)
+    """
+    ref_key = getattr(ref, 'cache_key', None) if ref is not None else None
+    key = key or matrix_key(X, y, feature_names, max_bin, ref_key)
+
+    cached = _matrices.get(key)
+    if cached is not None:
+        _matrices.move_to_end(key)
+        _stats['hits'] += 1
+        return cached[0]
+
+    _stats['misses'] += 1
+    if DMATRIX_CACHE_DISK:
+        if entry_exists(key):
+            X, y, feature_names = load_arrays(key)
+            _stats['disk_hits'] += 1
+        else:
+            store_arrays(X, y, feature_names, key=key)
+
+    matrix = xgb.QuantileDMatrix(
+        np.ascontiguousarray(X, dtype=np.float32),
+        label=y,
+        feature_names=feature_names,
+        ref=ref,
+        max_bin=max_bin,
+        nthread=n_jobs,
+    )
+    matrix.cache_key = key
+
+    _matrices[key] = (matrix, int(np.asarray(X).size) * 4)
+    _evict(DMATRIX_CACHE_MAX_ENTRIES, DMATRIX_CACHE_MAX_BYTES)
+    logger.debug(f"Built quantile matrix {key[:12]} ({len(X)} rows)")
+    return matrix
+
+
+def _entry_dir(key: str, cache_dir: Optional[Path] = None) -> Path:
+    return Path(cache_dir or DMATRIX_CACHE_DIR) / key
+
+
+def entry_exists(key: str, cache_dir: Optional[Path] = None) -> bool:
+    """
+    Check whether the input arrays for a key are on disk
+    """
+    return (_entry_dir(key, cache_dir) / 'meta.json').exists()
+
+
+def store_arrays(X: np.ndarray, y: Optional[np.ndarray] = None,
+                 feature_names: Optional[List[str]] = None,
+                 key: Optional[str] = None, cache_dir: Optional[Path] = None) -> str:
+    """
+    Write a float32 feature matrix and labels to disk for memory-mapping
+
+    Args:
+        X: Feature matrix
+        y: Labels (optional)
+        feature_names: Column names
+        key: Entry key (defaults to matrix_key of the inputs)
+        cache_dir: Override the cache directory
+
+    Returns:
+        The entry key
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    key = key or matrix_key(X, y, feature_names)
+    path = _entry_dir(key, cache_dir)
+    if entry_exists(key, cache_dir):
+        return key
+
+    # Build in a private directory and rename it into place
+    tmp_path = path.with_name(f"{key}.{os.getpid()}.tmp")
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    np.save(tmp_path / 'X.npy', X)
+    if y is not None:
+        np.save(tmp_path / 'y.npy', np.ascontiguousarray(y, dtype=np.float32))
+    with open(tmp_path / 'meta.json', 'w') as f:
+        json.dump({'rows': int(X.shape[0]), 'columns': int(X.shape[1]),
+                   'feature_names': list(feature_names) if feature_names is not None else None}, f)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process stored the same entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return key
+
+
+def load_arrays(key: str, cache_dir: Optional[Path] = None
+                ) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[List[str]]]:
+    """
+    Memory-map a stored feature matrix and labels read-only
+
+    Returns:
+        Tuple of (X, y or None, feature names or None)
+    """
+    path = _entry_dir(key, cache_dir)
+    with open(path / 'meta.json', 'r') as f:
+        meta = json.load(f)
+
+    X = np.load(path / 'X.npy', mmap_mode='r')
+    y = np.load(path / 'y.npy', mmap_mode='r') if (path / 'y.npy').exists() else None
+    return X, y, meta['feature_names']
+
+
+def clear() -> None:
+    """
+    Drop every in-process matrix
+    """
+    _matrices.clear()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Hit/miss/eviction counters and current size for this process
+    """
+    return {**_stats, 'entries': len(_matrices)}
@@ -0,0 +1,240 @@
+"""
+Content-addressed feature cache
+
+Engineered feature frames are stored under DATA_DIR/feature_cache keyed
+by a hash of the input data, the feature configuration and
+FEATURE_CODE_VERSION, so training and backtesting the same CSV with the
+same configuration only engineer features once. Entries are uncompressed
+.npz files (one array per column) evicted least-recently-used first
+once the entry or byte limits are exceeded.
+
+Backtests engineer only the model's columns over the test window, which
+never matches the key of the full frame training stored; they look that
+frame up with lookup_engineered_features and slice it instead
+(backtest.prepare_backtest_data).
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    FEATURE_CACHE_DIR,
+    FEATURE_CACHE_ENABLED,
+    FEATURE_CACHE_MAX_BYTES,
+    FEATURE_CACHE_MAX_ENTRIES,
+    FEATURE_CODE_VERSION,
+)
+from feature_engineering import engineer_features, get_output_feature_columns
+
+logger = logging.getLogger(__name__)
+
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def compute_cache_key(df: pd.DataFrame, config: Dict, columns: Optional[List[str]] = None,
+                      start_row: int = 0) -> str:
+    """
+    Hash the raw input data, feature configuration and code version
+
+    Args:
+        df: Raw OHLCV DataFrame (before feature engineering)
+        config: Configuration with features_enabled and target_type
+        columns: Optional feature subset passed to engineer_features
+        start_row: First returned row passed to engineer_features
+
+    Returns:
+        Hex digest identifying the engineered output
+    """
+    # Requesting every column is the same output as requesting none
+    if columns is not None and list(columns) == get_output_feature_columns(df, config):
+        columns = None
+
+    digest = hashlib.sha256()
+    digest.update(FEATURE_CODE_VERSION.encode())
+    digest.update(json.dumps({
+        'features_enabled': config.get('features_enabled', {}),
+        'target_type': config.get('target_type', 'open_to_close'),
+        'columns': list(columns) if columns is not None else None,
+    }, sort_keys=True).encode())
+    if start_row:
+        digest.update(f"start_row:{start_row}".encode())
+
+    for column in df.columns:
+        series = df[column]
+        # Parsed and unparsed dates must hash alike (loaders differ on this)
+        if column == 'date':
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                series = pd.to_datetime(series)
+            series = series.astype('datetime64[ns]')
+        values = series.to_numpy()
+        digest.update(f"{column}:{values.dtype}:{len(values)}".encode())
+        if values.dtype == object:
+            digest.update('\x1f'.join(map(str, values)).encode())
+        else:
+            digest.update(np.ascontiguousarray(values).tobytes())
+
+    return digest.hexdigest()
+
+
+def _entry_path(key: str, cache_dir: Path) -> Path:
+    return cache_dir / f"{key}.npz"
+
+
+def _save_entry(df_features: pd.DataFrame, path: Path) -> None:
+    arrays = {}
+    for i, column in enumerate(df_features.columns):
+        values = df_features[column].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays[f"c{i}"] = values
+    arrays['__columns__'] = np.array(df_features.columns, dtype=str)
+    arrays['__index__'] = df_features.index.to_numpy()
+
+    # Write to a temporary file first so readers never see a partial entry
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _load_entry(path: Path) -> pd.DataFrame:
+    with np.load(path, allow_pickle=False) as data:
+        columns = list(data['__columns__'])
+        index = data['__index__']
+        return pd.DataFrame({column: data[f"c{i}"] for i, column in enumerate(columns)}, index=index)
+
+
+def evict(cache_dir: Path = FEATURE_CACHE_DIR,
+          max_entries: int = FEATURE_CACHE_MAX_ENTRIES,
+          max_bytes: int = FEATURE_CACHE_MAX_BYTES) -> int:
+    """
+    Remove least-recently-used entries until both limits are satisfied
+
+    Args:
+        cache_dir: Cache directory
+        max_entries: Maximum number of cached entries
+        max_bytes: Maximum total size in bytes
+
+    Returns:
+        Number of entries removed
+    """
+    if not cache_dir.exists():
+        return 0
+
+    entries = []
+    for path in cache_dir.glob('*.npz'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    total_bytes = sum(size for _, size, _ in entries)
+    removed = 0
+
+    while entries and (len(entries) > max_entries or total_bytes > max_bytes):
+        _, size, path = entries.pop(0)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+        removed += 1
+
+    _stats['evictions'] += removed
+    return removed
+
+
+def _read_entry(key: str, cache_dir: Path) -> Optional[pd.DataFrame]:
+    """
+    Load a cache entry and mark it as recently used (None if absent or unreadable)
+    """
+    path = _entry_path(key, cache_dir)
+    if not path.exists():
+        return None
+
+    try:
+        df_features = _load_entry(path)
+        os.utime(path)  # mark as recently used
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Discarding unreadable feature cache entry {path}: {e}")
+        return None
+
+    _stats['hits'] += 1
+    logger.info(f"Feature cache hit: {key[:12]}")
+    return df_features
+
+
+def lookup_engineered_features(df: pd.DataFrame, config: Dict,
+                               cache_dir: Optional[Path] = None) -> Optional[pd.DataFrame]:
+    """
+    The cached engineer_features(df, config) frame, without computing it
+
+    Args:
+        df: Raw OHLCV DataFrame
+        config: Feature engineering configuration
+        cache_dir: Override the cache directory
+
+    Returns:
+        The cached frame (every column, every row), or None
+    """
+    if not FEATURE_CACHE_ENABLED or config.get('feature_cache') is False:
+        return None
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else FEATURE_CACHE_DIR
+    return _read_entry(compute_cache_key(df, config), cache_dir)
+
+
+def cached_engineer_features(df: pd.DataFrame, config: Dict,
+                             columns: Optional[List[str]] = None,
+                             cache_dir: Optional[Path] = None, start_row: int = 0) -> pd.DataFrame:
+    """
+    engineer_features backed by the on-disk feature cache
+
+    Args:
+        df: Raw OHLCV DataFrame
+        config: Feature engineering configuration
+        columns: Optional feature subset (see engineer_features)
+        cache_dir: Override the cache directory
+        start_row: Only engineer rows from this position on (see engineer_features)
+
+    Returns:
+        DataFrame with engineered features and target variable
+    """
+    if not FEATURE_CACHE_ENABLED or config.get('feature_cache') is False:
+        return engineer_features(df, config, columns=columns, start_row=start_row)
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else FEATURE_CACHE_DIR
+    key = compute_cache_key(df, config, columns, start_row)
+    path = _entry_path(key, cache_dir)
+
+    df_features = _read_entry(key, cache_dir)
+    if df_features is not None:
+        return df_features
+
+    _stats['misses'] += 1
+    logger.info(f"Feature cache miss: {key[:12]}")
+    df_features = engineer_features(df, config, columns=columns, start_row=start_row)
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        _save_entry(df_features, path)
+        evict(cache_dir)
+    except OSError as e:
+        logger.warning(f"Could not write feature cache entry {path}: {e}")
+
+    return df_features
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Hit/miss/eviction counters for this process
+    """
+    return dict(_stats)
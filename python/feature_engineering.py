@@ -5,10 +5,20 @@ Calculates technical indicators optimized for intraday trading
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+import feature_kernels as fk
+from config import PANEL_BLOCK_SYMBOLS
+from feature_registry import FEATURE_REGISTRY, compute_features, plan_features, plan_lookback
+
+# Raw price columns that are never treated as features
+BASE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+# Rows after a date the target looks at (next day's open/close)
+TARGET_LOOKAHEAD = 1
+
 
 def calculate_rsi(series: pd.Series, period: int = 14) -> pd.Series:
     """
@@ -387,12 +397,547 @@ def create_target_variable(df: pd.DataFrame, target_type: str = 'open_to_close')
     return df
 
 
-def engineer_features(df: pd.DataFrame, config: Dict) -> pd.DataFrame:
+INTRADAY_COLUMNS = [
+    'gap_pct', 'gap_direction', 'gap_size',
+    'intraday_range_pct', 'intraday_high_pct', 'intraday_low_pct',
+    'close_position', 'body_size_pct', 'upper_shadow_pct', 'lower_shadow_pct',
+    'open_to_close_pct', 'open_to_high_pct', 'open_to_low_pct',
+    'is_green_candle', 'is_red_candle', 'is_doji', 'body_to_range_ratio',
+]
+
+MULTI_TIMEFRAME_COLUMNS = [
+    'return_1d', 'return_2d', 'return_3d', 'return_5d', 'return_10d', 'return_20d',
+    'volatility_5d', 'volatility_20d', 'trend_strength_10d', 'trend_strength_20d',
+    'higher_highs_3d', 'lower_lows_3d', 'consecutive_up', 'consecutive_down',
+]
+
+TIME_COLUMNS = [
+    'day_of_week', 'is_monday', 'is_tuesday', 'is_wednesday', 'is_thursday',
+    'is_friday', 'week_of_month', 'month',
+]
+
+
+def get_feature_columns(config: Dict) -> List[str]:
+    """
+    List the engineered columns for a configuration, in pipeline order
+
+    The order matches the columns the pandas reference path appends, so
+    models trained with either engine see the same feature layout.
+
+    Args:
+        config: Configuration dict with features_enabled
+
+    Returns:
+        List of engineered column names
+    """
+    features = config.get('features_enabled', {})
+    columns = list(INTRADAY_COLUMNS)
+
+    if features.get('sma_10'):
+        columns += ['sma_10', 'price_vs_sma10']
+    if features.get('sma_50'):
+        columns += ['sma_50', 'price_vs_sma50', 'above_sma50']
+    if features.get('sma_200'):
+        columns += ['sma_200', 'price_vs_sma200', 'above_sma200']
+    if features.get('ema_12'):
+        columns += ['ema_12', 'price_vs_ema12']
+    if features.get('ema_26'):
+        columns += ['ema_26', 'price_vs_ema26']
+    if features.get('rsi_7'):
+        columns += ['rsi_7']
+    if features.get('rsi_14'):
+        columns += ['rsi_14', 'rsi_oversold', 'rsi_overbought', 'rsi_neutral']
+    if features.get('rsi_21'):
+        columns += ['rsi_21']
+    if features.get('macd'):
+        columns += ['macd', 'macd_positive']
+    if features.get('macd_signal'):
+        columns += ['macd_signal']
+    if features.get('macd_histogram'):
+        columns += ['macd_histogram', 'macd_histogram_positive', 'macd_histogram_increasing']
+    if any([features.get('bb_upper'), features.get('bb_middle'), features.get('bb_lower')]):
+        for band in ('bb_upper', 'bb_middle', 'bb_lower'):
+            if features.get(band):
+                columns.append(band)
+        if features.get('bb_width'):
+            columns += ['bb_width_pct', 'bb_squeeze']
+        columns += ['bb_position', 'bb_above_upper', 'bb_below_lower']
+    if features.get('atr'):
+        columns += ['atr', 'atr_pct', 'volatility_high']
+    if features.get('stochastic_k'):
+        columns += ['stochastic_k']
+    if features.get('stochastic_d'):
+        columns += ['stochastic_d']
+
+    if features.get('volume_ratio'):
+        columns += ['volume_sma_20', 'volume_ratio', 'volume_surge', 'volume_dry']
+    if features.get('obv'):
+        columns += ['obv', 'obv_sma', 'obv_increasing']
+
+    columns += MULTI_TIMEFRAME_COLUMNS
+    columns += TIME_COLUMNS
+
+    return columns
+
+
+def extract_sources(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Pull OHLCV and dates out of a frame as contiguous NumPy arrays
+
+    Args:
+        df: DataFrame with OHLCV data sorted by date
+
+    Returns:
+        Dict of float arrays for open/high/low/close/volume and datetime64[D] dates
+    """
+    sources = {
+        name: np.ascontiguousarray(df[name].to_numpy(dtype=float))
+        for name in ('open', 'high', 'low', 'close', 'volume')
+    }
+
+    dates = df['date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    sources['date'] = dates.to_numpy(dtype='datetime64[D]')
+
+    return sources
+
+
+def build_feature_matrix(df: pd.DataFrame, config: Dict,
+                         columns: Optional[List[str]] = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Compute every enabled feature into one preallocated 2D matrix
+
+    OHLCV is pulled out as contiguous float arrays once and the feature
+    planner writes each requested column straight into the matrix,
+    computing shared intermediates a single time.
+
+    Args:
+        df: DataFrame with OHLCV data sorted by date
+        config: Configuration dict with features_enabled
+        columns: Optional subset of registered feature columns to compute
+            (defaults to everything enabled in config)
+
+    Returns:
+        Tuple of (feature_matrix, column_names)
+    """
+    if columns is None:
+        columns = get_feature_columns(config)
+    columns = list(columns)
+
+    matrix = compute_features(extract_sources(df), columns)
+
+    return matrix, columns
+
+
+def create_target_array(open_: np.ndarray, close: np.ndarray, target_type: str = 'open_to_close') -> np.ndarray:
+    """
+    Array version of create_target_variable
+
+    Args:
+        open_: Open prices
+        close: Close prices
+        target_type: Type of target to create (see create_target_variable)
+
+    Returns:
+        Integer target array
+    """
+    next_open = fk.shift(open_, -1)
+    next_close = fk.shift(close, -1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if target_type == 'open_to_close':
+            target = next_close > next_open
+        elif target_type == 'close_to_close':
+            target = next_close > close
+        elif target_type == 'threshold':
+            threshold = 0.01  # 1%
+            target = (next_close - next_open) / next_open > threshold
+        else:
+            raise ValueError(f"Unknown target type: {target_type}")
+
+    return target.astype(int)
+
+
+def get_output_feature_columns(df: pd.DataFrame, config: Dict) -> List[str]:
+    """
+    Feature columns engineer_features produces for a raw frame and config
+
+    Extra input columns (e.g. adjusted_close) pass through as features
+    ahead of the engineered ones, matching get_feature_list on the output.
+
+    Args:
+        df: Raw OHLCV DataFrame
+        config: Configuration dict with features_enabled
+
+    Returns:
+        Ordered list of feature column names
+    """
+    engineered = get_feature_columns(config)
+    passthrough = [col for col in df.columns if col not in BASE_COLUMNS + ['target'] + engineered]
+    return passthrough + engineered
+
+
+def get_feature_lookback(config: Dict, columns: Optional[List[str]] = None) -> Optional[int]:
+    """
+    Warm-up rows needed before a window for its features to be exact
+
+    Args:
+        config: Configuration dict with features_enabled
+        columns: Optional feature subset (e.g. a model's features_used);
+            columns that are not registry features pass through unchanged
+
+    Returns:
+        Number of warm-up rows, or None if an enabled feature (EMA, MACD,
+        OBV) depends on the full history
+    """
+    if columns is None:
+        columns = get_feature_columns(config)
+    return plan_lookback([col for col in columns if col in FEATURE_REGISTRY])
+
+
+def select_date_window(df_features: pd.DataFrame, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Keep the rows of an engineered frame whose date lies in [start_date, end_date]
+
+    Args:
+        df_features: Output of engineer_features
+        start_date: First date to keep (None = unbounded)
+        end_date: Last date to keep (None = unbounded)
+
+    Returns:
+        Filtered DataFrame
+    """
+    mask = np.ones(len(df_features), dtype=bool)
+    if start_date is not None:
+        mask &= (df_features['date'] >= pd.Timestamp(start_date)).to_numpy()
+    if end_date is not None:
+        mask &= (df_features['date'] <= pd.Timestamp(end_date)).to_numpy()
+    return df_features[mask]
+
+
+def engineer_features(df: pd.DataFrame, config: Dict, engine: str = 'numpy',
+                      columns: Optional[List[str]] = None, start_row: int = 0) -> pd.DataFrame:
     """
     Main feature engineering function
 
     Orchestrates all feature engineering steps for day trading
 
+    Args:
+        df: DataFrame with OHLCV data (columns: date, open, high, low, close, volume)
+        config: Configuration dictionary with:
+            - features_enabled: Dict of which features to calculate
+            - target_type: Type of target variable
+        engine: 'numpy' (single-pass feature matrix) or 'pandas' (reference path)
+        columns: Optional list of feature columns to produce (e.g. a model's
+            features_used). Only those columns and their dependencies are
+            computed, and NaN rows are dropped over those columns only.
+        start_row: Only return rows from this (date-sorted) position on;
+            earlier rows are only read for indicator warm-up (see
+            _engineer_from_row)
+
+    Returns:
+        DataFrame with all engineered features and target variable
+    """
+    if columns is not None and list(columns) == get_output_feature_columns(df, config):
+        columns = None
+
+    if engine == 'pandas':
+        result = engineer_features_reference(df, config)
+        result = result if columns is None else result[BASE_COLUMNS + list(columns) + ['target']]
+        return result[result.index >= start_row]
+
+    print(f"Starting feature engineering...")
+    print(f"Input shape: {df.shape}")
+
+    # Sort by date to ensure proper time series order
+    df = df.sort_values('date').reset_index(drop=True)
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'])
+
+    if start_row > 0:
+        result = _engineer_from_row(df, config, columns, start_row)
+        print(f"Final shape: {result.shape} (from row {start_row})")
+        return result
+
+    # 1-5. Compute the requested features into one matrix
+    computed, base = _split_feature_columns(df, config, columns)
+    print(f"Building feature matrix ({len(computed)} columns)...")
+    matrix, computed = build_feature_matrix(df, config, columns=computed)
+
+    # 6. Create target variable
+    target_type = config.get('target_type', 'open_to_close')
+    target = create_target_array(df['open'].to_numpy(dtype=float), df['close'].to_numpy(dtype=float), target_type)
+
+    # 7. Assemble the frame in one step, then drop rows with NaN (from rolling calculations)
+    result, valid = _assemble_features(base, matrix, computed, columns, target)
+    result = result[valid]
+
+    print(f"Dropped {int((~valid).sum())} rows with NaN values")
+    print(f"Final shape: {result.shape}")
+    print(f"Features created: {result.shape[1] - 6}")  # Subtract OHLCV + date
+
+    return result
+
+
+def _split_feature_columns(df: pd.DataFrame, config: Dict,
+                           columns: Optional[List[str]]) -> Tuple[List[str], pd.DataFrame]:
+    """
+    Split the output into registry-computed columns and input columns kept as-is
+    """
+    if columns is None:
+        computed = get_feature_columns(config)
+        base = df.drop(columns=[col for col in computed + ['target'] if col in df.columns])
+    else:
+        computed = [col for col in columns if col in FEATURE_REGISTRY or col not in df.columns]
+        base = df[BASE_COLUMNS + [col for col in columns if col not in computed]]
+    return computed, base
+
+
+def _assemble_features(base: pd.DataFrame, matrix: np.ndarray, computed: List[str],
+                       columns: Optional[List[str]], target: np.ndarray) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Join input columns, the feature matrix and the target in one concat
+
+    Returns:
+        Tuple of (frame, mask of rows without NaN)
+    """
+    features_df = pd.DataFrame(matrix, columns=computed, index=base.index)
+    result = pd.concat([base, features_df], axis=1)
+    if columns is not None:
+        result = result[BASE_COLUMNS + list(columns)]
+    result['target'] = target
+
+    valid = ~np.isnan(matrix).any(axis=1) & base.notna().all(axis=1).to_numpy()
+    return result, valid
+
+
+def engineer_panel_features(panel: pd.DataFrame, config: Dict, symbol_col: str = 'symbol',
+                            columns: Optional[List[str]] = None,
+                            block_symbols: Optional[int] = PANEL_BLOCK_SYMBOLS) -> pd.DataFrame:
+    """
+    Engineer features for many symbols in vectorized blocks
+
+    Each block of symbols is laid out as a (time x symbol) grid in which
+    every symbol starts at row 0 and shorter histories are padded with NaN
+    at the end. Each kernel then runs once over the block's grid; because
+    padding only ever follows a symbol's real bars, warm-up periods and
+    ragged histories behave exactly as they do per symbol. The kernels
+    reduce every column in the same order as a 1D series, so the output
+    is bit-for-bit identical to the per-symbol runs.
+
+    Peak memory is about longest history x block_symbols x features floats,
+    so a universe of thousands of tickers never needs one dense grid.
+
+    Args:
+        panel: Long-format DataFrame with symbol_col plus date/OHLCV columns
+        config: Feature engineering configuration
+        symbol_col: Name of the symbol column
+        columns: Optional feature subset (see engineer_features)
+        block_symbols: Symbols per grid (None = all in one grid)
+
+    Returns:
+        DataFrame equal to concatenating engineer_features per symbol,
+        ordered by symbol then date
+    """
+    if columns is not None and list(columns) == get_output_feature_columns(panel, config):
+        columns = None
+
+    print(f"Starting panel feature engineering...")
+    print(f"Input shape: {panel.shape}")
+
+    panel = panel.sort_values([symbol_col, 'date'], kind='mergesort').reset_index(drop=True)
+    panel['date'] = pd.to_datetime(panel['date'])
+
+    # Symbols are contiguous after the sort, so a block is a row slice
+    codes, symbols = pd.factorize(panel[symbol_col], sort=True)
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(symbols)))])
+    block_symbols = max(1, block_symbols or len(symbols))
+
+    results = []
+    for first in range(0, len(symbols), block_symbols):
+        last = min(first + block_symbols, len(symbols))
+        block = panel.iloc[bounds[first]:bounds[last]]
+        results.append(_engineer_panel_block(block, codes[bounds[first]:bounds[last]] - first, config, columns))
+
+    result = pd.concat(results) if results else _engineer_panel_block(panel, codes, config, columns)
+    print(f"Final shape: {result.shape}")
+
+    return result
+
+
+def _engineer_panel_block(block: pd.DataFrame, codes: np.ndarray, config: Dict,
+                          columns: Optional[List[str]]) -> pd.DataFrame:
+    """
+    Engineer one block of symbols on a (time x symbol) grid
+
+    Args:
+        block: Rows of the block's symbols, sorted by symbol then date
+        codes: Symbol index (0-based within the block) of every row
+        config: Feature engineering configuration
+        columns: Optional feature subset
+
+    Returns:
+        Engineered rows of the block (NaN rows dropped), indexed by each
+        bar's position in its symbol's history
+    """
+    # Row position of every bar inside its symbol's history
+    lengths = np.bincount(codes) if len(codes) else np.zeros(0, dtype=int)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    position = np.arange(len(block)) - starts[codes]
+    grid_shape = (int(lengths.max()) if len(block) else 0, len(lengths))
+
+    def to_grid(values, fill):
+        grid = np.full(grid_shape, fill, dtype=values.dtype)
+        grid[position, codes] = values
+        return grid
+
+    block_sources = extract_sources(block)
+    sources = {
+        name: to_grid(values, np.datetime64('NaT') if name == 'date' else np.nan)
+        for name, values in block_sources.items()
+    }
+    print(f"Panel grid: {grid_shape[0]} rows x {grid_shape[1]} symbols")
+
+    computed, base = _split_feature_columns(block, config, columns)
+    matrix = compute_features(sources, computed)[position, codes]
+
+    target_type = config.get('target_type', 'open_to_close')
+    target = create_target_array(sources['open'], sources['close'], target_type)[position, codes]
+
+    result, valid = _assemble_features(base, matrix, computed, columns, target)
+    result.index = position
+
+    print(f"Dropped {int((~valid).sum())} rows with NaN values")
+    return result[valid]
+
+
+def iter_engineered_chunks(chunks: Iterable[pd.DataFrame], config: Dict,
+                           columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Engineer features over a date-ordered stream of OHLCV chunks
+
+    Each chunk is evaluated together with the last `overlap` raw rows of the
+    previous one (the plan's window lookback plus the target's lookahead)
+    while EMA/MACD/OBV resume from values carried between chunks, so memory
+    stays proportional to the chunk size. Concatenating the yielded frames
+    gives exactly engineer_features(full_history, config, columns=columns),
+    index included.
+
+    Args:
+        chunks: DataFrames with date/OHLCV columns, consecutive and sorted by date
+        config: Feature engineering configuration
+        columns: Optional feature subset (see engineer_features)
+
+    Yields:
+        Engineered rows (NaN rows dropped) for each processed chunk
+
+    Raises:
+        ValueError: If the chunks are not in date order
+    """
+    state = None
+    buffer = None
+    offset = 0  # absolute row position of buffer's first row
+    started = False
+    last_date = None
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = chunk.copy()
+        chunk['date'] = pd.to_datetime(chunk['date'])
+        dates = chunk['date'].to_numpy()
+        if (np.diff(dates) < np.timedelta64(0)).any() or (last_date is not None and dates[0] < last_date):
+            raise ValueError("Chunks must be sorted by date")
+        last_date = dates[-1]
+
+        if state is None:
+            # Resolve the column plan once from the first chunk's layout
+            if columns is not None and list(columns) == get_output_feature_columns(chunk, config):
+                columns = None
+            computed, _ = _split_feature_columns(chunk, config, columns)
+            overlap = plan_lookback(computed, resumable=True) + TARGET_LOOKAHEAD
+            state = {'overlap': overlap, 'values': {}}
+
+        buffer = chunk if buffer is None else pd.concat([buffer, chunk], ignore_index=True)
+
+        # Need rows beyond the overlap so the carried values are exact
+        if len(buffer) <= state['overlap']:
+            continue
+
+        yield _engineer_chunk(buffer, config, columns, state, offset, started, final=False)
+        started = True
+
+        consumed = len(buffer) - state['overlap']
+        buffer = buffer.iloc[consumed:].reset_index(drop=True)
+        offset += consumed
+
+    if buffer is not None:
+        yield _engineer_chunk(buffer, config, columns, state, offset, started, final=True)
+
+
+def _engineer_chunk(frame: pd.DataFrame, config: Dict, columns: Optional[List[str]], state: Dict,
+                    offset: int, started: bool, final: bool) -> pd.DataFrame:
+    """
+    Engineer one chunk (with its overlap rows) and keep the rows it owns
+
+    A chunk owns its rows after the overlap (all rows for the first chunk),
+    except the trailing TARGET_LOOKAHEAD rows whose target needs the next
+    chunk; the final chunk owns everything up to the end.
+    """
+    computed, base = _split_feature_columns(frame, config, columns)
+    matrix = compute_features(extract_sources(frame), computed, state=state)
+
+    target_type = config.get('target_type', 'open_to_close')
+    target = create_target_array(frame['open'].to_numpy(dtype=float), frame['close'].to_numpy(dtype=float),
+                                 target_type)
+
+    result, valid = _assemble_features(base, matrix, computed, columns, target)
+    result.index = np.arange(offset, offset + len(frame))
+
+    begin = state['overlap'] - TARGET_LOOKAHEAD if started else 0
+    end = len(frame) if final else len(frame) - TARGET_LOOKAHEAD
+    return result.iloc[begin:end][valid[begin:end]]
+
+
+def _engineer_from_row(df: pd.DataFrame, config: Dict, columns: Optional[List[str]],
+                       start_row: int) -> pd.DataFrame:
+    """
+    Engineer only the rows from start_row on, exactly as the full history would
+
+    The frame is treated as two chunks of iter_engineered_chunks: the
+    history before the window, of which only the recursive indicators
+    (EMA/MACD signal/OBV) and their inputs are computed, just to carry
+    their values, and the window with its window-lookback overlap, which
+    gets every feature. Windowed features then cost in proportion to the
+    window rather than the whole history.
+    """
+    computed, _ = _split_feature_columns(df, config, columns)
+    overlap = plan_lookback(computed, resumable=True) + TARGET_LOOKAHEAD
+    first = start_row - overlap
+
+    if first <= 0:
+        result = engineer_features(df, config, columns=columns)
+        return result[result.index >= start_row]
+
+    state = {'overlap': overlap, 'values': {}}
+    recursive = [name for name in plan_features(computed) if FEATURE_REGISTRY[name].lookback is None]
+    if recursive:
+        compute_features(extract_sources(df.iloc[:first + overlap]), recursive, state=state)
+
+    window = df.iloc[first:].reset_index(drop=True)
+    result = _engineer_chunk(window, config, columns, state, offset=first, started=True, final=True)
+    return result[result.index >= start_row]
+
+
+def engineer_features_reference(df: pd.DataFrame, config: Dict) -> pd.DataFrame:
+    """
+    Reference feature engineering on pandas columns
+
+    Builds the frame one column assignment at a time through the add_*
+    helpers. Kept as the readable specification the NumPy engine is
+    checked against; engineer_features is the production entry point.
+
     Args:
         df: DataFrame with OHLCV data (columns: date, open, high, low, close, volume)
         config: Configuration dictionary with:
@@ -462,7 +1007,7 @@ def get_feature_list(df: pd.DataFrame, exclude_cols: List[str] = None) -> List[s
     if exclude_cols is None:
         exclude_cols = []
 
-    exclude = ['date', 'open', 'high', 'low', 'close', 'volume', 'target'] + exclude_cols
+    exclude = BASE_COLUMNS + ['target'] + exclude_cols
 
     features = [col for col in df.columns if col not in exclude]
 
@@ -0,0 +1,212 @@
+"""
+NumPy kernels for technical indicators
+
+Array counterparts of the pandas operations used in feature_engineering.
+Every kernel works along axis 0, so it accepts a 1D price series or a 2D
+(time x symbol) block, and reproduces pandas NaN semantics: a rolling
+window is NaN unless all of its values are present.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+
+def shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """
+    Shift values along axis 0, filling the gap with NaN (pandas .shift)
+
+    Args:
+        x: Input array
+        periods: Number of rows to shift (negative shifts backwards)
+
+    Returns:
+        Shifted float array
+    """
+    out = np.full(x.shape, np.nan)
+    if periods == 0:
+        out[:] = x
+    elif periods > 0:
+        out[periods:] = x[:-periods]
+    else:
+        out[:periods] = x[-periods:]
+    return out
+
+
+def diff(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """
+    First difference along axis 0 (pandas .diff)
+    """
+    return x - shift(x, periods)
+
+
+def pct_change(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """
+    Fractional change along axis 0 (pandas .pct_change)
+    """
+    return x / shift(x, periods) - 1
+
+
+def _rolling(x: np.ndarray, window: int, reducer, **kwargs) -> np.ndarray:
+    """
+    Apply a reduction over trailing windows, NaN for incomplete windows
+    """
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        windows = sliding_window_view(x, window, axis=0)
+        out[window - 1:] = reducer(windows, axis=-1, **kwargs)
+    return out
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing moving average (pandas .rolling(window).mean())
+    """
+    return rolling_sum(x, window) / window
+
+
+def rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing moving sum (pandas .rolling(window).sum())
+
+    Added up one lag at a time, so every window is summed in the same order
+    whatever the array's shape or strides: a column of a 2D block matches
+    the 1D series bit for bit, which a reduction over the window view
+    doesn't guarantee.
+    """
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        n = len(x) - window + 1
+        total = np.array(x[:n], dtype=float)
+        for lag in range(1, window):
+            total += x[lag:lag + n]
+        out[window - 1:] = total
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing sample standard deviation (pandas .rolling(window).std())
+
+    Two-pass: the window means first, then the squared deviations from
+    them, accumulated one lag at a time rather than with np.std over the
+    window view, which would materialize a (rows x window) temporary.
+    """
+    out = np.full(x.shape, np.nan)
+    if len(x) < window:
+        return out
+
+    mean = rolling_mean(x, window)[window - 1:]
+    squares = np.zeros(mean.shape)
+    for lag in range(window):
+        deviation = x[lag:lag + len(mean)] - mean
+        squares += deviation * deviation
+    out[window - 1:] = np.sqrt(squares / (window - 1))
+    return out
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing minimum (pandas .rolling(window).min())
+    """
+    return _rolling(x, window, np.min)
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing maximum (pandas .rolling(window).max())
+    """
+    return _rolling(x, window, np.max)
+
+
+def ewm_mean(x: np.ndarray, span: int, initial=None) -> np.ndarray:
+    """
+    Exponential moving average (pandas .ewm(span=span, adjust=False).mean())
+
+    The recursion y[t] = (1 - a) * y[t-1] + a * x[t] is evaluated as an IIR
+    filter. Leading NaNs (ragged panel columns) stay NaN and the average is
+    seeded with each column's first valid value, as pandas does.
+
+    Args:
+        x: Input array (1D or 2D, no NaN after the first valid value)
+        span: EMA span
+        initial: EMA value of the row preceding x when continuing a series
+            chunk by chunk; the result is then identical to filtering the
+            whole series in one call
+
+    Returns:
+        EMA values
+    """
+    alpha = 2.0 / (span + 1.0)
+    x = np.asarray(x, dtype=float)
+    if len(x) == 0:
+        return x.copy()
+
+    if initial is not None and not np.isnan(initial).any():
+        zi = np.expand_dims((1.0 - alpha) * np.asarray(initial, dtype=float), 0)
+        out, _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=0, zi=zi)
+        return out
+
+    valid = ~np.isnan(x)
+
+    # Seed every column with its first valid value, then re-mask the warm-up
+    first_idx = valid.argmax(axis=0)
+    seed = np.take_along_axis(x, np.expand_dims(first_idx, 0), axis=0)[0]
+    filled = np.where(np.cumsum(valid, axis=0) == 0, seed, x)
+
+    zi = np.expand_dims((1.0 - alpha) * np.asarray(seed), 0)
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], filled, axis=0, zi=zi)
+    out[np.cumsum(valid, axis=0) == 0] = np.nan
+    return out
+
+
+def cumsum(x: np.ndarray, initial=None) -> np.ndarray:
+    """
+    Cumulative sum along axis 0 treating NaN as zero (pandas .fillna(0).cumsum())
+
+    Args:
+        x: Input array
+        initial: Running total of the rows preceding x when continuing a
+            series chunk by chunk (added in sequence, so results match a
+            single call over the whole series exactly)
+    """
+    x = np.nan_to_num(x, nan=0.0)
+    if initial is None:
+        return np.cumsum(x, axis=0)
+    head = np.expand_dims(np.asarray(initial, dtype=float), 0)
+    return np.cumsum(np.concatenate([head, x]), axis=0)[1:]
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Relative Strength Index, matching feature_engineering.calculate_rsi
+    """
+    delta = diff(close)
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    True range, skipping the missing previous close on the first bar
+    """
+    prev_close = shift(close, 1)
+    ranges = np.fmax(high - low, np.abs(high - prev_close))
+    return np.fmax(ranges, np.abs(low - prev_close))
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Average True Range, matching feature_engineering.calculate_atr
+    """
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def to_float(x: np.ndarray) -> np.ndarray:
+    """
+    Cast a boolean condition to 0/1 floats (pandas .astype(int))
+    """
+    return np.asarray(x, dtype=float)
@@ -0,0 +1,339 @@
+"""
+Declarative feature registry and planner
+
+Every engineered column and every shared intermediate (previous close,
+daily returns, the 20-day close average, EMAs, ...) is declared once as a
+node with its dependencies. Given the output columns a model needs, the
+planner walks the dependency graph, computes each required node exactly
+once in topological order and skips everything else.
+
+Each node also declares its lookback: how many earlier rows of its inputs
+one output row depends on (None for recursive indicators such as EMA and
+OBV, whose value depends on the whole history). plan_lookback() adds these
+up along the dependency graph so loaders can read just enough warm-up.
+Recursive nodes accept an `initial` keyword (the value of the preceding
+row), which lets compute_features continue a series chunk by chunk.
+"""
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import feature_kernels as fk
+
+# Raw inputs supplied by the caller rather than computed
+SOURCE_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'date')
+
+
+class FeatureNode(NamedTuple):
+    name: str
+    deps: Tuple[str, ...]
+    compute: Callable[..., np.ndarray]
+    output: bool
+    lookback: Optional[int]
+
+
+FEATURE_REGISTRY: Dict[str, FeatureNode] = {}
+
+
+def register(name: str, deps: Iterable[str], compute: Callable[..., np.ndarray], output: bool = True,
+             lookback: Optional[int] = 0) -> None:
+    """
+    Declare a feature or intermediate node
+
+    Args:
+        name: Column or intermediate name
+        deps: Names of the nodes/sources passed positionally to compute
+        compute: Function of the dependency arrays returning the node values
+        output: Whether the node may be requested as a feature column
+        lookback: Earlier dependency rows each output row reads
+            (e.g. window - 1 for a rolling window). None marks a recursive
+            node whose compute takes an `initial` keyword to resume from
+    """
+    deps = tuple(deps)
+    for dep in deps:
+        if dep not in FEATURE_REGISTRY and dep not in SOURCE_COLUMNS:
+            raise ValueError(f"Feature '{name}' depends on unknown node '{dep}'")
+    FEATURE_REGISTRY[name] = FeatureNode(name, deps, compute, output, lookback)
+
+
+def _pct_of_open(a, b, open_):
+    return (a - b) / open_ * 100
+
+
+def _price_vs(close, average):
+    return (close - average) / average * 100
+
+
+# Shared intermediates
+register('prev_close', ['close'], lambda close: fk.shift(close, 1), output=False, lookback=1)
+register('returns', ['close'], lambda close: fk.pct_change(close, 1), output=False, lookback=1)
+register('close_open_max', ['close', 'open'], np.fmax, output=False)
+register('close_open_min', ['close', 'open'], np.fmin, output=False)
+register('close_sma_20', ['close'], lambda close: fk.rolling_mean(close, 20), output=False, lookback=19)
+register('close_std_20', ['close'], lambda close: fk.rolling_std(close, 20), output=False, lookback=19)
+register('low_min_14', ['low'], lambda low: fk.rolling_min(low, 14), output=False, lookback=13)
+register('high_max_14', ['high'], lambda high: fk.rolling_max(high, 14), output=False, lookback=13)
+register('month_start', ['date'], lambda date: date.astype('datetime64[M]'), output=False)
+
+# 1. Intraday features
+register('gap_pct', ['open', 'prev_close'], lambda open_, prev: (open_ - prev) / prev * 100)
+register('gap_direction', ['gap_pct'], lambda gap: fk.to_float(gap > 0))
+register('gap_size', ['gap_pct'], np.abs)
+register('intraday_range_pct', ['high', 'low', 'open'], _pct_of_open)
+register('intraday_high_pct', ['high', 'open', 'open'], _pct_of_open)
+register('intraday_low_pct', ['open', 'low', 'open'], _pct_of_open)
+register('close_position', ['close', 'low', 'high'],
+         lambda close, low, high: (close - low) / (high - low + 0.0001))
+register('body_size_pct', ['close', 'open'], lambda close, open_: np.abs(close - open_) / open_ * 100)
+register('upper_shadow_pct', ['high', 'close_open_max', 'open'], _pct_of_open)
+register('lower_shadow_pct', ['close_open_min', 'low', 'open'], _pct_of_open)
+register('open_to_close_pct', ['close', 'open', 'open'], _pct_of_open)
+register('open_to_high_pct', ['intraday_high_pct'], lambda values: values)
+register('open_to_low_pct', ['intraday_low_pct'], lambda values: values)
+register('is_green_candle', ['close', 'open'], lambda close, open_: fk.to_float(close > open_))
+register('is_red_candle', ['close', 'open'], lambda close, open_: fk.to_float(close < open_))
+register('is_doji', ['body_size_pct'], lambda body: fk.to_float(body < 0.1))
+register('body_to_range_ratio', ['body_size_pct', 'intraday_range_pct'],
+         lambda body, intraday_range: body / (intraday_range + 0.0001))
+
+# 2. Technical indicators
+register('sma_10', ['close'], lambda close: fk.rolling_mean(close, 10), lookback=9)
+register('price_vs_sma10', ['close', 'sma_10'], _price_vs)
+for _period in (50, 200):
+    register(f'sma_{_period}', ['close'], lambda close, p=_period: fk.rolling_mean(close, p), lookback=_period - 1)
+    register(f'price_vs_sma{_period}', ['close', f'sma_{_period}'], _price_vs)
+    register(f'above_sma{_period}', ['close', f'sma_{_period}'], lambda close, sma: fk.to_float(close > sma))
+
+for _span in (12, 26):
+    register(f'ema_{_span}', ['close'], lambda close, s=_span, initial=None: fk.ewm_mean(close, s, initial),
+             lookback=None)
+    register(f'price_vs_ema{_span}', ['close', f'ema_{_span}'], _price_vs)
+
+for _period in (7, 14, 21):
+    register(f'rsi_{_period}', ['close'], lambda close, p=_period: fk.rsi(close, p), lookback=_period)
+register('rsi_oversold', ['rsi_14'], lambda rsi: fk.to_float(rsi < 30))
+register('rsi_overbought', ['rsi_14'], lambda rsi: fk.to_float(rsi > 70))
+register('rsi_neutral', ['rsi_14'], lambda rsi: fk.to_float((rsi >= 40) & (rsi <= 60)))
+
+register('macd', ['ema_12', 'ema_26'], lambda fast, slow: fast - slow)
+register('macd_positive', ['macd'], lambda macd: fk.to_float(macd > 0))
+register('macd_signal', ['macd'], lambda macd, initial=None: fk.ewm_mean(macd, 9, initial), lookback=None)
+register('macd_histogram', ['macd', 'macd_signal'], lambda macd, signal: macd - signal)
+register('macd_histogram_positive', ['macd_histogram'], lambda hist: fk.to_float(hist > 0))
+register('macd_histogram_increasing', ['macd_histogram'],
+         lambda hist: fk.to_float(hist > fk.shift(hist, 1)), lookback=1)
+
+register('bb_middle', ['close_sma_20'], lambda middle: middle)
+register('bb_upper', ['close_sma_20', 'close_std_20'], lambda middle, std: middle + (std * 2))
+register('bb_lower', ['close_sma_20', 'close_std_20'], lambda middle, std: middle - (std * 2))
+register('bb_width_pct', ['bb_upper', 'bb_lower', 'close_sma_20'],
+         lambda upper, lower, middle: (upper - lower) / middle * 100)
+register('bb_squeeze', ['bb_width_pct'], lambda width: fk.to_float(width < fk.rolling_mean(width, 20)), lookback=19)
+register('bb_position', ['close', 'bb_lower', 'bb_upper'],
+         lambda close, lower, upper: (close - lower) / (upper - lower + 0.0001))
+register('bb_above_upper', ['close', 'bb_upper'], lambda close, upper: fk.to_float(close > upper))
+register('bb_below_lower', ['close', 'bb_lower'], lambda close, lower: fk.to_float(close < lower))
+
+register('atr', ['high', 'low', 'close'], lambda high, low, close: fk.atr(high, low, close, 14), lookback=14)
+register('atr_pct', ['atr', 'close'], lambda atr, close: atr / close * 100)
+register('volatility_high', ['atr_pct'], lambda atr_pct: fk.to_float(atr_pct > fk.rolling_mean(atr_pct, 20)),
+         lookback=19)
+
+register('stochastic_k', ['close', 'low_min_14', 'high_max_14'],
+         lambda close, low_min, high_max: 100 * (close - low_min) / (high_max - low_min + 0.0001))
+register('stochastic_d', ['stochastic_k'], lambda stoch_k: fk.rolling_mean(stoch_k, 3), lookback=2)
+
+# 3. Volume indicators
+register('volume_sma_20', ['volume'], lambda volume: fk.rolling_mean(volume, 20), lookback=19)
+register('volume_ratio', ['volume', 'volume_sma_20'], lambda volume, sma: volume / (sma + 1))
+register('volume_surge', ['volume_ratio'], lambda ratio: fk.to_float(ratio > 1.5))
+register('volume_dry', ['volume_ratio'], lambda ratio: fk.to_float(ratio < 0.5))
+register('obv_flow', ['close', 'volume'], lambda close, volume: np.sign(fk.diff(close)) * volume,
+         output=False, lookback=1)
+register('obv', ['obv_flow'], lambda flow, initial=None: fk.cumsum(flow, initial), lookback=None)
+register('obv_sma', ['obv'], lambda obv: fk.rolling_mean(obv, 20), lookback=19)
+register('obv_increasing', ['obv'], lambda obv: fk.to_float(obv > fk.shift(obv, 1)), lookback=1)
+
+# 4. Multi-timeframe features
+register('return_1d', ['returns'], lambda returns: returns * 100)
+for _periods in (2, 3, 5, 10, 20):
+    register(f'return_{_periods}d', ['close'], lambda close, p=_periods: fk.pct_change(close, p) * 100,
+             lookback=_periods)
+register('volatility_5d', ['returns'], lambda returns: fk.rolling_std(returns, 5) * 100, lookback=4)
+register('volatility_20d', ['returns'], lambda returns: fk.rolling_std(returns, 20) * 100, lookback=19)
+register('trend_strength_10d', ['close', 'sma_10'], lambda close, sma: close / sma)
+register('trend_strength_20d', ['close', 'close_sma_20'], lambda close, sma: close / sma)
+register('higher_highs_3d', ['high'], lambda high: fk.rolling_sum(fk.to_float(high > fk.shift(high, 1)), 3),
+         lookback=3)
+register('lower_lows_3d', ['low'], lambda low: fk.rolling_sum(fk.to_float(low < fk.shift(low, 1)), 3),
+         lookback=3)
+register('consecutive_up', ['close', 'prev_close'], lambda close, prev: fk.to_float(close > prev))
+register('consecutive_down', ['close', 'prev_close'], lambda close, prev: fk.to_float(close < prev))
+
+# 5. Time features (1970-01-01 was a Thursday)
+register('day_of_week', ['date'], lambda date: ((date.astype(np.int64) + 3) % 7).astype(float))
+for _day, _name in enumerate(['is_monday', 'is_tuesday', 'is_wednesday', 'is_thursday', 'is_friday']):
+    register(_name, ['day_of_week'], lambda dow, d=_day: fk.to_float(dow == d))
+register('week_of_month', ['date', 'month_start'],
+         lambda date, month_start: ((date - month_start).astype(np.int64) // 7 + 1).astype(float))
+register('month', ['month_start'], lambda month_start: (month_start.astype(np.int64) % 12 + 1).astype(float))
+
+
+def plan_features(columns: Iterable[str]) -> List[str]:
+    """
+    Order the nodes needed for the requested columns
+
+    Args:
+        columns: Requested output columns
+
+    Returns:
+        Node names in dependency (topological) order, each listed once
+
+    Raises:
+        KeyError: If a column is not a registered output
+    """
+    order = []
+    seen = set()
+
+    def visit(name):
+        if name in seen or name in SOURCE_COLUMNS:
+            return
+        node = FEATURE_REGISTRY[name]
+        for dep in node.deps:
+            visit(dep)
+        seen.add(name)
+        order.append(name)
+
+    for column in columns:
+        node = FEATURE_REGISTRY.get(column)
+        if node is None or not node.output:
+            raise KeyError(f"Unknown feature column: {column}")
+        visit(column)
+
+    return order
+
+
+def _lookback_totals(plan: List[str], resumable: bool) -> Dict[str, Optional[int]]:
+    """
+    Accumulated lookback of every planned node
+
+    With resumable=True recursive nodes count as lookback 0, since a chunk
+    can resume them from the carried value of the preceding row.
+    """
+    totals = {name: 0 for name in SOURCE_COLUMNS}
+    for name in plan:
+        node = FEATURE_REGISTRY[name]
+        dep_totals = [totals[dep] for dep in node.deps]
+        if None in dep_totals or (node.lookback is None and not resumable):
+            totals[name] = None
+        else:
+            totals[name] = (node.lookback or 0) + max(dep_totals, default=0)
+    return totals
+
+
+def plan_lookback(columns: Iterable[str], resumable: bool = False) -> Optional[int]:
+    """
+    Rows of history needed before the first row whose features must be exact
+
+    Args:
+        columns: Requested output columns
+        resumable: Assume recursive nodes resume from carried state
+            (chunked evaluation) instead of needing the whole history
+
+    Returns:
+        Longest accumulated lookback over the plan, or None if any requested
+        column depends on an unbounded (recursive) indicator
+    """
+    columns = list(columns)
+    totals = _lookback_totals(plan_features(columns), resumable)
+
+    requested = [totals[column] for column in columns]
+    if None in requested:
+        return None
+    return max(requested, default=0)
+
+
+def compute_features(sources: Dict[str, np.ndarray], columns: List[str],
+                     state: Optional[Dict] = None) -> np.ndarray:
+    """
+    Execute the plan for the requested columns into one matrix
+
+    Intermediates are dropped as soon as their last consumer has run, so
+    peak memory stays close to the output matrix itself.
+
+    For chunked evaluation pass the same state dict for consecutive chunks,
+    each chunk starting `state['overlap']` rows (at least
+    plan_lookback(columns, resumable=True)) before the previous one ended.
+    Recursive nodes then resume from the value carried in state['values']
+    and every row past the overlap matches a single call over the whole
+    series exactly.
+
+    Args:
+        sources: Arrays for open/high/low/close/volume (float) and date (datetime64[D])
+        columns: Requested output columns, in matrix order
+        state: Optional carry between chunks: {'overlap': int, 'values': {}}
+
+    Returns:
+        Column-major float matrix with one column per requested feature
+    """
+    plan = plan_features(columns)
+
+    remaining_uses = {}
+    for name in plan:
+        for dep in FEATURE_REGISTRY[name].deps:
+            remaining_uses[dep] = remaining_uses.get(dep, 0) + 1
+
+    n_rows = len(sources['close'])
+    matrix = np.empty((n_rows,) + sources['close'].shape[1:] + (len(columns),), dtype=float, order='F')
+    positions = {}
+    for i, column in enumerate(columns):
+        positions.setdefault(column, []).append(i)
+
+    totals = _lookback_totals(plan, resumable=True) if state is not None else {}
+
+    values = dict(sources)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in plan:
+            node = FEATURE_REGISTRY[name]
+            if state is not None and node.lookback is None:
+                result = _resume_node(node, values, totals, state, n_rows)
+            else:
+                result = node.compute(*[values[dep] for dep in node.deps])
+            for i in positions.get(name, ()):
+                matrix[..., i] = result
+
+            for dep in node.deps:
+                remaining_uses[dep] -= 1
+                if remaining_uses[dep] == 0 and dep not in SOURCE_COLUMNS:
+                    del values[dep]
+            if remaining_uses.get(name, 0) > 0:
+                values[name] = result
+
+    return matrix
+
+
+def _resume_node(node: FeatureNode, values: Dict[str, np.ndarray], totals: Dict[str, Optional[int]],
+                 state: Dict, n_rows: int) -> np.ndarray:
+    """
+    Evaluate a recursive node for one chunk, continuing from the previous chunk
+
+    The node's inputs are exact from row `exact` (their accumulated
+    lookback) onwards, so the recursion restarts there from the carried
+    value. The value the next chunk will resume from (the row before its
+    own `exact` row) is stored back into state.
+    """
+    exact = max([totals[dep] for dep in node.deps], default=0)
+    initial = state['values'].get(node.name)
+
+    if initial is None:
+        # First chunk: nothing to resume, evaluate from the start
+        result = node.compute(*[values[dep] for dep in node.deps])
+    else:
+        result = np.full((n_rows,) + values[node.deps[0]].shape[1:], np.nan)
+        result[exact:] = node.compute(*[values[dep][exact:] for dep in node.deps], initial=initial)
+
+    carry_row = n_rows - state['overlap'] + exact - 1
+    if 0 <= carry_row < n_rows:
+        state['values'][node.name] = result[carry_row].copy()
+    return result
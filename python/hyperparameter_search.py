@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Parallel hyperparameter search for one symbol
+
+Builds the feature matrix once, stores it with dmatrix_cache.store_arrays
+(in DMATRIX_CACHE_DIR when the disk cache is on, else a temporary
+directory) and memory-maps it read-only in every pool process, so
+candidates never reload prices or recompute features. Each process
+quantizes the training slice once and reuses it for every trial.
+Candidates are trained on the older part of the training split and scored
+by logloss on the time-ordered validation slice after it; the test split
+is only used to report the winner's accuracy.
+
+Methods (config['search']['method']):
+    grid       every combination of the listed values, early stopping per candidate
+    random     n_candidates samples, early stopping per candidate
+    halving    successive halving: all candidates get min_rounds trees, the best
+               1/eta keep boosting (eta times more rounds), up to max_rounds
+    hyperband  several halving brackets trading candidates against rounds
+
+Halving continues each survivor's booster instead of retraining it.
+
+The leaderboard and the best configuration (in the model metadata format,
+so it can be passed straight back to train_model.py) are written to
+models/{SYMBOL}_search.json.
+
+Usage: python hyperparameter_search.py AAPL ['{"search": {"method": "hyperband"}, "search_space": {...}}']
+"""
+
+import sys
+import json
+import contextlib
+import math
+import itertools
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import xgboost as xgb
+
+from config import (
+    DMATRIX_CACHE_DIR,
+    DMATRIX_CACHE_DISK,
+    HYPERPARAMETER_SEARCH,
+    MODELS_DIR,
+    SEARCH_SPACE,
+)
+from dmatrix_cache import get_quantile_dmatrix, load_arrays, store_arrays
+from feature_engineering import get_feature_list
+from train_model import booster_params, load_feature_frame
+from utils import calculate_metrics, split_threads
+
+# Per-process training and validation matrices (set by _init_worker)
+_SHARED = {}
+
+
+def _init_worker(cache_dir: str, key: str, n_train: int, n_dev: int, n_jobs: int) -> None:
+    """
+    Pool initializer: map the shared feature matrix and quantize it once
+    """
+    X, y, _ = load_arrays(key, Path(cache_dir))
+    _SHARED['dtrain'] = get_quantile_dmatrix(X[:n_train], y[:n_train], n_jobs=n_jobs)
+    _SHARED['dvalid'] = get_quantile_dmatrix(X[n_train:n_dev], y[n_train:n_dev],
+                                             ref=_SHARED['dtrain'], n_jobs=n_jobs)
+    _SHARED['y_valid'] = np.asarray(y[n_train:n_dev])
+    _SHARED['n_jobs'] = n_jobs
+
+
+def _evaluate(task: Dict) -> Dict:
+    """
+    Train one candidate up to task['rounds'] trees and score it on validation
+
+    Continues from task['model'] (a raw booster) when given.
+    """
+    started = time.time()
+    model = xgb.Booster(model_file=bytearray(task['model'])) if task.get('model') else None
+    done = model.num_boosted_rounds() if model is not None else 0
+
+    evals_result = {}
+    booster = xgb.train(
+        booster_params(task['hyperparameters'], _SHARED['n_jobs']),
+        _SHARED['dtrain'],
+        num_boost_round=max(task['rounds'] - done, 0),
+        evals=[(_SHARED['dvalid'], 'validation')],
+        evals_result=evals_result,
+        early_stopping_rounds=task.get('early_stopping_rounds'),
+        xgb_model=model,
+        verbose_eval=False,
+    )
+
+    if task.get('early_stopping_rounds'):
+        best_iteration = int(booster.best_iteration)
+        loss = float(booster.best_score)
+    else:
+        # Best round so far, including the rounds of earlier rungs
+        losses = evals_result['validation']['logloss']
+        best_iteration = done + int(np.argmin(losses))
+        loss = float(losses[best_iteration - done])
+        previous = task.get('previous_best')
+        if previous is not None and previous[0] <= loss:
+            loss, best_iteration = previous
+
+    proba = booster.predict(_SHARED['dvalid'], iteration_range=(0, best_iteration + 1))
+    accuracy = float(np.mean((proba > 0.5).astype(int) == _SHARED['y_valid']))
+
+    return {
+        'id': task['id'],
+        'validation_logloss': loss,
+        'validation_accuracy': accuracy,
+        'rounds': int(booster.num_boosted_rounds()),
+        'best_iteration': best_iteration,
+        'seconds': round(time.time() - started, 4),
+        'model': bytes(booster.save_raw()) if task.get('keep_model') else None,
+    }
+
+
+def grid_candidates(space: Dict) -> List[Dict]:
+    """
+    Every combination of the listed values
+    """
+    for name, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"Grid search needs a list of values for '{name}'")
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def sample_candidates(space: Dict, n: int, rng: np.random.Generator) -> List[Dict]:
+    """
+    Draw n random candidates (uniform over lists, uniform/log-uniform over ranges)
+    """
+    candidates = []
+    for _ in range(n):
+        candidate = {}
+        for name, values in space.items():
+            if isinstance(values, list):
+                candidate[name] = values[rng.integers(len(values))]
+                continue
+            low, high = float(values['low']), float(values['high'])
+            if values.get('log'):
+                value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                value = float(rng.uniform(low, high))
+            candidate[name] = int(round(value)) if values.get('int') else value
+        candidates.append(candidate)
+    return candidates
+
+
+class _Search:
+    """
+    Submits candidate evaluations to the pool and records every result
+    """
+
+    def __init__(self, executor: ProcessPoolExecutor, base_hyperparameters: Dict, options: Dict):
+        self.executor = executor
+        self.base = base_hyperparameters
+        self.options = options
+        self.candidates: Dict[int, Dict] = {}
+        self.results: Dict[int, Dict] = {}
+        self.finalists = set()  # candidates that got the full budget
+        self.evaluations = 0
+
+    def add(self, params: Dict, bracket: Optional[int] = None) -> int:
+        candidate_id = len(self.candidates)
+        self.candidates[candidate_id] = {'params': params, 'bracket': bracket}
+        return candidate_id
+
+    def evaluate(self, ids: List[int], rounds: int, early_stopping_rounds: Optional[int] = None,
+                 keep_model: bool = False) -> List[Dict]:
+        tasks = []
+        for candidate_id in ids:
+            previous = self.results.get(candidate_id, {})
+            tasks.append({
+                'id': candidate_id,
+                'hyperparameters': {**self.base, **self.candidates[candidate_id]['params']},
+                'rounds': rounds,
+                'early_stopping_rounds': early_stopping_rounds,
+                'model': previous.get('model'),
+                'previous_best': ((previous['validation_logloss'], previous['best_iteration'])
+                                  if previous.get('model') else None),
+                'keep_model': keep_model,
+            })
+
+        results = list(self.executor.map(_evaluate, tasks))
+        for result in results:
+            self.results[result['id']] = result
+        self.evaluations += len(results)
+        return results
+
+    def full_fit(self, ids: List[int]) -> None:
+        """
+        Train candidates to max_rounds with early stopping (grid/random)
+        """
+        self.evaluate(ids, self.options['max_rounds'], self.options['early_stopping_rounds'])
+        self.finalists.update(ids)
+
+    def successive_halving(self, ids: List[int], min_rounds: int) -> None:
+        """
+        Keep the best 1/eta of the candidates and give them eta times more rounds
+
+        Candidates are ranked by the lowest validation logloss reached so far.
+        """
+        eta, max_rounds = self.options['eta'], self.options['max_rounds']
+        rounds = min(min_rounds, max_rounds)
+        while True:
+            final = rounds >= max_rounds
+            results = self.evaluate(ids, rounds, keep_model=not final)
+            if final:
+                self.finalists.update(ids)
+                break
+            results.sort(key=lambda result: result['validation_logloss'])
+            ids = [result['id'] for result in results[:max(1, len(results) // eta)]]
+            # A single survivor goes straight to the full budget
+            rounds = max_rounds if len(ids) == 1 else min(max_rounds, int(math.ceil(rounds * eta)))
+
+        # Drop the boosters of eliminated candidates
+        for result in self.results.values():
+            result['model'] = None
+
+    def leaderboard(self) -> List[Dict]:
+        """
+        Candidates by validation logloss, those that reached the final rung first
+
+        Every grid/random candidate is a finalist; rounds is only what early
+        stopping kept, so it says nothing about rank. Halving candidates
+        eliminated on an earlier rung were scored on fewer trees and rank
+        after every finalist.
+        """
+        rows = []
+        for candidate_id, result in self.results.items():
+            candidate = self.candidates[candidate_id]
+            rows.append({
+                'candidate': candidate_id,
+                'params': candidate['params'],
+                'bracket': candidate['bracket'],
+                'validation_logloss': result['validation_logloss'],
+                'validation_accuracy': result['validation_accuracy'],
+                'rounds': result['rounds'],
+                'finalist': candidate_id in self.finalists,
+                'best_iteration': result['best_iteration'],
+                'seconds': result['seconds'],
+            })
+        rows.sort(key=lambda row: (not row['finalist'], row['validation_logloss']))
+        for rank, row in enumerate(rows, start=1):
+            row['rank'] = rank
+        return rows
+
+
+def hyperparameter_search(stock_symbol: str, config: Dict, save: bool = True) -> Dict:
+    """
+    Search hyperparameters for one symbol
+
+    Args:
+        stock_symbol: Stock ticker symbol
+        config: Configuration dictionary; 'hyperparameters' are the fixed base
+            values, 'search' overrides HYPERPARAMETER_SEARCH and
+            'search_space' replaces SEARCH_SPACE
+        save: Write models/{SYMBOL}_search.json
+
+    Returns:
+        Dictionary with the leaderboard and the best configuration
+    """
+    options = {**HYPERPARAMETER_SEARCH, **config.get('search', {})}
+    space = config.get('search_space') or SEARCH_SPACE
+    base = dict(config.get('hyperparameters', {}))
+    method = options['method']
+    rng = np.random.default_rng(options['seed'])
+
+    print("\n" + "="*60)
+    print(f"HYPERPARAMETER SEARCH FOR {stock_symbol} ({method})")
+    print("="*60)
+
+    # Build the feature matrix once
+    df_features = load_feature_frame(stock_symbol, config)
+    feature_names = get_feature_list(df_features)
+    X = np.ascontiguousarray(df_features[feature_names].values, dtype=np.float32)
+    y = df_features['target'].values.astype(np.int8)
+
+    # Time-ordered split: train | validation | test
+    n_dev = int(len(X) * base.get('train_test_split', 0.8))
+    n_train = int(n_dev * (1 - options['validation_fraction']))
+    if n_train < 1 or n_dev - n_train < 1 or len(X) - n_dev < 1:
+        raise ValueError(f"Not enough data for a train/validation/test split: {len(X)} rows")
+
+    print(f"Samples: train {n_train}, validation {n_dev - n_train}, test {len(X) - n_dev}")
+
+    if method == 'grid':
+        first_rung = grid_candidates(space)
+    elif method in ('random', 'halving'):
+        first_rung = sample_candidates(space, options['n_candidates'], rng)
+    elif method == 'hyperband':
+        first_rung = None
+    else:
+        raise ValueError(f"Unknown search method: {method}")
+
+    eta, min_rounds, max_rounds = options['eta'], options['min_rounds'], options['max_rounds']
+    s_max = int(math.floor(math.log(max_rounds / min_rounds, eta) + 1e-9))
+    widest = len(first_rung) if first_rung is not None else int(math.ceil(eta ** s_max))
+    workers, n_jobs = split_threads(widest, options.get('workers'))
+
+    started = time.time()
+    with contextlib.ExitStack() as stack:
+        if DMATRIX_CACHE_DISK:
+            shared_dir = str(DMATRIX_CACHE_DIR)
+        else:
+            shared_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='search-'))
+        key = store_arrays(X, y, cache_dir=Path(shared_dir))
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared_dir, key, n_train, n_dev, n_jobs)) as executor:
+            search = _Search(executor, base, options)
+
+            if method in ('grid', 'random'):
+                search.full_fit([search.add(params) for params in first_rung])
+            elif method == 'halving':
+                search.successive_halving([search.add(params) for params in first_rung], min_rounds)
+            else:
+                for bracket in range(s_max, -1, -1):
+                    n = int(math.ceil((s_max + 1) / (bracket + 1) * eta ** bracket))
+                    rounds = int(round(max_rounds * eta ** -bracket))
+                    ids = [search.add(params, bracket) for params in sample_candidates(space, n, rng)]
+                    search.successive_halving(ids, max(1, rounds))
+
+    elapsed = time.time() - started
+    leaderboard = search.leaderboard()
+    best = leaderboard[0]
+
+    # Refit the winner on train + validation and score it on the untouched test split
+    best_hyperparameters = {**base, **best['params'], 'n_estimators': best['best_iteration'] + 1}
+    booster = xgb.train(booster_params(best_hyperparameters),
+                        get_quantile_dmatrix(X[:n_dev], y[:n_dev]),
+                        num_boost_round=best_hyperparameters['n_estimators'])
+    test_proba = booster.inplace_predict(X[n_dev:])
+    test_metrics = calculate_metrics(y[n_dev:], (test_proba > 0.5).astype(int), test_proba)
+
+    print(f"\nEvaluated {len(leaderboard)} candidates ({search.evaluations} fits) in {elapsed:.1f}s "
+          f"on {workers} processes x {n_jobs} threads")
+    print(f"Best: {best['params']} rounds={best_hyperparameters['n_estimators']} "
+          f"validation logloss={best['validation_logloss']:.4f}")
+    print(f"Test Accuracy: {test_metrics['accuracy']:.4f} ({test_metrics['accuracy']*100:.2f}%)")
+
+    best_config = {
+        'stock_symbol': stock_symbol,
+        'trained_at': datetime.now().isoformat(),
+        'train_size': int(n_dev),
+        'test_size': int(len(X) - n_dev),
+        'test_accuracy': test_metrics['accuracy'],
+        'num_features': len(feature_names),
+        'features_used': feature_names,
+        'hyperparameters': best_hyperparameters,
+        'features_enabled': config.get('features_enabled', {}),
+        'target_type': config.get('target_type', 'open_to_close'),
+    }
+
+    results = {
+        'success': True,
+        'stock_symbol': stock_symbol,
+        'searched_at': datetime.now().isoformat(),
+        'method': method,
+        'search': options,
+        'search_space': space,
+        'candidates': len(leaderboard),
+        'evaluations': search.evaluations,
+        'processes': workers,
+        'threads_per_model': n_jobs,
+        'elapsed_seconds': round(elapsed, 4),
+        'test_metrics': test_metrics,
+        'best_config': best_config,
+        'leaderboard': leaderboard,
+    }
+
+    if save:
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        results_file = MODELS_DIR / f'{stock_symbol}_search.json'
+        with open(results_file, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        results['results_path'] = str(results_file)
+        print(f"\n✓ Search results saved: {results_file}")
+
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python hyperparameter_search.py STOCK_SYMBOL [CONFIG_JSON]")
+        print("Example: python hyperparameter_search.py AAPL '{\"search\": {\"method\": \"hyperband\"}}'")
+        sys.exit(1)
+
+    stock_symbol = sys.argv[1]
+    config = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+
+    try:
+        results = hyperparameter_search(stock_symbol, config)
+        # The full leaderboard is in the saved file
+        output = {**results, 'leaderboard': results['leaderboard'][:10]}
+    except Exception as e:
+        print(f"\n❌ ERROR during hyperparameter search: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        output = results = {'success': False, 'error': str(e), 'stock_symbol': stock_symbol}
+
+    print("\n" + "="*60)
+    print("RESULTS (JSON)")
+    print("="*60)
+    print(json.dumps(output, indent=2, default=str))
+
+    sys.exit(0 if results.get('success', False) else 1)
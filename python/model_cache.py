@@ -0,0 +1,167 @@
+"""
+In-process cache of loaded models
+
+backtest.load_model() reads a model and its metadata through this cache,
+so a long-running process (worker, notebook, parameter sweep) reads each
+model from disk once. Entries are keyed by symbol and the model's content
+hash (model_registry.model_stamp) and evicted least-recently-used by count
+and by approximate size.
+
+A hit costs one stat() of the symbol's pointer file (or legacy .pkl): the
+pointer is only re-read when that file changes, and a new hash means the
+model was retrained or re-pointed, so it is loaded again.
+"""
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from config import MODEL_CACHE_MAX_BYTES, MODEL_CACHE_MAX_ENTRIES, MODELS_DIR
+import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    file_stat: Tuple
+    model_hash: Optional[str]
+    model: Any
+    metadata: Dict
+    size: int
+
+
+def _file_stat(symbol: str) -> Optional[Tuple]:
+    """
+    (path, mtime, size) of the file that decides which model is current
+    """
+    for path in (model_registry.pointer_path(symbol), MODELS_DIR / f"{symbol}_model.pkl"):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        return str(path), stat.st_mtime_ns, stat.st_size
+    return None
+
+
+def _approximate_bytes(model: Any, metadata: Dict) -> int:
+    """
+    Serialized model size plus metadata, as a stand-in for memory use
+    """
+    model_path = getattr(model, 'model_path', None)
+    if model_path is not None and os.path.exists(model_path):
+        size = os.path.getsize(model_path)
+    else:
+        try:
+            size = len(model.get_booster().save_raw('ubj'))
+        except AttributeError:
+            size = 0
+    return size + len(json.dumps(metadata, default=str))
+
+
+class ModelCache:
+    """
+    LRU of (model, metadata) pairs bounded by count and approximate bytes
+    """
+
+    def __init__(self, max_models: int = MODEL_CACHE_MAX_ENTRIES,
+                 max_bytes: int = MODEL_CACHE_MAX_BYTES,
+                 loader: Callable[[str], Tuple[Any, Dict]] = model_registry.read_model):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.models: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, symbol: str) -> Tuple[Any, Dict]:
+        """
+        A symbol's current model and metadata, loaded on a miss
+
+        Raises:
+            FileNotFoundError: If the symbol has no model
+        """
+        file_stat = _file_stat(symbol)
+        cached = self.models.get(symbol)
+
+        if cached is not None and file_stat is not None:
+            if cached.file_stat == file_stat:
+                return self._hit(symbol, cached)
+
+            # Pointer rewritten: only reload if it points at another model
+            model_hash = model_registry.model_stamp(symbol)
+            if model_hash == cached.model_hash:
+                return self._hit(symbol, cached._replace(file_stat=file_stat))
+
+        if cached is not None:
+            del self.models[symbol]
+            self.invalidations += 1
+
+        self.misses += 1
+        model_hash = model_registry.model_stamp(symbol)
+        model, metadata = self.loader(symbol)
+        self.models[symbol] = _Entry(file_stat, model_hash, model, metadata,
+                                     _approximate_bytes(model, metadata))
+        self._evict()
+        return model, metadata
+
+    def _hit(self, symbol: str, entry: _Entry) -> Tuple[Any, Dict]:
+        self.models[symbol] = entry
+        self.models.move_to_end(symbol)
+        self.hits += 1
+        return entry.model, entry.metadata
+
+    def _evict(self) -> None:
+        total = sum(entry.size for entry in self.models.values())
+        # Always keep the newest entry, even if it alone exceeds max_bytes
+        while len(self.models) > 1 and (len(self.models) > self.max_models or total > self.max_bytes):
+            symbol, entry = self.models.popitem(last=False)
+            total -= entry.size
+            self.evictions += 1
+            logger.debug(f"Evicted model {symbol} ({entry.size} bytes)")
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """
+        Drop one symbol's model, or every model
+        """
+        if symbol is None:
+            self.models.clear()
+        else:
+            self.models.pop(symbol, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'models': len(self.models),
+            'bytes': sum(entry.size for entry in self.models.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+        }
+
+
+_cache = ModelCache()
+
+
+def get_model(symbol: str) -> Tuple[Any, Dict]:
+    """
+    A symbol's current model and metadata from the process-wide cache
+    """
+    return _cache.get(symbol)
+
+
+def clear() -> None:
+    """
+    Drop every cached model in this process
+    """
+    _cache.invalidate()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Hit/miss/eviction counters and current size for this process
+    """
+    return _cache.stats()
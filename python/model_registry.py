@@ -0,0 +1,429 @@
+"""
+Content-addressed model registry
+
+Boosters are stored in XGBoost's native UBJSON format, named by the
+SHA-256 of their bytes, with a small pointer file per symbol:
+
+    models/registry/objects/{sha256}.ubj     booster (UBJSON)
+    models/registry/objects/{sha256}.npz     same trees flattened for NumPy (tree_ensemble.py)
+    models/registry/{SYMBOL}/v{N}.json       metadata of version N
+    models/registry/{SYMBOL}.json            {"symbol": ..., "current": N,
+                                              "versions": [{"version", "model_hash", "created_at"}]}
+
+models/{SYMBOL}_metadata.json keeps a copy of the current version's
+metadata. Writers take an fcntl lock; pointer and metadata files are
+replaced atomically, so readers never take it.
+
+load_model() returns a RegistryModel that reads the booster on first use
+and predicts with Booster.inplace_predict, so loading a model never
+unpickles the scikit-learn wrapper. Small batches (next-day signals) are
+scored with the compiled trees instead, without importing xgboost.
+read_model() also falls back to legacy
+{SYMBOL}_model.pkl files, which can be converted with `migrate`.
+
+Usage:
+    python model_registry.py list [SYMBOL]
+    python model_registry.py use SYMBOL VERSION
+    python model_registry.py migrate [SYMBOL ...]
+    python model_registry.py compile
+    python model_registry.py gc
+"""
+
+import fcntl
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import COMPILED_PREDICT_MAX_ROWS, MODEL_REGISTRY_DIR, MODELS_DIR
+from tree_ensemble import TreeEnsemble, flatten_booster
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT = 'ubj'
+
+
+def _registry_dir(registry_dir: Optional[Path] = None) -> Path:
+    return Path(registry_dir or MODEL_REGISTRY_DIR)
+
+
+def object_path(model_hash: str, registry_dir: Optional[Path] = None) -> Path:
+    """
+    File holding the booster with a given content hash
+    """
+    return _registry_dir(registry_dir) / 'objects' / f"{model_hash}.{MODEL_FORMAT}"
+
+
+def compiled_path(model_hash: str, registry_dir: Optional[Path] = None) -> Path:
+    """
+    File holding the flattened trees of a booster
+    """
+    return _registry_dir(registry_dir) / 'objects' / f"{model_hash}.npz"
+
+
+def compile_object(model_hash: str, registry_dir: Optional[Path] = None) -> bool:
+    """
+    Flatten a stored booster into its .npz, unless it exists already
+
+    Returns:
+        Whether the compiled trees exist afterwards
+    """
+    path = compiled_path(model_hash, registry_dir)
+    if path.exists():
+        return True
+
+    import xgboost as xgb
+
+    booster = xgb.Booster(model_file=str(object_path(model_hash, registry_dir)))
+    try:
+        flatten_booster(booster).save(path)
+    except ValueError as e:
+        logger.warning(f"Model {model_hash[:12]} not compiled: {e}")
+        return False
+    return True
+
+
+def pointer_path(symbol: str, registry_dir: Optional[Path] = None) -> Path:
+    """
+    A symbol's pointer file
+    """
+    return _registry_dir(registry_dir) / f"{symbol}.json"
+
+
+def _metadata_path(symbol: str, version: int, registry_dir: Optional[Path] = None) -> Path:
+    return _registry_dir(registry_dir) / symbol / f"v{version}.json"
+
+
+@contextmanager
+def _write_lock(registry_dir: Path):
+    """
+    Serialize writers; readers never take the lock
+    """
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    with open(registry_dir / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write_json(path: Path, data: Dict, indent: Optional[int] = 2) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent, default=str)
+    os.replace(tmp_path, path)
+
+
+def read_pointer(symbol: str, registry_dir: Optional[Path] = None) -> Optional[Dict]:
+    """
+    A symbol's pointer record, or None if it has no registered model
+    """
+    path = pointer_path(symbol, registry_dir)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_model(model_bytes: bytes, symbol: str, metadata: Dict,
+               registry_dir: Optional[Path] = None) -> Dict:
+    """
+    Register a booster as the symbol's new current version
+
+    Args:
+        model_bytes: Booster serialized as UBJSON (Booster.save_raw('ubj'))
+        symbol: Stock symbol
+        metadata: Training metadata (model_hash/model_format/registry_version are added)
+        registry_dir: Override the registry directory
+
+    Returns:
+        Dict with version, model_hash and model_path
+    """
+    registry_dir = _registry_dir(registry_dir)
+    model_bytes = bytes(model_bytes)
+    model_hash = hashlib.sha256(model_bytes).hexdigest()
+
+    with _write_lock(registry_dir):
+        model_file = object_path(model_hash, registry_dir)
+        if not model_file.exists():
+            model_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = model_file.with_name(f"{model_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'wb') as f:
+                f.write(model_bytes)
+            os.replace(tmp_file, model_file)
+        compile_object(model_hash, registry_dir)
+
+        pointer = read_pointer(symbol, registry_dir) or {'symbol': symbol, 'current': None, 'versions': []}
+        version = max((entry['version'] for entry in pointer['versions']), default=0) + 1
+
+        metadata = {**metadata, 'model_hash': model_hash, 'model_format': MODEL_FORMAT,
+                    'registry_version': version}
+        _write_json(_metadata_path(symbol, version, registry_dir), metadata)
+
+        pointer['versions'].append({
+            'version': version,
+            'model_hash': model_hash,
+            'created_at': datetime.now().isoformat(),
+        })
+        pointer['current'] = version
+        _write_json(pointer_path(symbol, registry_dir), pointer)
+
+        if registry_dir == MODEL_REGISTRY_DIR:
+            _write_json(MODELS_DIR / f"{symbol}_metadata.json", metadata)
+
+    return {'version': version, 'model_hash': model_hash, 'model_path': str(model_file)}
+
+
+def resolve(symbol: str, version: Optional[int] = None,
+            registry_dir: Optional[Path] = None) -> Tuple[Path, Dict]:
+    """
+    Booster file and metadata of a symbol's current (or given) version
+
+    Raises:
+        FileNotFoundError: If the symbol or version isn't registered
+    """
+    pointer = read_pointer(symbol, registry_dir)
+    if pointer is None or pointer.get('current') is None:
+        raise FileNotFoundError(f"No registered model for {symbol}")
+
+    version = int(version or pointer['current'])
+    entry = next((entry for entry in pointer['versions'] if entry['version'] == version), None)
+    if entry is None:
+        raise FileNotFoundError(f"{symbol} has no model version {version}")
+
+    metadata = {}
+    metadata_file = _metadata_path(symbol, version, registry_dir)
+    if metadata_file.exists():
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+
+    return object_path(entry['model_hash'], registry_dir), metadata
+
+
+def model_stamp(symbol: str, registry_dir: Optional[Path] = None) -> Optional[str]:
+    """
+    Identifier that changes whenever the symbol's current model changes
+    """
+    pointer = read_pointer(symbol, registry_dir)
+    if pointer is not None and pointer.get('current') is not None:
+        entry = next((e for e in pointer['versions'] if e['version'] == pointer['current']), {})
+        return entry.get('model_hash')
+
+    legacy_file = MODELS_DIR / f"{symbol}_model.pkl"
+    return f"pkl:{legacy_file.stat().st_mtime_ns}" if legacy_file.exists() else None
+
+
+class RegistryModel:
+    """
+    Booster loaded on first use, with the classifier's predict/predict_proba
+
+    Predictions use the best iteration when the booster was early-stopped,
+    as XGBClassifier does. Batches of up to COMPILED_PREDICT_MAX_ROWS rows,
+    or any batch when xgboost isn't installed, are scored with the compiled
+    trees.
+    """
+
+    def __init__(self, model_path: Path):
+        self.model_path = Path(model_path)
+        self._booster = None
+        self._compiled = None
+
+    @property
+    def booster(self):
+        if self._booster is None:
+            import xgboost as xgb
+
+            self._booster = xgb.Booster(model_file=str(self.model_path))
+        return self._booster
+
+    @property
+    def compiled(self) -> Optional[TreeEnsemble]:
+        if self._compiled is None:
+            path = self.model_path.with_suffix('.npz')
+            if path.exists():
+                self._compiled = TreeEnsemble.load(path)
+        return self._compiled
+
+    def _iteration_range(self) -> Tuple[int, int]:
+        best_iteration = self.booster.attr('best_iteration')
+        return (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+
+    def _probability_up(self, X: np.ndarray) -> np.ndarray:
+        if len(X) <= COMPILED_PREDICT_MAX_ROWS or importlib.util.find_spec('xgboost') is None:
+            if self.compiled is not None:
+                return self.compiled.predict_proba(X)[:, 1]
+        return self.booster.inplace_predict(X, iteration_range=self._iteration_range())
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        probability_up = self._probability_up(X)
+        return np.vstack([1 - probability_up, probability_up]).T
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return (self._probability_up(X) > 0.5).astype(int)
+
+
+def load_model(symbol: str, version: Optional[int] = None,
+               registry_dir: Optional[Path] = None) -> Tuple[RegistryModel, Dict]:
+    """
+    Lazily loaded model and metadata of a symbol's current (or given) version
+
+    Raises:
+        FileNotFoundError: If the symbol or version isn't registered
+    """
+    model_path, metadata = resolve(symbol, version, registry_dir)
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model object missing from registry: {model_path}")
+    return RegistryModel(model_path), metadata
+
+
+def read_model(symbol: str) -> Tuple[object, Dict]:
+    """
+    Read a symbol's current model from disk
+
+    Uses the registry (native booster, read on first prediction) and falls
+    back to a legacy pickled {SYMBOL}_model.pkl.
+
+    Args:
+        symbol: Stock symbol
+
+    Returns:
+        Tuple of (model, metadata)
+
+    Raises:
+        FileNotFoundError: If the symbol has no model
+    """
+    try:
+        model, metadata = load_model(symbol)
+        logger.info(f"Using registered model {model.model_path.name} "
+                    f"(v{metadata.get('registry_version', '?')})")
+        logger.info(f"Trained at: {metadata.get('trained_at', 'unknown')}")
+        return model, metadata
+    except FileNotFoundError:
+        pass
+
+    model_path = MODELS_DIR / f"{symbol}_model.pkl"
+    metadata_path = MODELS_DIR / f"{symbol}_metadata.json"
+
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Model not found for {symbol} in {MODEL_REGISTRY_DIR} or {model_path}. "
+            "Please train the model first."
+        )
+
+    logger.info(f"Loading legacy model from {model_path}")
+
+    import joblib
+    model = joblib.load(model_path)
+
+    metadata = {}
+    if metadata_path.exists():
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        logger.info(f"Model loaded. Version: {metadata.get('model_version', 'unknown')}")
+        logger.info(f"Trained at: {metadata.get('trained_at', 'unknown')}")
+    else:
+        logger.warning(f"Metadata file not found: {metadata_path}")
+
+    return model, metadata
+
+
+def list_symbols(registry_dir: Optional[Path] = None) -> List[str]:
+    """
+    Symbols with a pointer file
+    """
+    return sorted(path.stem for path in _registry_dir(registry_dir).glob('*.json'))
+
+
+def set_current(symbol: str, version: int, registry_dir: Optional[Path] = None) -> None:
+    """
+    Point a symbol at an earlier (or later) registered version
+    """
+    registry_dir = _registry_dir(registry_dir)
+    with _write_lock(registry_dir):
+        pointer = read_pointer(symbol, registry_dir)
+        if pointer is None or all(entry['version'] != version for entry in pointer['versions']):
+            raise FileNotFoundError(f"{symbol} has no model version {version}")
+        pointer['current'] = version
+        _write_json(pointer_path(symbol, registry_dir), pointer)
+
+        if registry_dir == MODEL_REGISTRY_DIR:
+            with open(_metadata_path(symbol, version, registry_dir), 'r') as f:
+                _write_json(MODELS_DIR / f"{symbol}_metadata.json", json.load(f))
+
+
+def gc(registry_dir: Optional[Path] = None) -> int:
+    """
+    Delete objects no pointer references
+
+    Returns:
+        Number of objects removed
+    """
+    registry_dir = _registry_dir(registry_dir)
+    with _write_lock(registry_dir):
+        referenced = set()
+        for symbol in list_symbols(registry_dir):
+            pointer = read_pointer(symbol, registry_dir) or {'versions': []}
+            referenced.update(entry['model_hash'] for entry in pointer['versions'])
+
+        removed = 0
+        for path in (registry_dir / 'objects').glob(f"*.{MODEL_FORMAT}"):
+            if path.stem not in referenced:
+                path.unlink()
+                removed += 1
+        for path in (registry_dir / 'objects').glob('*.npz'):
+            if path.stem not in referenced:
+                path.unlink()
+    return removed
+
+
+def migrate_legacy(symbol: str) -> Dict:
+    """
+    Register a legacy {SYMBOL}_model.pkl (joblib-pickled XGBClassifier)
+    """
+    import joblib
+
+    model = joblib.load(MODELS_DIR / f"{symbol}_model.pkl")
+    metadata = {}
+    metadata_file = MODELS_DIR / f"{symbol}_metadata.json"
+    if metadata_file.exists():
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+    return save_model(model.get_booster().save_raw(MODEL_FORMAT), symbol, metadata)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == 'list':
+        for symbol in [s.upper() for s in sys.argv[2:]] or list_symbols():
+            pointer = read_pointer(symbol) or {'current': None, 'versions': []}
+            for entry in pointer['versions']:
+                marker = '*' if entry['version'] == pointer['current'] else ' '
+                print(f"{marker} {symbol} v{entry['version']} {entry['model_hash'][:12]} {entry['created_at']}")
+    elif command == 'use' and len(sys.argv) == 4:
+        set_current(sys.argv[2].upper(), int(sys.argv[3]))
+        print(f"{sys.argv[2].upper()} -> v{sys.argv[3]}")
+    elif command == 'migrate':
+        symbols = [s.upper() for s in sys.argv[2:]] or sorted(
+            path.name[:-len('_model.pkl')] for path in MODELS_DIR.glob('*_model.pkl'))
+        for symbol in symbols:
+            entry = migrate_legacy(symbol)
+            print(f"{symbol}: v{entry['version']} {entry['model_hash'][:12]}")
+    elif command == 'compile':
+        for path in sorted((MODEL_REGISTRY_DIR / 'objects').glob(f"*.{MODEL_FORMAT}")):
+            print(f"{path.stem[:12]}: {'ok' if compile_object(path.stem) else 'skipped'}")
+    elif command == 'gc':
+        print(f"Removed {gc()} unreferenced model objects")
+    else:
+        print("Usage: python model_registry.py list [SYMBOL] | use SYMBOL VERSION | migrate [SYMBOL ...] | compile | gc")
+        sys.exit(1)
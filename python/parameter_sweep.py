@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Batched parameter sweep over confidence thresholds, capital and position size
+
+Loads the model and engineers features once, calls predict_proba once,
+then evaluates every combination of
+
+    thresholds:         trade when P(up) > threshold
+    initial_capitals:   starting capital
+    position_fractions: share of the current capital put into each trade
+
+in a single pass over a (days x variants) matrix
+(trade_simulation.scan_grid). Each cell gets the same prediction_metrics /
+trading_metrics as backtest.calculate_backtest_metrics; the cell with
+threshold 0.5, fraction 1.0 and a given capital reproduces backtest.py.
+
+Usage: python parameter_sweep.py AAPL '{"thresholds": [0.5, 0.6], "initial_capitals": [10000], "position_fractions": [0.5, 1.0]}'
+"""
+
+import sys
+import json
+import logging
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backtest import backtest_window, config_from_metadata, load_model, prepare_backtest_data
+from config import SWEEP_GRID
+from trade_simulation import scan_grid
+from utils import calculate_metrics, save_results, handle_error
+
+logger = logging.getLogger(__name__)
+
+
+def _masked_sum(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return np.where(mask, values, 0.0).sum(axis=0)
+
+
+def grid_trading_metrics(open_: np.ndarray, close: np.ndarray, signal: np.ndarray,
+                         initial_capital: np.ndarray, fraction: np.ndarray) -> List[Dict]:
+    """
+    trading_metrics of calculate_backtest_metrics for every variant (column)
+
+    Args:
+        open_: Open prices, one per day
+        close: Close prices, one per day
+        signal: (days x variants) booleans, True where a variant wants to trade
+        initial_capital: Starting capital per variant
+        fraction: Share of the current capital per trade, per variant
+
+    Returns:
+        List of trading metric dicts, one per variant
+    """
+    shares, capital_after = scan_grid(open_, close, signal, initial_capital, fraction)
+    traded = shares > 0
+
+    price_change = (close - open_)[:, None]
+    profit_loss = price_change * shares
+    returns = (((close - open_) / open_) * 100 / 100)[:, None]
+
+    total_trades = traded.sum(axis=0)
+    has_trades = total_trades > 0
+    count = np.maximum(total_trades, 1)
+
+    wins = traded & (profit_loss > 0)
+    losses = traded & (profit_loss < 0)
+    total_profit_loss = _masked_sum(profit_loss, traded)
+    gross_profit = _masked_sum(profit_loss, wins)
+    gross_loss = np.abs(_masked_sum(profit_loss, losses))
+
+    # Sharpe ratio of per-trade returns (sample standard deviation)
+    mean_return = _masked_sum(returns, traded) / count
+    variance = _masked_sum((returns - mean_return) ** 2, traded) / np.maximum(total_trades - 1, 1)
+    std_return = np.sqrt(variance)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = np.where((total_trades > 1) & (std_return != 0),
+                                mean_return / std_return * np.sqrt(252), 0.0)
+
+    # Drawdown of the cumulative (summed) trade returns, from the first trade on
+    cumulative = np.cumsum(np.where(traded, returns, 0.0), axis=0)
+    started = np.cumsum(traded, axis=0) > 0
+    running_max = np.maximum.accumulate(np.where(started, cumulative, -np.inf), axis=0)
+    max_drawdown = np.where(traded, cumulative - running_max, 0.0).min(axis=0) * 100
+
+    final_capital = capital_after[-1] if len(capital_after) else initial_capital
+
+    metrics = []
+    for j in range(signal.shape[1]):
+        if not has_trades[j]:
+            metrics.append({
+                'total_trades': 0,
+                'initial_capital': float(initial_capital[j]),
+                'final_capital': float(initial_capital[j]),
+                'total_return_pct': 0.0,
+            })
+            continue
+
+        n_wins, n_losses = int(wins[:, j].sum()), int(losses[:, j].sum())
+        metrics.append({
+            'total_trades': int(total_trades[j]),
+            'total_profit_loss': float(total_profit_loss[j]),
+            'win_rate': float(n_wins / total_trades[j] * 100),
+            'avg_profit_per_trade': float(total_profit_loss[j] / total_trades[j]),
+            'sharpe_ratio': float(sharpe_ratio[j]),
+            'max_drawdown': float(max_drawdown[j]),
+            'largest_win': float(profit_loss[traded[:, j], j].max()),
+            'largest_loss': float(profit_loss[traded[:, j], j].min()),
+            'initial_capital': float(initial_capital[j]),
+            'final_capital': float(final_capital[j]),
+            'total_return_pct': float((final_capital[j] - initial_capital[j]) / initial_capital[j] * 100),
+            'total_return_dollars': float(final_capital[j] - initial_capital[j]),
+            'winning_trades': n_wins,
+            'losing_trades': n_losses,
+            'avg_win': float(gross_profit[j] / n_wins) if n_wins else 0.0,
+            'avg_loss': float(-gross_loss[j] / n_losses) if n_losses else 0.0,
+            'gross_profit': float(gross_profit[j]),
+            'gross_loss': float(gross_loss[j]),
+            'profit_factor': float(gross_profit[j] / gross_loss[j]) if gross_loss[j] > 0 else 0.0,
+        })
+
+    return metrics
+
+
+def sweep(symbol: str, grid: Optional[Dict] = None, start_date=None, end_date=None,
+          loaded_model: tuple = None) -> Dict:
+    """
+    Backtest every threshold x capital x position-fraction combination
+
+    Args:
+        symbol: Stock symbol
+        grid: thresholds / initial_capitals / position_fractions lists and
+            rank_by (defaults: config.SWEEP_GRID)
+        start_date: Optional first date to backtest
+        end_date: Optional last date to backtest (without either date the
+            window is the model's test period)
+        loaded_model: Optional (model, metadata) already in memory
+
+    Returns:
+        Dictionary with one result per grid cell and the best cell
+    """
+    try:
+        grid = {**SWEEP_GRID, **(grid or {})}
+        cells = list(product(grid['thresholds'], grid['initial_capitals'], grid['position_fractions']))
+        if not cells:
+            raise ValueError("Empty sweep grid")
+        thresholds, capitals, fractions = (np.array(values, dtype=float) for values in zip(*cells))
+
+        model, metadata = loaded_model if loaded_model is not None else load_model(symbol)
+        config = config_from_metadata(metadata)
+        start_date, end_date = backtest_window(metadata, start_date, end_date)
+        df_features, X, y, feature_names = prepare_backtest_data(symbol, metadata, config, start_date, end_date)
+
+        logger.info(f"Sweeping {len(cells)} variants over {len(X)} days")
+        prediction_probas = model.predict_proba(X)[:, 1]
+        signal = prediction_probas[:, None] > thresholds[None, :]
+
+        trading_metrics = grid_trading_metrics(
+            df_features['open'].to_numpy(dtype=float),
+            df_features['close'].to_numpy(dtype=float),
+            signal, capitals, fractions,
+        )
+
+        # Prediction metrics only depend on the threshold
+        prediction_metrics = {
+            threshold: calculate_metrics(y, (prediction_probas > threshold).astype(int), prediction_probas)
+            for threshold in set(thresholds.tolist())
+        }
+
+        results = [
+            {
+                'threshold': float(threshold),
+                'initial_capital': float(capital),
+                'position_fraction': float(fraction),
+                'prediction_metrics': prediction_metrics[threshold],
+                'trading_metrics': metrics,
+            }
+            for threshold, capital, fraction, metrics in zip(thresholds.tolist(), capitals, fractions,
+                                                               trading_metrics)
+        ]
+
+        rank_by = grid['rank_by']
+        best = max(range(len(results)), key=lambda i: results[i]['trading_metrics'].get(rank_by, float('-inf')))
+
+        return {
+            'success': True,
+            'symbol': symbol,
+            'stock_symbol': symbol,
+            'backtested_at': datetime.now().isoformat(),
+            'model_version': metadata.get('model_version', 'unknown'),
+            'data_summary': {
+                'total_samples': int(len(df_features)),
+                'num_features': int(len(feature_names)),
+                'start_date': str(df_features['date'].iloc[0].date()) if len(df_features) else None,
+                'end_date': str(df_features['date'].iloc[-1].date()) if len(df_features) else None,
+            },
+            'grid': {key: grid[key] for key in ['thresholds', 'initial_capitals', 'position_fractions']},
+            'rank_by': rank_by,
+            'best': results[best],
+            'results': results,
+        }
+
+    except Exception as e:
+        return handle_error(e, "SWEEP_ERROR")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python parameter_sweep.py <SYMBOL> [GRID_JSON]")
+        print("Example: python parameter_sweep.py AAPL '{\"thresholds\": [0.5, 0.55, 0.6]}'")
+        sys.exit(1)
+
+    symbol = sys.argv[1].upper()
+    grid = json.loads(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    result = sweep(symbol, grid)
+    save_results(result)
+
+    sys.exit(0 if result.get('success', False) else 1)
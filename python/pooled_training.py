@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Pooled out-of-core training over many symbols
+
+Trains one model on the rows of a whole universe (e.g. a sector) without
+ever holding the pooled feature matrix in memory:
+
+1. Each symbol's bars are streamed from the price store/archive in chunks
+   (utils.iter_price_chunks) and engineered chunk by chunk
+   (feature_engineering.iter_engineered_chunks).
+2. Rows are assigned to train / validation / test by date, with one
+   split date for the whole universe, and written to disk as float32
+   batches of at most batch_rows rows.
+3. XGBoost reads the batches through a DataIter into an
+   ExtMemQuantileDMatrix, which keeps its quantized pages in
+   POOLED_TRAINING_CACHE_DIR, and trains with early stopping on the
+   validation dates. The test batches are scored one at a time.
+
+A row's target looks TARGET_LOOKAHEAD bars ahead, so a symbol's last rows
+before a split boundary are dropped ("purged"): their labels would
+otherwise be computed from the next period's prices.
+
+Options go in config['pooled'] (defaults: config.POOLED_TRAINING). The
+model is registered under the given name (model_registry); with
+assign_to_symbols it also becomes each symbol's current model, sharing
+the same stored booster.
+
+Usage: python pooled_training.py NAME AAPL,MSFT,... '{"hyperparameters": {...}, "pooled": {...}}'
+"""
+
+import sys
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+import model_registry
+from config import DMATRIX_MAX_BIN, POOLED_TRAINING, POOLED_TRAINING_CACHE_DIR, TRAINING_DEFAULTS
+from feature_engineering import TARGET_LOOKAHEAD, get_feature_list, iter_engineered_chunks
+from streaming_pipeline import StreamingBacktestMetrics
+from train_model import booster_params
+from utils import iter_price_chunks
+
+PARTITIONS = ['train', 'validation', 'test']
+
+
+def date_range(symbols: List[str], chunk_rows: int) -> tuple:
+    """
+    First and last bar date across the universe (reads only price chunks)
+    """
+    first = last = None
+    for symbol in symbols:
+        for chunk in iter_price_chunks(symbol, chunk_rows):
+            if chunk.empty:
+                continue
+            dates = pd.to_datetime(chunk['date'])
+            first = dates.iloc[0] if first is None else min(first, dates.iloc[0])
+            last = dates.iloc[-1] if last is None else max(last, dates.iloc[-1])
+    if first is None:
+        raise ValueError("No price data for the given symbols")
+    return first, last
+
+
+def split_dates(symbols: List[str], options: Dict, validation_fraction: float) -> tuple:
+    """
+    (validation_start, split_date) shared by every symbol
+
+    Without explicit dates the last test_size of the calendar range is the
+    test period and the last validation_fraction of the rest is validation.
+    """
+    split_date = options.get('split_date')
+    validation_start = options.get('validation_start')
+    if split_date is None or validation_start is None:
+        first, last = date_range(symbols, int(options['chunk_rows']))
+        if split_date is None:
+            split_date = first + (last - first) * (1 - float(options['test_size']))
+        split_date = pd.Timestamp(split_date).normalize()
+        if validation_start is None:
+            validation_start = split_date - (split_date - first) * validation_fraction
+    return pd.Timestamp(validation_start).normalize(), pd.Timestamp(split_date).normalize()
+
+
+def iter_partitioned(frames: Iterator[pd.DataFrame], boundaries: np.ndarray) -> Iterator[tuple]:
+    """
+    Label one symbol's engineered rows with a partition, purging boundary rows
+
+    A row is dropped if any of the next TARGET_LOOKAHEAD rows falls in a
+    different partition. The last rows of each frame are held back until
+    the next frame shows what follows them.
+
+    Args:
+        frames: Date-ordered engineered frames of a single symbol
+        boundaries: datetime64 [validation_start, split_date]
+
+    Yields:
+        Tuples of (frame, partition index per row, 0=train 1=validation 2=test)
+    """
+    pending = None
+    for frame in frames:
+        if pending is not None:
+            frame = pd.concat([pending, frame])
+        if frame.empty:
+            continue
+
+        partition, keep = _purge(frame, boundaries)
+
+        # Undecided until the following rows are seen
+        pending = frame.iloc[-TARGET_LOOKAHEAD:]
+        decided = slice(0, len(frame) - TARGET_LOOKAHEAD)
+        yield frame.iloc[decided][keep[decided]], partition[decided][keep[decided]]
+
+    if pending is not None:
+        # Nothing follows the symbol's last rows
+        partition, keep = _purge(pending, boundaries)
+        yield pending[keep], partition[keep]
+
+
+def _purge(frame: pd.DataFrame, boundaries: np.ndarray) -> tuple:
+    """
+    Partition index per row, and which rows keep their label in-partition
+    """
+    partition = np.searchsorted(boundaries, frame['date'].to_numpy(), side='right')
+    keep = np.ones(len(frame), dtype=bool)
+    for ahead in range(1, min(TARGET_LOOKAHEAD, len(frame) - 1) + 1):
+        keep[:-ahead] &= partition[ahead:] == partition[:-ahead]
+    return partition, keep
+
+
+class _BatchWriter:
+    """
+    Buffer rows per partition and write them as batch files of batch_rows
+    """
+
+    def __init__(self, spill_dir: Path, batch_rows: int):
+        self.spill_dir = spill_dir
+        self.batch_rows = batch_rows
+        self.buffers = {name: [] for name in PARTITIONS}
+        self.buffered = {name: 0 for name in PARTITIONS}
+        self.files = {name: [] for name in PARTITIONS}
+        self.rows = {name: 0 for name in PARTITIONS}
+
+    def add(self, partition: str, X: np.ndarray, y: np.ndarray) -> None:
+        self.buffers[partition].append((X, y))
+        self.buffered[partition] += len(X)
+        if self.buffered[partition] >= self.batch_rows:
+            self.flush(partition, final=False)
+
+    def flush(self, partition: str, final: bool = True) -> None:
+        """
+        Write full batches; the remainder stays buffered unless final
+        """
+        if not self.buffers[partition]:
+            return
+        X = np.concatenate([X for X, _ in self.buffers[partition]])
+        y = np.concatenate([y for _, y in self.buffers[partition]])
+        end = len(X) if final else len(X) - len(X) % self.batch_rows
+        for begin in range(0, end, self.batch_rows):
+            stop = min(begin + self.batch_rows, end)
+            path = self.spill_dir / f"{partition}_{len(self.files[partition]):05d}.npz"
+            np.savez(path, X=X[begin:stop], y=y[begin:stop])
+            self.files[partition].append(path)
+        self.rows[partition] += end
+        self.buffers[partition] = [(X[end:], y[end:])] if end < len(X) else []
+        self.buffered[partition] = len(X) - end
+
+
+def spill_batches(symbols: List[str], config: Dict, boundaries: np.ndarray, options: Dict,
+                  spill_dir: Path) -> Dict:
+    """
+    Engineer every symbol in chunks and write partitioned float32 batches
+
+    Returns:
+        Dict with feature_names, per-partition batch files and row counts,
+        and per-symbol row counts
+    """
+    writer = _BatchWriter(spill_dir, int(options['batch_rows']))
+    feature_names = None
+    symbol_rows = {}
+
+    for symbol in symbols:
+        chunks = iter_price_chunks(symbol, int(options['chunk_rows']))
+        counts = np.zeros(len(PARTITIONS), dtype=int)
+
+        for frame, partition in iter_partitioned(iter_engineered_chunks(chunks, config), boundaries):
+            if frame.empty:
+                continue
+            if feature_names is None:
+                feature_names = get_feature_list(frame)
+            missing = set(feature_names) - set(frame.columns)
+            if missing:
+                raise ValueError(f"{symbol} is missing features: {sorted(missing)}")
+
+            X = frame[feature_names].to_numpy(dtype=np.float32)
+            y = frame['target'].to_numpy(dtype=np.float32)
+            for index, name in enumerate(PARTITIONS):
+                rows = partition == index
+                if rows.any():
+                    writer.add(name, X[rows], y[rows])
+                    counts[index] += int(rows.sum())
+
+        symbol_rows[symbol] = dict(zip(PARTITIONS, counts.tolist()))
+        print(f"  {symbol:8s} train={counts[0]:8d} validation={counts[1]:7d} test={counts[2]:7d}")
+
+    for name in PARTITIONS:
+        writer.flush(name)
+
+    if feature_names is None or writer.rows['train'] == 0:
+        raise ValueError("No training rows before the validation start date")
+
+    return {'feature_names': feature_names, 'files': writer.files, 'rows': writer.rows,
+            'symbols': symbol_rows}
+
+
+class BatchIterator(xgb.DataIter):
+    """
+    Feed spilled batch files to XGBoost one at a time
+    """
+
+    def __init__(self, files: List[Path], feature_names: List[str], cache_prefix: str):
+        super().__init__(cache_prefix=cache_prefix)
+        self.files = files
+        self.feature_names = feature_names
+        self.position = 0
+
+    def next(self, input_data) -> bool:
+        if self.position == len(self.files):
+            return False
+        with np.load(self.files[self.position]) as batch:
+            input_data(data=batch['X'], label=batch['y'], feature_names=self.feature_names)
+        self.position += 1
+        return True
+
+    def reset(self) -> None:
+        self.position = 0
+
+
+def pooled_training(name: str, symbols: List[str], config: Dict, n_jobs: int = -1) -> Dict:
+    """
+    Train and register one model on many symbols with bounded memory
+
+    Args:
+        name: Registry name of the pooled model (e.g. 'TECH')
+        symbols: Universe to pool
+        config: Configuration dictionary (hyperparameters, features, pooled)
+        n_jobs: XGBoost threads
+
+    Returns:
+        Dictionary with training results
+    """
+    options = {**POOLED_TRAINING, **config.get('pooled', {})}
+    hyperparameters = config.get('hyperparameters', {})
+    settings = {**TRAINING_DEFAULTS, **hyperparameters}
+    n_estimators = int(hyperparameters.get('n_estimators', 100))
+
+    print("\n" + "="*60)
+    print(f"POOLED TRAINING FOR {name} ({len(symbols)} symbols)")
+    print("="*60)
+
+    validation_start, split_date = split_dates(symbols, options, float(settings['validation_fraction']))
+    boundaries = np.array([validation_start, split_date], dtype='datetime64[ns]')
+    print(f"Validation from {validation_start.date()}, test from {split_date.date()}")
+
+    POOLED_TRAINING_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    spill_dir = Path(tempfile.mkdtemp(prefix=f"{name}_", dir=POOLED_TRAINING_CACHE_DIR))
+    started = time.time()
+
+    try:
+        print("\n[1/3] Engineering features and writing batches...")
+        spilled = spill_batches(symbols, config, boundaries, options, spill_dir)
+        feature_names = spilled['feature_names']
+        print(f"Rows: {spilled['rows']}, features: {len(feature_names)}")
+
+        print("\n[2/3] Training on external-memory batches...")
+        dtrain = xgb.ExtMemQuantileDMatrix(
+            BatchIterator(spilled['files']['train'], feature_names, str(spill_dir / 'train')),
+            max_bin=DMATRIX_MAX_BIN, nthread=n_jobs)
+
+        evals = []
+        early_stopping_rounds = settings['early_stopping_rounds'] or None
+        if spilled['files']['validation'] and early_stopping_rounds:
+            dvalidation = xgb.ExtMemQuantileDMatrix(
+                BatchIterator(spilled['files']['validation'], feature_names, str(spill_dir / 'validation')),
+                ref=dtrain, max_bin=DMATRIX_MAX_BIN, nthread=n_jobs)
+            evals.append((dvalidation, 'validation'))
+        else:
+            early_stopping_rounds = None
+
+        fit_started = time.time()
+        booster = xgb.train(booster_params(hyperparameters, n_jobs), dtrain,
+                            num_boost_round=n_estimators, evals=evals,
+                            early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+        fit_seconds = time.time() - fit_started
+        trees_built = booster.num_boosted_rounds()
+        best_iteration = int(booster.best_iteration) if early_stopping_rounds else trees_built - 1
+        print(f"Trees built: {trees_built}/{n_estimators}, best iteration: {best_iteration} "
+              f"({fit_seconds:.1f}s)")
+
+        print("\n[3/3] Scoring test batches...")
+        metrics = StreamingBacktestMetrics()
+        for path in spilled['files']['test']:
+            with np.load(path) as batch:
+                proba = booster.inplace_predict(batch['X'], iteration_range=(0, best_iteration + 1))
+                metrics.update(batch['y'], (proba > 0.5).astype(int), proba, pd.DataFrame())
+        test_metrics = metrics.prediction_metrics()
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    metadata = {
+        'stock_symbol': name,
+        'pooled_symbols': symbols,
+        'trained_at': datetime.now().isoformat(),
+        'model_version': '2.0_daytrading',
+        'train_size': spilled['rows']['train'],
+        'validation_size': spilled['rows']['validation'],
+        'test_size': spilled['rows']['test'],
+        'validation_start': str(validation_start.date()),
+        'test_start': str(split_date.date()),
+        'test_accuracy': test_metrics['accuracy'],
+        'num_features': len(feature_names),
+        'features_used': feature_names,
+        'best_iteration': best_iteration,
+        'hyperparameters': hyperparameters,
+        'features_enabled': config.get('features_enabled', {}),
+        'target_type': config.get('target_type', 'open_to_close'),
+    }
+
+    model_bytes = booster.save_raw(model_registry.MODEL_FORMAT)
+    entry = model_registry.save_model(model_bytes, name, metadata)
+    if options['assign_to_symbols']:
+        for symbol in symbols:
+            model_registry.save_model(model_bytes, symbol, {**metadata, 'stock_symbol': symbol})
+
+    elapsed = time.time() - started
+    print(f"\n✓ Model saved: {name} v{entry['version']} ({entry['model_hash'][:12]}), "
+          f"test accuracy {test_metrics['accuracy']*100:.2f}% ({elapsed:.1f}s)")
+
+    return {
+        'success': True,
+        'name': name,
+        'symbols': spilled['symbols'],
+        'model_path': entry['model_path'],
+        'model_hash': entry['model_hash'],
+        'registry_version': entry['version'],
+        'rows': spilled['rows'],
+        'batches': {partition: len(files) for partition, files in spilled['files'].items()},
+        'validation_start': metadata['validation_start'],
+        'test_start': metadata['test_start'],
+        'trees_built': int(trees_built),
+        'best_iteration': best_iteration,
+        'fit_seconds': round(fit_seconds, 4),
+        'elapsed_seconds': round(elapsed, 4),
+        'test_metrics': test_metrics,
+        'trained_at': metadata['trained_at'],
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Usage: python pooled_training.py NAME SYMBOLS [CONFIG_JSON]")
+        print("Example: python pooled_training.py TECH AAPL,MSFT,NVDA '{\"pooled\": {\"batch_rows\": 100000}}'")
+        sys.exit(1)
+
+    name = sys.argv[1].upper()
+    symbols = [symbol.strip().upper() for symbol in sys.argv[2].split(',') if symbol.strip()]
+    config = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+
+    try:
+        results = pooled_training(name, symbols, config)
+    except Exception as e:
+        print(f"\n❌ ERROR during pooled training: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        results = {'success': False, 'error': str(e), 'name': name}
+
+    print("\n" + "="*60)
+    print("RESULTS (JSON)")
+    print("="*60)
+    print(json.dumps(results, indent=2, default=str))
+
+    sys.exit(0 if results.get('success', False) else 1)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Multi-symbol portfolio backtest with one shared capital pool
+
+Each symbol's daily predictions are aligned on a common date index into
+(days x symbols) matrices. Every day the pool is split across that day's
+signals (P(up) > threshold) by an allocation rule:
+
+    equal:       the same weight for every signal
+    confidence:  weights proportional to P(up) - threshold
+    top_k:       the k most confident signals, equal weight
+
+optionally capped at max_weight per symbol (the rest stays in cash).
+Positions are bought at the open and sold at the close like backtest.py,
+in whole shares of the current capital (or fractional shares with
+whole_shares off, which makes the whole run a cumulative product).
+
+The weights and P&L are computed for all symbols at once; only the
+compounding capital steps from day to day, so hundreds of symbols over a
+decade take well under a second.
+
+Options (defaults: config.PORTFOLIO_PARAMS):
+
+    {"allocation": "equal", "threshold": 0.5, "top_k": null,
+     "max_weight": null, "whole_shares": true}
+
+Usage: python portfolio_backtest.py AAPL,MSFT,... [INITIAL_CAPITAL] [OPTIONS_JSON]
+"""
+
+import sys
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import backtest
+from config import PORTFOLIO_PARAMS
+from utils import save_results, handle_error
+
+logger = logging.getLogger(__name__)
+
+ALLOCATIONS = ['equal', 'confidence', 'top_k']
+
+
+def stream_from_predicted(predicted: Dict) -> Dict[str, np.ndarray]:
+    """
+    Arrays of one symbol's backtest.predict_frame() output
+    """
+    df_features = predicted['df_features']
+    return {
+        'date': df_features['date'].to_numpy(dtype='datetime64[ns]'),
+        'open': df_features['open'].to_numpy(dtype=float),
+        'close': df_features['close'].to_numpy(dtype=float),
+        'probability': np.asarray(predicted['prediction_probas'], dtype=float),
+    }
+
+
+def align_streams(streams: Dict[str, Dict[str, np.ndarray]]) -> Dict:
+    """
+    Align per-symbol streams on the union of their dates
+
+    Args:
+        streams: Symbol -> arrays with date, open, close and probability
+
+    Returns:
+        Dict with dates, symbols and (days x symbols) open, close and
+        probability matrices (NaN where a symbol has no bar)
+    """
+    symbols = sorted(streams)
+    dates = np.unique(np.concatenate([streams[symbol]['date'] for symbol in symbols]))
+
+    shape = (len(dates), len(symbols))
+    aligned = {name: np.full(shape, np.nan) for name in ['open', 'close', 'probability']}
+    for j, symbol in enumerate(symbols):
+        rows = np.searchsorted(dates, streams[symbol]['date'])
+        for name in aligned:
+            aligned[name][rows, j] = streams[symbol][name]
+
+    return {'dates': dates, 'symbols': symbols, **aligned}
+
+
+def allocation_weights(probability: np.ndarray, tradable: np.ndarray, allocation: str = 'equal',
+                       threshold: float = 0.5, top_k: Optional[int] = None,
+                       max_weight: Optional[float] = None) -> np.ndarray:
+    """
+    Share of the pool given to each symbol on each day
+
+    Args:
+        probability: (days x symbols) P(up), NaN where there is no bar
+        tradable: (days x symbols) booleans, False where the bar can't be traded
+        allocation: 'equal', 'confidence' or 'top_k'
+        threshold: Minimum P(up) for a signal
+        top_k: Most signals held per day ('top_k'; optional cap for the others)
+        max_weight: Maximum weight per symbol
+
+    Returns:
+        (days x symbols) weights; each day's row sums to at most 1
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"Unknown allocation '{allocation}', expected one of {ALLOCATIONS}")
+
+    score = np.where(np.isnan(probability), -np.inf, probability)
+    signal = tradable & (score > threshold)
+
+    if allocation == 'top_k' and not top_k:
+        raise ValueError("top_k allocation needs top_k")
+    if top_k and top_k < signal.shape[1]:
+        ranked = np.argsort(np.where(signal, -score, np.inf), axis=1, kind='stable')[:, :top_k]
+        keep = np.zeros_like(signal)
+        np.put_along_axis(keep, ranked, True, axis=1)
+        signal &= keep
+
+    raw = np.where(signal, score - threshold, 0.0) if allocation == 'confidence' else signal.astype(float)
+    totals = raw.sum(axis=1, keepdims=True)
+    weights = np.divide(raw, totals, out=np.zeros_like(raw), where=totals > 0)
+
+    if max_weight is not None:
+        weights = np.minimum(weights, float(max_weight))
+    return weights
+
+
+def simulate_portfolio(aligned: Dict, initial_capital: float = 10000.0,
+                       options: Optional[Dict] = None) -> Dict:
+    """
+    Run the shared-capital strategy over aligned prediction streams
+
+    Args:
+        aligned: align_streams() output
+        initial_capital: Starting capital of the pool
+        options: Allocation options (see module docstring)
+
+    Returns:
+        Dictionary with portfolio metrics, per-symbol P&L and the equity curve
+    """
+    options = {**PORTFOLIO_PARAMS, **(options or {})}
+    open_, close = aligned['open'], aligned['close']
+    n_days, n_symbols = open_.shape
+
+    tradable = np.isfinite(open_) & np.isfinite(close) & (open_ > 0)
+    weights = allocation_weights(aligned['probability'], tradable, options['allocation'],
+                                 float(options['threshold']), options.get('top_k'), options.get('max_weight'))
+    price_change = np.where(tradable, close - open_, 0.0)
+    safe_open = np.where(tradable, open_, 1.0)
+
+    equity = np.empty(n_days)
+    if options['whole_shares']:
+        # Shares depend on the capital left by the previous days
+        shares = np.zeros((n_days, n_symbols))
+        capital = float(initial_capital)
+        for day in range(n_days):
+            if weights[day].any():
+                shares[day] = np.floor_divide(capital * weights[day], safe_open[day])
+                capital += float(shares[day] @ price_change[day])
+            equity[day] = capital
+        profit_loss = shares * price_change
+    else:
+        day_return = (weights * price_change / safe_open).sum(axis=1)
+        equity[:] = initial_capital * np.cumprod(1 + day_return)
+        start_of_day = np.concatenate([[initial_capital], equity[:-1]])
+        shares = start_of_day[:, None] * weights / safe_open
+        profit_loss = shares * price_change
+
+    positions = shares > 0
+    previous_equity = np.concatenate([[initial_capital], equity[:-1]])
+    daily_returns = equity / previous_equity - 1
+    running_max = np.maximum.accumulate(np.concatenate([[initial_capital], equity]))[1:]
+    invested_days = positions.any(axis=1)
+
+    std = daily_returns.std(ddof=1) if n_days > 1 else 0.0
+    final_capital = float(equity[-1]) if n_days else float(initial_capital)
+    total_trades = int(positions.sum())
+    winning_trades = int((positions & (profit_loss > 0)).sum())
+    symbol_profit_loss = profit_loss.sum(axis=0)
+    symbol_trades = positions.sum(axis=0)
+
+    return {
+        'allocation': options['allocation'],
+        'options': options,
+        'symbols': n_symbols,
+        'trading_days': int(n_days),
+        'start_date': str(aligned['dates'][0])[:10] if n_days else None,
+        'end_date': str(aligned['dates'][-1])[:10] if n_days else None,
+        'initial_capital': float(initial_capital),
+        'final_capital': final_capital,
+        'total_return_pct': float((final_capital - initial_capital) / initial_capital * 100),
+        'total_return_dollars': float(final_capital - initial_capital),
+        'sharpe_ratio': float(daily_returns.mean() / std * np.sqrt(252)) if std > 0 else 0.0,
+        'annualized_volatility_pct': float(std * np.sqrt(252) * 100),
+        'max_drawdown': float((equity / running_max - 1).min() * 100) if n_days else 0.0,
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'win_rate': float(winning_trades / total_trades * 100) if total_trades else 0.0,
+        'days_invested': int(invested_days.sum()),
+        'avg_positions_per_day': float(positions[invested_days].sum(axis=1).mean()) if invested_days.any() else 0.0,
+        'avg_exposure_pct': float(weights.sum(axis=1).mean() * 100) if n_days else 0.0,
+        'per_symbol': {
+            symbol: {'trades': int(symbol_trades[j]), 'profit_loss': float(symbol_profit_loss[j])}
+            for j, symbol in enumerate(aligned['symbols'])
+        },
+        'equity_curve': [
+            {'date': str(date)[:10], 'equity': float(value)}
+            for date, value in zip(aligned['dates'], equity)
+        ],
+    }
+
+
+def portfolio_backtest(symbols: List[str], initial_capital: float = 10000.0,
+                       options: Optional[Dict] = None) -> Dict:
+    """
+    Predict every symbol with its registered model and backtest the portfolio
+
+    Args:
+        symbols: Stock symbols
+        initial_capital: Starting capital of the pool
+        options: Allocation options, plus optional start_date/end_date
+
+    Returns:
+        Dictionary of portfolio results
+    """
+    try:
+        options = options or {}
+        streams, failed = {}, {}
+        for symbol in symbols:
+            try:
+                predicted = backtest.predict_frame(symbol, options.get('start_date'), options.get('end_date'))
+                streams[symbol] = stream_from_predicted(predicted)
+            except Exception as e:
+                logger.error(f"Skipping {symbol}: {e}")
+                failed[symbol] = str(e)
+
+        if not streams:
+            raise ValueError("No symbol could be predicted")
+
+        allocation_options = {key: value for key, value in options.items() if key in PORTFOLIO_PARAMS}
+        result = simulate_portfolio(align_streams(streams), initial_capital, allocation_options)
+        return {'success': True, 'backtested_at': datetime.now().isoformat(), 'failed': failed, **result}
+
+    except Exception as e:
+        return handle_error(e, "PORTFOLIO_ERROR")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python portfolio_backtest.py <SYMBOLS> [INITIAL_CAPITAL] [OPTIONS_JSON]")
+        print("Example: python portfolio_backtest.py AAPL,MSFT,NVDA 100000 '{\"allocation\": \"top_k\", \"top_k\": 2}'")
+        sys.exit(1)
+
+    symbols = [symbol.strip().upper() for symbol in sys.argv[1].split(',') if symbol.strip()]
+    initial_capital = float(sys.argv[2]) if len(sys.argv) > 2 else 10000.0
+    options = json.loads(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    result = portfolio_backtest(symbols, initial_capital, options)
+    save_results(result)
+
+    sys.exit(0 if result.get('success', False) else 1)
@@ -0,0 +1,403 @@
+"""
+Memory-mapped multi-symbol OHLCV archive
+
+The whole universe lives in one directory (PRICE_ARCHIVE_DIR) using the
+same column dtypes as price_store, except that every column file holds
+the rows of all symbols back to back:
+
+    date-{G}.i8  open-{G}.f8  ...  volume-{G}.f8  adjusted_close-{G}.f8
+    index.json  {"format": "ohlcv-archive", "version": 2, "generation": G,
+                 "rows": N, "columns": [...],
+                 "symbols": {"AAPL": {"offset": ..., "length": ...,
+                                      "first_date": "YYYY-MM-DD",
+                                      "last_date": "YYYY-MM-DD",
+                                      "updated_at": unix time}, ...}}
+
+Column files are append-only. Adding or refreshing a symbol appends its
+rows at the end and then atomically replaces index.json, so concurrent
+readers keep a consistent view; a refreshed symbol's old rows stay in the
+files as dead space until compact() writes the next generation of column
+files and switches the index over to it. Readers map each column once per
+process and hand out slices, so any number of training or backtest
+workers share the same pages through the OS page cache.
+
+Version 1 archives (epoch-day dates, int64 volume) are still readable,
+with the date column converted in memory, but can't be appended to;
+rebuild them with `python price_archive.py build`.
+
+Usage: python price_archive.py build [SYMBOL ...]
+       python price_archive.py compact
+"""
+
+import fcntl
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import price_store
+from config import DATA_DIR, PRICE_ARCHIVE_DIR
+
+ARCHIVE_FORMAT = 'ohlcv-archive'
+ARCHIVE_VERSION = 2
+
+# (index.json mtime_ns, index, column memmaps) per archive directory
+_open_archives: Dict[Path, Tuple[int, Dict, Dict[str, np.ndarray]]] = {}
+
+
+def _column_file(archive_dir: Path, name: str, generation: int, dtype=None) -> Path:
+    dtype = np.dtype(dtype or price_store.STORE_COLUMNS[name][0])
+    return archive_dir / f"{name}-{generation}.{dtype.kind}{dtype.itemsize}"
+
+
+def _empty_index() -> Dict:
+    return {
+        'format': ARCHIVE_FORMAT,
+        'version': ARCHIVE_VERSION,
+        'generation': 0,
+        'rows': 0,
+        'columns': [{'name': name, 'dtype': dtype} for name, (dtype, _) in price_store.STORE_COLUMNS.items()],
+        'symbols': {},
+    }
+
+
+def read_index(archive_dir: Optional[Path] = None) -> Dict:
+    """
+    Read the archive index
+
+    Raises:
+        FileNotFoundError: If the archive doesn't exist
+    """
+    index_file = Path(archive_dir or PRICE_ARCHIVE_DIR) / 'index.json'
+    if not index_file.exists():
+        raise FileNotFoundError(f"Price archive not found: {index_file.parent}")
+
+    with open(index_file, 'r') as f:
+        index = json.load(f)
+
+    if index.get('format') != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported price archive format in {index_file}: {index.get('format')}")
+
+    return index
+
+
+def _open_archive(archive_dir: Path) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """
+    Map every column read-only, reusing the mapping while index.json is unchanged
+    """
+    index_file = archive_dir / 'index.json'
+    mtime = index_file.stat().st_mtime_ns
+
+    cached = _open_archives.get(archive_dir)
+    if cached is not None and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    index = read_index(archive_dir)
+    rows = int(index['rows'])
+    columns = {}
+    try:
+        for column in index['columns']:
+            name, dtype = column['name'], np.dtype(column['dtype'])
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                # Files may extend past `rows` while a writer appends; map only committed rows
+                column_file = _column_file(archive_dir, name, index['generation'], dtype)
+                columns[name] = np.memmap(column_file, dtype=dtype, mode='r', shape=(rows,))
+    except FileNotFoundError:
+        # compact() replaced this generation between reading the index and mapping
+        if index_file.stat().st_mtime_ns == mtime:
+            raise
+        return _open_archive(archive_dir)
+
+    if int(index.get('version', 1)) < 2:
+        columns['date'] = price_store.legacy_dates(columns['date'])
+
+    _open_archives[archive_dir] = (mtime, index, columns)
+    return index, columns
+
+
+def archive_symbols(archive_dir: Optional[Path] = None) -> List[str]:
+    """
+    Symbols present in the archive (empty if there is no archive)
+    """
+    archive_dir = Path(archive_dir or PRICE_ARCHIVE_DIR)
+    if not (archive_dir / 'index.json').exists():
+        return []
+    index, _ = _open_archive(archive_dir)
+    return sorted(index['symbols'])
+
+
+def read_symbol_entry(symbol: str, archive_dir: Optional[Path] = None) -> Optional[Dict]:
+    """
+    Index entry (offset, length, first/last date, updated_at) for a symbol
+
+    Returns:
+        The entry, or None if the archive doesn't exist or lacks the symbol
+    """
+    archive_dir = Path(archive_dir or PRICE_ARCHIVE_DIR)
+    if not (archive_dir / 'index.json').exists():
+        return None
+    index, _ = _open_archive(archive_dir)
+    return index['symbols'].get(symbol)
+
+
+def date_bounds(dates: np.ndarray, start_date=None, end_date=None) -> Tuple[int, int]:
+    """
+    Row range [begin, end) of sorted epoch-nanosecond dates within an inclusive date range
+
+    Args:
+        dates: Sorted int64 nanoseconds since 1970-01-01
+        start_date: First date to include, anything pd.Timestamp accepts (None = unbounded)
+        end_date: Last date to include (None = unbounded); a bare date
+            includes every bar on that day
+
+    Returns:
+        (begin, end) row positions
+    """
+    begin = 0 if start_date is None else int(np.searchsorted(dates, _epoch_ns(start_date), side='left'))
+    if end_date is None:
+        end = len(dates)
+    elif pd.Timestamp(end_date) == pd.Timestamp(end_date).normalize():
+        end = int(np.searchsorted(dates, _epoch_ns(pd.Timestamp(end_date) + pd.Timedelta(days=1)), side='left'))
+    else:
+        end = int(np.searchsorted(dates, _epoch_ns(end_date), side='right'))
+    return begin, max(begin, end)
+
+
+def read_symbol_arrays(symbol: str, start_date=None, end_date=None,
+                       archive_dir: Optional[Path] = None) -> Dict[str, np.ndarray]:
+    """
+    Zero-copy views of one symbol's rows, optionally limited to a date range
+
+    Args:
+        symbol: Stock symbol
+        start_date: First date to include (inclusive), anything pd.Timestamp accepts
+        end_date: Last date to include (inclusive)
+        archive_dir: Override the archive directory
+
+    Returns:
+        Dict of column name -> read-only view (dates as int64 epoch nanoseconds)
+
+    Raises:
+        KeyError: If the symbol is not in the archive
+    """
+    archive_dir = Path(archive_dir or PRICE_ARCHIVE_DIR)
+    index, columns = _open_archive(archive_dir)
+
+    entry = index['symbols'].get(symbol)
+    if entry is None:
+        raise KeyError(f"Symbol not in price archive: {symbol}")
+
+    offset = int(entry['offset'])
+    begin, end = date_bounds(columns['date'][offset:offset + int(entry['length'])], start_date, end_date)
+
+    return {name: values[offset + begin:offset + end] for name, values in columns.items()}
+
+
+def _epoch_ns(value) -> int:
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return int(timestamp.value)
+
+
+def _iso_date(epoch_ns: int) -> str:
+    return str(np.datetime64(int(epoch_ns), 'ns').astype('datetime64[D]'))
+
+
+@contextmanager
+def _write_lock(archive_dir: Path):
+    """
+    Serialize writers; readers never take the lock
+    """
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    with open(archive_dir / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _check_writable(index: Dict, archive_dir: Path) -> None:
+    """
+    Refuse to mix rows of an older layout with the current one
+    """
+    if int(index.get('version', 1)) != ARCHIVE_VERSION:
+        raise ValueError(f"Price archive {archive_dir} has version {index.get('version', 1)}, "
+                         f"expected {ARCHIVE_VERSION}; move it aside and rebuild it with "
+                         f"'python price_archive.py build'")
+
+
+def _write_index(archive_dir: Path, index: Dict) -> None:
+    tmp_file = archive_dir / 'index.json.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(index, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, archive_dir / 'index.json')
+
+
+def _frame_to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Normalize an OHLCV frame to the archive column dtypes
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values('date').reset_index(drop=True)
+    if 'adjusted_close' not in df.columns:
+        df['adjusted_close'] = df['close']
+    df['adjusted_close'] = df['adjusted_close'].fillna(df['close'])
+
+    columns = {}
+    for name, (dtype, _) in price_store.STORE_COLUMNS.items():
+        if name == 'date':
+            values = price_store.to_epoch_ns(df['date'])
+        else:
+            values = df[name].to_numpy(dtype=float)
+        columns[name] = np.ascontiguousarray(values, dtype=dtype)
+    return columns
+
+
+def append_symbols(frames: Dict[str, pd.DataFrame], archive_dir: Optional[Path] = None) -> Dict:
+    """
+    Append (or refresh) symbols in the archive
+
+    Rows are appended to every column file, then index.json is replaced to
+    point each symbol at its new segment. Bytes left behind by an
+    interrupted write (beyond the committed row count) are truncated first.
+
+    Args:
+        frames: Symbol -> OHLCV DataFrame
+        archive_dir: Override the archive directory
+
+    Returns:
+        The new index
+    """
+    archive_dir = Path(archive_dir or PRICE_ARCHIVE_DIR)
+
+    with _write_lock(archive_dir):
+        index = read_index(archive_dir) if (archive_dir / 'index.json').exists() else _empty_index()
+        _check_writable(index, archive_dir)
+        rows = int(index['rows'])
+        generation = index['generation']
+
+        segments = {symbol: _frame_to_columns(df) for symbol, df in frames.items()}
+
+        for name, (dtype, _) in price_store.STORE_COLUMNS.items():
+            column_file = _column_file(archive_dir, name, generation)
+            with open(column_file, 'ab') as f:
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                for columns in segments.values():
+                    columns[name].tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        offset = rows
+        updated_at = time.time()
+        for symbol, columns in segments.items():
+            length = len(columns['date'])
+            index['symbols'][symbol] = {
+                'offset': offset,
+                'length': length,
+                'first_date': _iso_date(columns['date'][0]) if length else None,
+                'last_date': _iso_date(columns['date'][-1]) if length else None,
+                'updated_at': updated_at,
+            }
+            offset += length
+        index['rows'] = offset
+
+        _write_index(archive_dir, index)
+
+    return index
+
+
+def compact(archive_dir: Optional[Path] = None) -> int:
+    """
+    Rewrite the archive without the dead rows of refreshed symbols
+
+    The live rows are copied into the next generation of column files, the
+    index is switched over, and only then are the old files removed;
+    readers that already mapped them keep their (unlinked) pages.
+
+    Returns:
+        Number of rows reclaimed
+    """
+    archive_dir = Path(archive_dir or PRICE_ARCHIVE_DIR)
+
+    with _write_lock(archive_dir):
+        index = read_index(archive_dir)
+        _check_writable(index, archive_dir)
+        old_rows = int(index['rows'])
+        old_generation = index['generation']
+        symbols = sorted(index['symbols'], key=lambda s: index['symbols'][s]['offset'])
+
+        for name, (dtype, _) in price_store.STORE_COLUMNS.items():
+            values = np.fromfile(_column_file(archive_dir, name, old_generation), dtype=dtype, count=old_rows)
+            with open(_column_file(archive_dir, name, old_generation + 1), 'wb') as f:
+                for symbol in symbols:
+                    entry = index['symbols'][symbol]
+                    values[entry['offset']:entry['offset'] + entry['length']].tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        offset = 0
+        for symbol in symbols:
+            index['symbols'][symbol]['offset'] = offset
+            offset += index['symbols'][symbol]['length']
+        index['rows'] = offset
+        index['generation'] = old_generation + 1
+
+        _write_index(archive_dir, index)
+
+        for name in price_store.STORE_COLUMNS:
+            _column_file(archive_dir, name, old_generation).unlink(missing_ok=True)
+
+    return old_rows - offset
+
+
+def build_archive(symbols: Optional[List[str]] = None, data_dir: Optional[Path] = None,
+                  archive_dir: Optional[Path] = None) -> Dict:
+    """
+    Add symbols from their per-symbol exports (columnar store or CSV)
+
+    Args:
+        symbols: Symbols to add; defaults to every export in data_dir
+        data_dir: Directory holding the exports
+        archive_dir: Override the archive directory
+
+    Returns:
+        The new index
+    """
+    from utils import load_price_data
+
+    data_dir = Path(data_dir or DATA_DIR)
+    if symbols is None:
+        stores = {path.name[:-len(price_store.STORE_SUFFIX)] for path in data_dir.glob(f"*{price_store.STORE_SUFFIX}")
+                  if (path / 'meta.json').exists()}
+        symbols = sorted(stores | set(price_store.list_csv_symbols(data_dir)))
+
+    frames = {symbol: load_price_data(symbol, data_dir, use_archive=False) for symbol in symbols}
+    return append_symbols(frames, archive_dir)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'compact'):
+        print("Usage: python price_archive.py build [SYMBOL ...]")
+        print("       python price_archive.py compact")
+        sys.exit(1)
+
+    if sys.argv[1] == 'compact':
+        reclaimed = compact()
+        print(f"Reclaimed {reclaimed:,} rows in {PRICE_ARCHIVE_DIR}")
+    else:
+        symbols = [symbol.upper() for symbol in sys.argv[2:]] or None
+        index = build_archive(symbols)
+        print(f"{len(index['symbols'])} symbols, {index['rows']:,} rows in {PRICE_ARCHIVE_DIR}")
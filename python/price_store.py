@@ -0,0 +1,260 @@
+"""
+Columnar binary price store
+
+Each symbol is stored as a directory DATA_DIR/{SYMBOL}.ohlcv holding one
+raw little-endian array file per column plus a small meta.json:
+
+    date.i8            int64   nanoseconds since 1970-01-01 (datetime64[ns])
+    open.f8            float64
+    high.f8            float64
+    low.f8             float64
+    close.f8           float64
+    volume.f8          float64 (NaN where the volume is unknown)
+    adjusted_close.f8  float64
+    meta.json          {"format": "ohlcv-columns", "version": 2,
+                        "rows": N, "columns": [{"name": ..., "dtype": ...}]}
+
+There is no header inside the array files, so a column is simply
+`rows` consecutive 8-byte values and can be memory-mapped without any
+parsing. meta.json is written last and its "rows" value is
+authoritative. The Laravel exporter (PythonBridgeService) writes this
+layout directly; convert_csv() migrates existing CSV exports.
+
+Version 1 stores held dates as int64 days and volume as int64; they are
+still readable (the date column is converted in memory) until rewritten.
+
+Usage: python price_store.py convert [SYMBOL ...]
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_DIR
+
+STORE_FORMAT = 'ohlcv-columns'
+STORE_VERSION = 2
+STORE_SUFFIX = '.ohlcv'
+
+# Column name -> (numpy dtype, file extension)
+STORE_COLUMNS = {
+    'date': ('<i8', 'i8'),
+    'open': ('<f8', 'f8'),
+    'high': ('<f8', 'f8'),
+    'low': ('<f8', 'f8'),
+    'close': ('<f8', 'f8'),
+    'volume': ('<f8', 'f8'),
+    'adjusted_close': ('<f8', 'f8'),
+}
+
+
+def store_path(symbol: str, data_dir: Optional[Path] = None) -> Path:
+    """
+    Directory holding a symbol's column files
+    """
+    return Path(data_dir or DATA_DIR) / f"{symbol}{STORE_SUFFIX}"
+
+
+def store_exists(symbol: str, data_dir: Optional[Path] = None) -> bool:
+    """
+    Check whether a complete store (with meta.json) exists for a symbol
+    """
+    return (store_path(symbol, data_dir) / 'meta.json').exists()
+
+
+def read_meta(symbol: str, data_dir: Optional[Path] = None) -> Dict:
+    """
+    Read a store's meta.json
+
+    Raises:
+        FileNotFoundError: If the store doesn't exist
+    """
+    meta_file = store_path(symbol, data_dir) / 'meta.json'
+    if not meta_file.exists():
+        raise FileNotFoundError(f"Price store not found: {meta_file.parent}")
+
+    with open(meta_file, 'r') as f:
+        meta = json.load(f)
+
+    if meta.get('format') != STORE_FORMAT:
+        raise ValueError(f"Unsupported price store format in {meta_file}: {meta.get('format')}")
+
+    return meta
+
+
+def read_price_arrays(symbol: str, data_dir: Optional[Path] = None) -> Dict[str, np.ndarray]:
+    """
+    Memory-map every column of a symbol's store without copying
+
+    Args:
+        symbol: Stock symbol
+        data_dir: Override the data directory
+
+    Returns:
+        Dict of column name -> read-only array (dates as int64 epoch nanoseconds)
+    """
+    path = store_path(symbol, data_dir)
+    meta = read_meta(symbol, data_dir)
+    rows = int(meta['rows'])
+
+    arrays = {}
+    for column in meta['columns']:
+        name, dtype = column['name'], np.dtype(column['dtype'])
+        column_file = path / f"{name}.{dtype.kind}{dtype.itemsize}"
+        if rows == 0:
+            arrays[name] = np.empty(0, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(column_file, dtype=dtype, mode='r', shape=(rows,))
+
+    if int(meta.get('version', 1)) < 2:
+        arrays['date'] = legacy_dates(arrays['date'])
+
+    return arrays
+
+
+def legacy_dates(epoch_days: np.ndarray) -> np.ndarray:
+    """
+    Convert version 1 epoch-day dates to epoch nanoseconds
+    """
+    return np.asarray(epoch_days, dtype=np.int64).astype('datetime64[D]').astype('datetime64[ns]').view(np.int64)
+
+
+def to_epoch_ns(dates) -> np.ndarray:
+    """
+    int64 epoch nanoseconds of anything pd.to_datetime accepts
+    """
+    return np.asarray(pd.to_datetime(dates), dtype='datetime64[ns]').view(np.int64)
+
+
+def read_price_frame(symbol: str, data_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Load a symbol's store as a DataFrame with the same columns as the CSV export
+
+    Args:
+        symbol: Stock symbol
+        data_dir: Override the data directory
+
+    Returns:
+        DataFrame with a datetime64 date column
+    """
+    return arrays_to_frame(read_price_arrays(symbol, data_dir))
+
+
+def arrays_to_frame(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Build a DataFrame (datetime64 dates) from price column arrays
+
+    Args:
+        arrays: Column name -> array, dates as int64 epoch nanoseconds
+
+    Returns:
+        DataFrame with the same columns as the CSV export
+    """
+    data = {}
+    for name, values in arrays.items():
+        if name == 'date':
+            data[name] = np.asarray(values, dtype=np.int64).astype('datetime64[ns]')
+        else:
+            data[name] = np.asarray(values)
+    return pd.DataFrame(data)
+
+
+def write_price_store(symbol: str, df: pd.DataFrame, data_dir: Optional[Path] = None) -> Path:
+    """
+    Write an OHLCV frame in the columnar store layout
+
+    Args:
+        symbol: Stock symbol
+        df: DataFrame with date/open/high/low/close/volume (adjusted_close optional)
+        data_dir: Override the data directory
+
+    Returns:
+        Path to the store directory
+    """
+    path = store_path(symbol, data_dir)
+    path.mkdir(parents=True, exist_ok=True)
+
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values('date').reset_index(drop=True)
+    if 'adjusted_close' not in df.columns:
+        df['adjusted_close'] = df['close']
+    df['adjusted_close'] = df['adjusted_close'].fillna(df['close'])
+
+    columns = []
+    for name, (dtype, extension) in STORE_COLUMNS.items():
+        if name == 'date':
+            values = to_epoch_ns(df['date'])
+        else:
+            values = df[name].to_numpy(dtype=float)
+        values = np.ascontiguousarray(values, dtype=dtype)
+
+        tmp_file = path / f"{name}.{extension}.tmp"
+        values.tofile(tmp_file)
+        os.replace(tmp_file, path / f"{name}.{extension}")
+        columns.append({'name': name, 'dtype': dtype})
+
+    meta = {
+        'format': STORE_FORMAT,
+        'version': STORE_VERSION,
+        'rows': int(len(df)),
+        'columns': columns,
+    }
+    tmp_meta = path / 'meta.json.tmp'
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, path / 'meta.json')
+
+    # Column files left by an older layout (e.g. version 1 volume.i8)
+    current = {f"{name}.{extension}" for name, (_, extension) in STORE_COLUMNS.items()}
+    for stale in path.iterdir():
+        if stale.name != 'meta.json' and stale.name not in current:
+            stale.unlink()
+
+    return path
+
+
+def convert_csv(symbol: str, data_dir: Optional[Path] = None) -> Path:
+    """
+    Convert an existing {SYMBOL}.csv export into the columnar store
+
+    Args:
+        symbol: Stock symbol
+        data_dir: Override the data directory
+
+    Returns:
+        Path to the store directory
+    """
+    csv_file = Path(data_dir or DATA_DIR) / f"{symbol}.csv"
+    if not csv_file.exists():
+        raise FileNotFoundError(f"Data file not found: {csv_file}")
+
+    df = pd.read_csv(csv_file)
+    return write_price_store(symbol, df, data_dir)
+
+
+def list_csv_symbols(data_dir: Optional[Path] = None) -> List[str]:
+    """
+    Symbols with a CSV export in the data directory
+    """
+    return sorted(path.stem for path in Path(data_dir or DATA_DIR).glob('*.csv'))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'convert':
+        print("Usage: python price_store.py convert [SYMBOL ...]")
+        print("Converts data/{SYMBOL}.csv exports (all of them if no symbol is given)")
+        sys.exit(1)
+
+    symbols = [symbol.upper() for symbol in sys.argv[2:]] or list_csv_symbols()
+
+    for symbol in symbols:
+        path = convert_csv(symbol)
+        csv_size = (Path(DATA_DIR) / f"{symbol}.csv").stat().st_size
+        store_size = sum(f.stat().st_size for f in path.iterdir())
+        print(f"{symbol}: {csv_size:,} bytes CSV -> {store_size:,} bytes columnar ({path})")
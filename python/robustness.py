@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo robustness of backtest metrics
+
+calculate_trading_metrics gives one estimate from one trade path. This
+resamples the trade series thousands of times and reports confidence
+intervals for the same metrics:
+
+    block bootstrap: the trades are redrawn in blocks of consecutive
+        trades (moving-block bootstrap), which keeps short-range
+        dependence such as winning/losing streaks
+    shuffle (optional): the actual trades in random order; only the
+        path-dependent max_drawdown changes, which shows how much of the
+        observed drawdown is down to the order the trades happened in
+
+Resamples are drawn in batches of (resamples x trades) matrices and every
+metric is computed for a whole batch with array operations. Batches run
+across a process pool. Each batch has its own random stream, spawned from
+one SeedSequence, so the results depend only on the seed, not on the
+number of workers.
+
+10,000 resamples of a ~1,500-trade history take about half a second on one
+core.
+
+Options (defaults: config.ROBUSTNESS_PARAMS):
+
+    {"resamples": 10000, "block_size": null, "confidence": 0.95,
+     "shuffle": false, "batch_size": 250, "seed": 42, "workers": null}
+
+block_size null uses about n ** (1/3) trades per block.
+
+Usage: python robustness.py AAPL [OPTIONS_JSON]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import ROBUSTNESS_PARAMS
+from utils import save_results, handle_error
+
+logger = logging.getLogger(__name__)
+
+METRICS = [
+    'sharpe_ratio', 'max_drawdown', 'win_rate', 'avg_profit_per_trade',
+    'total_profit_loss', 'profit_factor', 'compounded_return_pct',
+]
+
+
+def trade_metrics(returns: np.ndarray, profit_loss: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    calculate_trading_metrics for every row of a (resamples x trades) matrix
+
+    Args:
+        returns: Per-trade returns as decimals (profit_loss_pct / 100)
+        profit_loss: Per-trade profit/loss in dollars
+
+    Returns:
+        Dict of metric name -> one value per row
+    """
+    mean = returns.mean(axis=1)
+    std = returns.std(axis=1, ddof=1) if returns.shape[1] > 1 else np.zeros(len(returns))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = np.where(std != 0, mean / std * np.sqrt(252), 0.0)
+
+    # Drawdown of the cumulative (summed) returns, as in calculate_trading_metrics
+    cumulative = np.cumsum(returns, axis=1)
+    max_drawdown = (cumulative - np.maximum.accumulate(cumulative, axis=1)).min(axis=1) * 100
+
+    gross_profit = np.where(profit_loss > 0, profit_loss, 0.0).sum(axis=1)
+    gross_loss = -np.where(profit_loss < 0, profit_loss, 0.0).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit_factor = np.where(gross_loss > 0, gross_profit / gross_loss, 0.0)
+
+    return {
+        'sharpe_ratio': sharpe_ratio,
+        'max_drawdown': max_drawdown,
+        'win_rate': (profit_loss > 0).mean(axis=1) * 100,
+        'avg_profit_per_trade': profit_loss.mean(axis=1),
+        'total_profit_loss': profit_loss.sum(axis=1),
+        'profit_factor': profit_factor,
+        # Every trade's return compounded on the full capital
+        'compounded_return_pct': np.expm1(np.log1p(returns).sum(axis=1)) * 100,
+    }
+
+
+def block_indices(rng: np.random.Generator, n_trades: int, block_size: int, n_resamples: int) -> np.ndarray:
+    """
+    Trade indices of moving-block bootstrap resamples, shaped (resamples x trades)
+    """
+    block_size = min(block_size, n_trades)
+    n_blocks = -(-n_trades // block_size)
+    starts = rng.integers(0, n_trades - block_size + 1, size=(n_resamples, n_blocks))
+    indices = starts[:, :, None] + np.arange(block_size)
+    return indices.reshape(n_resamples, n_blocks * block_size)[:, :n_trades]
+
+
+def _run_batch(task: tuple) -> Dict[str, np.ndarray]:
+    """
+    Metrics of one batch of resamples (runs inside a pool process)
+    """
+    returns, profit_loss, seed, n_resamples, block_size, shuffle = task
+    rng = np.random.default_rng(seed)
+    n_trades = len(returns)
+
+    if shuffle:
+        indices = rng.permuted(np.broadcast_to(np.arange(n_trades), (n_resamples, n_trades)), axis=1)
+    else:
+        indices = block_indices(rng, n_trades, block_size, n_resamples)
+
+    return trade_metrics(returns[indices], profit_loss[indices])
+
+
+def _summarize(values: Dict[str, np.ndarray], estimate: Dict[str, np.ndarray],
+               confidence: float, metrics: list) -> Dict[str, Dict[str, float]]:
+    tail = (1 - confidence) / 2 * 100
+    summary = {}
+    for name in metrics:
+        lower, median, upper = np.percentile(values[name], [tail, 50, 100 - tail])
+        summary[name] = {
+            'estimate': float(estimate[name][0]),
+            'mean': float(values[name].mean()),
+            'std': float(values[name].std()),
+            'median': float(median),
+            'lower': float(lower),
+            'upper': float(upper),
+        }
+    return summary
+
+
+def resample(returns: np.ndarray, profit_loss: np.ndarray, n_resamples: int, block_size: int,
+             shuffle: bool, seed: np.random.SeedSequence, batch_size: int,
+             executor: Optional[ProcessPoolExecutor] = None) -> Dict[str, np.ndarray]:
+    """
+    Metric values of every resample, drawn in batches
+
+    Args:
+        returns: Per-trade returns as decimals
+        profit_loss: Per-trade profit/loss in dollars
+        n_resamples: Number of resamples
+        block_size: Trades per bootstrap block
+        shuffle: Permute the trades instead of bootstrapping them
+        seed: Parent seed; each batch gets one of its spawned children
+        batch_size: Resamples per batch
+        executor: Optional process pool to run the batches on
+
+    Returns:
+        Dict of metric name -> one value per resample
+    """
+    sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    tasks = [(returns, profit_loss, child, size, block_size, shuffle)
+             for child, size in zip(seed.spawn(len(sizes)), sizes)]
+
+    batches = list(executor.map(_run_batch, tasks) if executor is not None else map(_run_batch, tasks))
+    return {name: np.concatenate([batch[name] for batch in batches]) for name in METRICS}
+
+
+def bootstrap_trades(trades_df: pd.DataFrame, options: Optional[Dict] = None) -> Dict:
+    """
+    Confidence intervals for the trading metrics of a backtest's trades
+
+    Args:
+        trades_df: Trades from simulate_trading (profit_loss, profit_loss_pct)
+        options: Resampling options (see module docstring)
+
+    Returns:
+        Dictionary with the bootstrap (and optional shuffle) intervals
+    """
+    options = {**ROBUSTNESS_PARAMS, **(options or {})}
+    started = time.time()
+
+    returns = trades_df['profit_loss_pct'].to_numpy(dtype=float) / 100
+    profit_loss = trades_df['profit_loss'].to_numpy(dtype=float)
+    n_trades = len(returns)
+    if n_trades < 2:
+        raise ValueError(f"Need at least 2 trades to resample, got {n_trades}")
+
+    n_resamples = int(options['resamples'])
+    confidence = float(options['confidence'])
+    block_size = int(options['block_size'] or max(1, round(n_trades ** (1 / 3))))
+    batch_size = int(options['batch_size'])
+    workers = int(options['workers'] or os.cpu_count() or 1)
+    workers = max(1, min(workers, -(-n_resamples // batch_size)))
+
+    bootstrap_seed, shuffle_seed = np.random.SeedSequence(options['seed']).spawn(2)
+    estimate = trade_metrics(returns[None, :], profit_loss[None, :])
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        values = resample(returns, profit_loss, n_resamples, block_size, False,
+                          bootstrap_seed, batch_size, executor)
+        result = {
+            'trades': n_trades,
+            'resamples': n_resamples,
+            'block_size': block_size,
+            'confidence': confidence,
+            'seed': options['seed'],
+            'processes': workers,
+            'bootstrap': _summarize(values, estimate, confidence, METRICS),
+        }
+
+        if options['shuffle']:
+            # Reordering only changes the path, i.e. the drawdown
+            shuffled = resample(returns, profit_loss, n_resamples, block_size, True,
+                                shuffle_seed, batch_size, executor)
+            result['shuffle'] = _summarize(shuffled, estimate, confidence, ['max_drawdown'])
+            result['shuffle']['max_drawdown']['worse_than_estimate_pct'] = float(
+                (shuffled['max_drawdown'] < estimate['max_drawdown'][0]).mean() * 100
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    result['elapsed_seconds'] = round(time.time() - started, 4)
+    logger.info(f"Resampled {n_trades} trades {n_resamples} times in {result['elapsed_seconds']}s")
+    return result
+
+
+def main(symbol: str, options: Optional[Dict] = None, initial_capital: float = 10000.0) -> Dict:
+    """
+    Backtest a symbol and resample its trades
+
+    Args:
+        symbol: Stock symbol
+        options: Resampling options, plus optional start_date/end_date
+        initial_capital: Starting capital for the simulation
+
+    Returns:
+        Dictionary with the robustness results
+    """
+    import backtest  # backtest imports this module for main(robustness=...)
+
+    try:
+        options = options or {}
+        predicted = backtest.predict_frame(symbol, options.get('start_date'), options.get('end_date'))
+        trades_df = backtest.simulate_trading(predicted['df_features'], predicted['predictions'],
+                                              predicted['prediction_probas'], initial_capital)
+        if trades_df.empty:
+            raise ValueError("The backtest made no trades")
+
+        resampling = {key: value for key, value in options.items() if key in ROBUSTNESS_PARAMS}
+        return {
+            'success': True,
+            'symbol': symbol,
+            'stock_symbol': symbol,
+            **bootstrap_trades(trades_df, resampling),
+        }
+
+    except Exception as e:
+        return handle_error(e, "ROBUSTNESS_ERROR")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python robustness.py <SYMBOL> [OPTIONS_JSON]")
+        print("Example: python robustness.py AAPL '{\"resamples\": 10000, \"shuffle\": true}'")
+        sys.exit(1)
+
+    symbol = sys.argv[1].upper()
+    options = json.loads(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    result = main(symbol, options)
+    save_results(result)
+
+    sys.exit(0 if result.get('success', False) else 1)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Train and backtest many symbols in parallel
+
+An experiment spec is a JSON object:
+
+    {
+      "symbols": ["AAPL", "MSFT", ...],
+      "config": {"name": ..., "hyperparameters": {...}, "features_enabled": {...}},
+      "initial_capital": 10000,
+      "start_date": "2023-01-01",     (optional)
+      "end_date": "2024-12-31",       (optional)
+      "workers": 8,                   (optional, defaults to the core count)
+      "portfolio": {"allocation": "top_k", "top_k": 5},  (optional, false to skip)
+      "robustness": {"resamples": 10000}                  (optional, true for the defaults)
+    }
+
+start_date/end_date bound the data each model is trained on; the
+backtest then covers only that model's held-out test period, the most
+recent part of the window.
+
+Symbols are trained and backtested in a pool of processes. The cores are
+split between them: with W processes on C cores each XGBoost model gets
+C // W threads instead of all of them, so the box is never oversubscribed.
+
+Results are written to stdout as JSON lines, one per symbol as soon as it
+finishes, followed by a summary line:
+
+    {"event": "symbol", "symbol": "AAPL", "success": true, "training": {...}, "backtest": {...}}
+    {"event": "summary", "success": true, "symbols": 500, "succeeded": 498, "portfolio": {...}, ...}
+
+With robustness set, each symbol's backtest also carries bootstrap
+confidence intervals for its trading metrics (robustness.py), resampled
+inside the symbol's own process.
+
+The summary's portfolio is the shared-capital backtest of all succeeded
+symbols (portfolio_backtest.py) with the spec's allocation options over
+config.PORTFOLIO_PARAMS. Each process returns its symbol's predictions
+with the result, so the portfolio needs no second prediction pass.
+
+Progress prints from training and backtesting go to stderr.
+
+Usage: python run_experiment.py SPEC_FILE    (or - to read the spec from stdin)
+"""
+
+import sys
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from typing import Dict, Optional, Tuple
+
+import backtest
+import portfolio_backtest
+from config import EXPERIMENT_WORKERS
+from train_model import train_model
+from utils import handle_error, split_threads
+
+logger = logging.getLogger(__name__)
+
+
+def robustness_options(spec: Dict) -> Optional[Dict]:
+    """
+    Resampling options for each symbol's backtest (None when the spec skips it)
+
+    Symbols already run one per process, so the resamples of a symbol stay
+    in that process.
+    """
+    options = spec.get('robustness')
+    if not options:
+        return None
+    return {**(options if isinstance(options, dict) else {}), 'workers': 1}
+
+
+def run_symbol(symbol: str, spec: Dict, n_jobs: int) -> Tuple[Dict, Optional[Dict]]:
+    """
+    Train and backtest one symbol (runs inside a pool process)
+
+    Args:
+        symbol: Stock symbol
+        spec: Experiment spec
+        n_jobs: XGBoost threads for this model
+
+    Returns:
+        Tuple of the result line for the symbol and its prediction stream
+        for the portfolio backtest (None if it failed or the spec skips it)
+    """
+    started = time.time()
+    config = dict(spec.get('config') or {})
+    if spec.get('start_date'):
+        config['start_date'] = spec['start_date']
+    if spec.get('end_date'):
+        config['end_date'] = spec['end_date']
+
+    result = {'event': 'symbol', 'symbol': symbol}
+    stream = None
+    try:
+        with redirect_stdout(sys.stderr):
+            training = train_model(symbol, json.dumps(config), n_jobs=n_jobs)
+            result['training'] = training
+
+            if training.get('success', False):
+                # Backtest the model's test period only (inside the spec's window)
+                predicted = backtest.predict_frame(symbol)
+                result['backtest'] = backtest.main(
+                    symbol,
+                    float(spec.get('initial_capital', 10000.0)),
+                    predicted=predicted,
+                    robustness_options=robustness_options(spec),
+                )
+                if spec.get('portfolio', True) is not False:
+                    stream = portfolio_backtest.stream_from_predicted(predicted)
+    except Exception as e:
+        result['backtest'] = handle_error(e, "EXPERIMENT_ERROR")
+
+    result['success'] = bool(result.get('backtest', {}).get('success', False))
+    result['elapsed_seconds'] = round(time.time() - started, 4)
+    return result, (stream if result['success'] else None)
+
+
+def run_portfolio(streams: Dict, spec: Dict) -> Dict:
+    """
+    Shared-capital backtest over the succeeded symbols' predictions
+
+    Args:
+        streams: Symbol -> prediction stream from run_symbol
+        spec: Experiment spec
+
+    Returns:
+        Portfolio results (without the equity curve, which can be long)
+    """
+    try:
+        options = spec.get('portfolio')
+        result = portfolio_backtest.simulate_portfolio(
+            portfolio_backtest.align_streams(streams),
+            float(spec.get('initial_capital', 10000.0)),
+            options if isinstance(options, dict) else None,
+        )
+        result.pop('equity_curve')
+        return {'success': True, **result}
+    except Exception as e:
+        return handle_error(e, "PORTFOLIO_ERROR")
+
+
+def run_experiment(spec: Dict, out=None) -> Dict:
+    """
+    Run train+backtest for every symbol in the spec across a process pool
+
+    Args:
+        spec: Experiment spec (see module docstring)
+        out: Text stream for the JSON lines (defaults to stdout)
+
+    Returns:
+        Summary dictionary (also written as the last line)
+    """
+    out = out or sys.stdout
+    symbols = [symbol.upper() for symbol in spec.get('symbols', [])]
+    if not symbols:
+        raise ValueError("Experiment spec has no symbols")
+
+    workers, n_jobs = split_threads(len(symbols), spec.get('workers') or EXPERIMENT_WORKERS)
+    logger.info(f"Running {len(symbols)} symbols on {workers} processes x {n_jobs} threads")
+
+    started = time.time()
+    succeeded = []
+    failed = []
+    streams = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_symbol, symbol, spec, n_jobs): symbol for symbol in symbols}
+
+        for future in as_completed(futures):
+            symbol = futures[future]
+            stream = None
+            try:
+                result, stream = future.result()
+            except Exception as e:
+                # The pool process itself died (e.g. out of memory)
+                result = {'event': 'symbol', 'symbol': symbol, 'success': False,
+                          'backtest': handle_error(e, "EXPERIMENT_ERROR")}
+
+            (succeeded if result['success'] else failed).append(symbol)
+            if stream is not None:
+                streams[symbol] = stream
+            out.write(json.dumps(result, default=str) + '\n')
+            out.flush()
+
+    summary = {
+        'event': 'summary',
+        'success': bool(succeeded),
+        'symbols': len(symbols),
+        'succeeded': len(succeeded),
+        'failed': failed,
+        'processes': workers,
+        'threads_per_model': n_jobs,
+        'elapsed_seconds': round(time.time() - started, 4),
+    }
+    if streams:
+        summary['portfolio'] = run_portfolio(streams, spec)
+
+    out.write(json.dumps(summary) + '\n')
+    out.flush()
+    return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python run_experiment.py <SPEC_FILE | ->")
+        print("Example: python run_experiment.py experiment.json")
+        sys.exit(1)
+
+    if sys.argv[1] == '-':
+        spec = json.load(sys.stdin)
+    else:
+        with open(sys.argv[1], 'r') as f:
+            spec = json.load(f)
+
+    summary = run_experiment(spec)
+
+    sys.exit(0 if summary['success'] else 1)
@@ -0,0 +1,495 @@
+"""
+Streaming Technical Indicators
+Stateful versions of the feature_engineering indicators for appending bars
+
+Each indicator consumes one bar at a time through update(bar), keeps only
+the state it needs (window buffers, EMA accumulators, running totals) and
+can be serialized with to_state() so a nightly refresh only processes the
+bars that arrived since the last run. Values match the batch functions
+(calculate_rsi, calculate_macd, calculate_atr, ...) on the same history.
+"""
+
+import abc
+import json
+import math
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Union
+
+import pandas as pd
+
+NAN = float('nan')
+
+
+def _is_nan(value: float) -> bool:
+    return value is None or math.isnan(value)
+
+
+class RollingSum:
+    """
+    Fixed-size window with a running sum
+
+    NaN inputs are tracked separately so the sum recovers once they leave
+    the window, mirroring pandas rolling semantics (NaN until the window
+    holds `period` valid values). The sum is recomputed from the buffer
+    every `period` updates to stop floating point drift.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.nan_count = 0
+        self.since_resync = 0
+
+    def push(self, value: float) -> None:
+        if len(self.window) == self.period:
+            old = self.window[0]
+            if _is_nan(old):
+                self.nan_count -= 1
+            else:
+                self.total -= old
+
+        self.window.append(value)
+        if _is_nan(value):
+            self.nan_count += 1
+        else:
+            self.total += value
+
+        self.since_resync += 1
+        if self.since_resync >= self.period:
+            self.total = math.fsum(v for v in self.window if not _is_nan(v))
+            self.since_resync = 0
+
+    @property
+    def ready(self) -> bool:
+        return len(self.window) == self.period and self.nan_count == 0
+
+    def sum(self) -> float:
+        return self.total if self.ready else NAN
+
+    def mean(self) -> float:
+        return self.total / self.period if self.ready else NAN
+
+    def std(self) -> float:
+        """Sample standard deviation of the window (ddof=1)"""
+        if not self.ready or self.period < 2:
+            return NAN
+        mean = self.total / self.period
+        variance = math.fsum((v - mean) ** 2 for v in self.window) / (self.period - 1)
+        return math.sqrt(variance)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {'period': self.period, 'window': list(self.window)}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'RollingSum':
+        rolling = cls(state['period'])
+        for value in state['window']:
+            rolling.push(value)
+        return rolling
+
+
+class MonotonicExtreme:
+    """
+    Rolling minimum or maximum using a monotonic deque of (index, value)
+    """
+
+    def __init__(self, period: int, mode: str = 'min'):
+        if mode not in ('min', 'max'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.period = period
+        self.mode = mode
+        self.candidates = deque()
+        self.count = 0
+
+    def _dominates(self, new: float, old: float) -> bool:
+        return new <= old if self.mode == 'min' else new >= old
+
+    def push(self, value: float) -> float:
+        index = self.count
+        self.count += 1
+
+        while self.candidates and self._dominates(value, self.candidates[-1][1]):
+            self.candidates.pop()
+        self.candidates.append((index, value))
+
+        while self.candidates[0][0] <= index - self.period:
+            self.candidates.popleft()
+
+        return self.candidates[0][1] if self.count >= self.period else NAN
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'period': self.period,
+            'mode': self.mode,
+            'candidates': [list(item) for item in self.candidates],
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'MonotonicExtreme':
+        extreme = cls(state['period'], state['mode'])
+        extreme.candidates = deque(tuple(item) for item in state['candidates'])
+        extreme.count = state['count']
+        return extreme
+
+
+class StreamingIndicator(abc.ABC):
+    """
+    Base class for indicators updated one bar at a time
+
+    Subclasses implement _update(bar) and the _get_state/_set_state pair.
+    A bar is any mapping with open/high/low/close/volume keys.
+    """
+
+    def __init__(self):
+        self.value = NAN
+
+    def update(self, bar: Mapping[str, float]):
+        """
+        Feed one bar and return the indicator value after it
+        """
+        self.value = self._update(bar)
+        return self.value
+
+    def update_many(self, bars: Union[pd.DataFrame, Iterable[Mapping[str, float]]]) -> List:
+        """
+        Feed bars in date order and return the value after each one
+        """
+        if isinstance(bars, pd.DataFrame):
+            bars = bars.to_dict('records')
+        return [self.update(bar) for bar in bars]
+
+    @abc.abstractmethod
+    def _update(self, bar: Mapping[str, float]):
+        """
+        Advance the state by one bar and return the new value
+        """
+
+    @abc.abstractmethod
+    def _params(self) -> Dict[str, Any]:
+        """
+        Constructor arguments, for from_state()
+        """
+
+    @abc.abstractmethod
+    def _get_state(self) -> Dict[str, Any]:
+        """
+        Running state as a JSON-compatible dict
+        """
+
+    @abc.abstractmethod
+    def _set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore the running state from _get_state() output
+        """
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Serialize parameters and running state to a JSON-compatible dict
+        """
+        return {
+            'type': type(self).__name__,
+            'params': self._params(),
+            'state': self._get_state(),
+            'value': list(self.value) if isinstance(self.value, tuple) else self.value,
+        }
+
+    @classmethod
+    def from_state(cls, data: Dict[str, Any]) -> 'StreamingIndicator':
+        """
+        Rebuild an indicator from to_state() output
+        """
+        indicator_cls = INDICATOR_TYPES[data['type']]
+        indicator = indicator_cls(**data['params'])
+        indicator._set_state(data['state'])
+        value = data.get('value', NAN)
+        indicator.value = tuple(value) if isinstance(value, list) else value
+        return indicator
+
+
+class SMA(StreamingIndicator):
+    """Simple moving average (close.rolling(period).mean())"""
+
+    def __init__(self, period: int, field: str = 'close'):
+        super().__init__()
+        self.period = period
+        self.field = field
+        self.window = RollingSum(period)
+
+    def _update(self, bar):
+        self.window.push(float(bar[self.field]))
+        return self.window.mean()
+
+    def _params(self):
+        return {'period': self.period, 'field': self.field}
+
+    def _get_state(self):
+        return {'window': self.window.to_state()}
+
+    def _set_state(self, state):
+        self.window = RollingSum.from_state(state['window'])
+
+
+class EMA(StreamingIndicator):
+    """Exponential moving average (ewm(span=span, adjust=False).mean())"""
+
+    def __init__(self, span: int, field: str = 'close'):
+        super().__init__()
+        self.span = span
+        self.field = field
+        self.alpha = 2.0 / (span + 1.0)
+        self.average = NAN
+
+    def push(self, value: float) -> float:
+        if _is_nan(self.average):
+            self.average = value
+        elif not _is_nan(value):
+            self.average = (1 - self.alpha) * self.average + self.alpha * value
+        return self.average
+
+    def _update(self, bar):
+        return self.push(float(bar[self.field]))
+
+    def _params(self):
+        return {'span': self.span, 'field': self.field}
+
+    def _get_state(self):
+        return {'average': self.average}
+
+    def _set_state(self, state):
+        self.average = state['average']
+
+
+class RSI(StreamingIndicator):
+    """Relative Strength Index (calculate_rsi)"""
+
+    def __init__(self, period: int = 14, field: str = 'close'):
+        super().__init__()
+        self.period = period
+        self.field = field
+        self.previous = NAN
+        self.gains = RollingSum(period)
+        self.losses = RollingSum(period)
+
+    def _update(self, bar):
+        price = float(bar[self.field])
+        delta = price - self.previous
+        self.previous = price
+
+        # diff() is NaN on the first bar and where() maps it to 0
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+
+        gain = self.gains.mean()
+        loss = self.losses.mean()
+        if _is_nan(gain) or _is_nan(loss):
+            return NAN
+        if loss == 0:
+            return NAN if gain == 0 else 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+    def _params(self):
+        return {'period': self.period, 'field': self.field}
+
+    def _get_state(self):
+        return {
+            'previous': self.previous,
+            'gains': self.gains.to_state(),
+            'losses': self.losses.to_state(),
+        }
+
+    def _set_state(self, state):
+        self.previous = state['previous']
+        self.gains = RollingSum.from_state(state['gains'])
+        self.losses = RollingSum.from_state(state['losses'])
+
+
+class MACD(StreamingIndicator):
+    """MACD line, signal line and histogram (calculate_macd)"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, field: str = 'close'):
+        super().__init__()
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.field = field
+        self.ema_fast = EMA(fast, field)
+        self.ema_slow = EMA(slow, field)
+        self.ema_signal = EMA(signal)
+
+    def _update(self, bar):
+        macd_line = self.ema_fast.update(bar) - self.ema_slow.update(bar)
+        signal_line = self.ema_signal.push(macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+    def _params(self):
+        return {'fast': self.fast, 'slow': self.slow, 'signal': self.signal, 'field': self.field}
+
+    def _get_state(self):
+        return {
+            'fast': self.ema_fast.average,
+            'slow': self.ema_slow.average,
+            'signal': self.ema_signal.average,
+        }
+
+    def _set_state(self, state):
+        self.ema_fast.average = state['fast']
+        self.ema_slow.average = state['slow']
+        self.ema_signal.average = state['signal']
+
+
+class BollingerBands(StreamingIndicator):
+    """Upper, middle and lower bands (calculate_bollinger_bands)"""
+
+    def __init__(self, period: int = 20, std_dev: int = 2, field: str = 'close'):
+        super().__init__()
+        self.period = period
+        self.std_dev = std_dev
+        self.field = field
+        self.window = RollingSum(period)
+
+    def _update(self, bar):
+        self.window.push(float(bar[self.field]))
+        middle = self.window.mean()
+        std = self.window.std()
+        return middle + std * self.std_dev, middle, middle - std * self.std_dev
+
+    def _params(self):
+        return {'period': self.period, 'std_dev': self.std_dev, 'field': self.field}
+
+    def _get_state(self):
+        return {'window': self.window.to_state()}
+
+    def _set_state(self, state):
+        self.window = RollingSum.from_state(state['window'])
+
+
+class ATR(StreamingIndicator):
+    """Average True Range (calculate_atr)"""
+
+    def __init__(self, period: int = 14):
+        super().__init__()
+        self.period = period
+        self.previous_close = NAN
+        self.ranges = RollingSum(period)
+
+    def _update(self, bar):
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        true_range = high - low
+        if not _is_nan(self.previous_close):
+            true_range = max(true_range, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+
+        self.ranges.push(true_range)
+        return self.ranges.mean()
+
+    def _params(self):
+        return {'period': self.period}
+
+    def _get_state(self):
+        return {'previous_close': self.previous_close, 'ranges': self.ranges.to_state()}
+
+    def _set_state(self, state):
+        self.previous_close = state['previous_close']
+        self.ranges = RollingSum.from_state(state['ranges'])
+
+
+class Stochastic(StreamingIndicator):
+    """Stochastic %K and %D as computed in add_technical_indicators"""
+
+    def __init__(self, period: int = 14, smooth: int = 3):
+        super().__init__()
+        self.period = period
+        self.smooth = smooth
+        self.lows = MonotonicExtreme(period, 'min')
+        self.highs = MonotonicExtreme(period, 'max')
+        self.k_window = RollingSum(smooth)
+
+    def _update(self, bar):
+        low_min = self.lows.push(float(bar['low']))
+        high_max = self.highs.push(float(bar['high']))
+        stoch_k = 100 * (float(bar['close']) - low_min) / (high_max - low_min + 0.0001)
+
+        self.k_window.push(stoch_k)
+        return stoch_k, self.k_window.mean()
+
+    def _params(self):
+        return {'period': self.period, 'smooth': self.smooth}
+
+    def _get_state(self):
+        return {
+            'lows': self.lows.to_state(),
+            'highs': self.highs.to_state(),
+            'k_window': self.k_window.to_state(),
+        }
+
+    def _set_state(self, state):
+        self.lows = MonotonicExtreme.from_state(state['lows'])
+        self.highs = MonotonicExtreme.from_state(state['highs'])
+        self.k_window = RollingSum.from_state(state['k_window'])
+
+
+class OBV(StreamingIndicator):
+    """On-Balance Volume running total"""
+
+    def __init__(self):
+        super().__init__()
+        self.previous_close = NAN
+        self.total = 0.0
+
+    def _update(self, bar):
+        close = float(bar['close'])
+        if not _is_nan(self.previous_close):
+            if close > self.previous_close:
+                self.total += float(bar['volume'])
+            elif close < self.previous_close:
+                self.total -= float(bar['volume'])
+        self.previous_close = close
+        return self.total
+
+    def _params(self):
+        return {}
+
+    def _get_state(self):
+        return {'previous_close': self.previous_close, 'total': self.total}
+
+    def _set_state(self, state):
+        self.previous_close = state['previous_close']
+        self.total = state['total']
+
+
+INDICATOR_TYPES = {
+    cls.__name__: cls
+    for cls in (SMA, EMA, RSI, MACD, BollingerBands, ATR, Stochastic, OBV)
+}
+
+
+def save_indicator_state(indicators: Dict[str, StreamingIndicator], path: Union[str, Path]) -> None:
+    """
+    Persist a named set of indicators as JSON
+
+    Args:
+        indicators: Mapping of name -> indicator
+        path: Destination file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({name: indicator.to_state() for name, indicator in indicators.items()}, f)
+
+
+def load_indicator_state(path: Union[str, Path]) -> Dict[str, StreamingIndicator]:
+    """
+    Restore indicators saved with save_indicator_state
+
+    Args:
+        path: State file
+
+    Returns:
+        Mapping of name -> indicator
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return {name: StreamingIndicator.from_state(state) for name, state in data.items()}
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory streaming backtest for long (e.g. minute-bar) histories
+
+Bars are streamed from disk in chunks (utils.iter_price_chunks), turned
+into features chunk by chunk with overlapping windows and carried EMA/OBV
+state (feature_engineering.iter_engineered_chunks), predicted and traded
+with capital carried from one chunk to the next. Metrics are accumulated
+as running totals, so peak memory is proportional to the chunk size, not
+the history length.
+
+On data that also fits in memory the features, predictions and trades are
+identical to backtest.py; summary statistics agree up to floating-point
+summation order, and ROC AUC is computed from a fine score histogram.
+
+Usage: python streaming_pipeline.py AAPL [INITIAL_CAPITAL] [CHUNK_ROWS]
+"""
+
+import sys
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import STREAM_CHUNK_ROWS
+from backtest import load_model, config_from_metadata, simulate_trading
+from feature_engineering import get_feature_list, iter_engineered_chunks
+from utils import iter_price_chunks, save_results, handle_error
+
+logger = logging.getLogger(__name__)
+
+# Score histogram resolution for the streaming ROC AUC
+AUC_BINS = 2 ** 20
+
+
+class StreamingBacktestMetrics:
+    """
+    Running prediction and trading statistics over streamed chunks
+
+    Produces the same keys as backtest.calculate_backtest_metrics.
+    """
+
+    def __init__(self, initial_capital: float = 10000.0, recent_trades: int = 100):
+        self.initial_capital = initial_capital
+        self.capital = initial_capital
+
+        # Confusion counts and score histograms per class
+        self.tp = self.fp = self.tn = self.fn = 0
+        self.score_hist = np.zeros((2, AUC_BINS), dtype=np.int64)
+
+        # Trade statistics
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.losing_trades = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.total_profit_loss = 0.0
+        self.largest_win = -np.inf
+        self.largest_loss = np.inf
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+        self.cumulative_return = 0.0
+        self.running_max = -np.inf
+        self.max_drawdown = 0.0
+        self.recent_trades = deque(maxlen=recent_trades)
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray, y_pred_proba: np.ndarray,
+               trades_df: pd.DataFrame) -> None:
+        """
+        Fold one chunk's labels, predictions and trades into the totals
+        """
+        y_true = np.asarray(y_true).astype(int)
+        y_pred = np.asarray(y_pred).astype(int)
+        self.tp += int(np.sum((y_pred == 1) & (y_true == 1)))
+        self.fp += int(np.sum((y_pred == 1) & (y_true == 0)))
+        self.tn += int(np.sum((y_pred == 0) & (y_true == 0)))
+        self.fn += int(np.sum((y_pred == 0) & (y_true == 1)))
+
+        bins = np.clip((np.asarray(y_pred_proba, dtype=float) * AUC_BINS).astype(np.int64), 0, AUC_BINS - 1)
+        for label in (0, 1):
+            self.score_hist[label] += np.bincount(bins[y_true == label], minlength=AUC_BINS)
+
+        if trades_df.empty:
+            return
+
+        profit_loss = trades_df['profit_loss'].to_numpy(dtype=float)
+        returns = trades_df['profit_loss_pct'].to_numpy(dtype=float) / 100
+
+        wins = profit_loss[profit_loss > 0]
+        losses = profit_loss[profit_loss < 0]
+        self.winning_trades += len(wins)
+        self.losing_trades += len(losses)
+        self.gross_profit += float(wins.sum())
+        self.gross_loss += float(-losses.sum())
+        self.total_profit_loss += float(profit_loss.sum())
+        self.largest_win = max(self.largest_win, float(profit_loss.max()))
+        self.largest_loss = min(self.largest_loss, float(profit_loss.min()))
+
+        # Merge this chunk's mean/variance into the running values (Chan et al.)
+        n_a, n_b = self.total_trades, len(returns)
+        mean_b = float(returns.mean())
+        m2_b = float(((returns - mean_b) ** 2).sum())
+        delta = mean_b - self.return_mean
+        total = n_a + n_b
+        self.return_mean += delta * n_b / total
+        self.return_m2 += m2_b + delta * delta * n_a * n_b / total
+        self.total_trades = total
+
+        # Drawdown of cumulative (summed) returns, continued across chunks
+        cumulative = np.cumsum(np.concatenate([[self.cumulative_return], returns]))[1:]
+        running_max = np.maximum.accumulate(np.concatenate([[self.running_max], cumulative]))[1:]
+        self.max_drawdown = min(self.max_drawdown, float((cumulative - running_max).min()))
+        self.cumulative_return = float(cumulative[-1])
+        self.running_max = float(running_max[-1])
+
+        self.capital = float(trades_df['capital'].iloc[-1])
+        self.recent_trades.extend(trades_df.tail(self.recent_trades.maxlen).to_dict('records'))
+
+    def roc_auc(self) -> float:
+        """
+        Mann-Whitney AUC from the score histograms (ties within a bin count half)
+        """
+        negatives, positives = self.score_hist
+        n_neg, n_pos = negatives.sum(), positives.sum()
+        if n_neg == 0 or n_pos == 0:
+            return 0.0
+        negatives_below = np.cumsum(negatives) - negatives
+        wins = np.sum(positives * negatives_below) + 0.5 * np.sum(positives * negatives)
+        return float(wins / (n_neg * n_pos))
+
+    def prediction_metrics(self) -> Dict[str, float]:
+        total = self.tp + self.fp + self.tn + self.fn
+        precision = self.tp / (self.tp + self.fp) if self.tp + self.fp else 0.0
+        recall = self.tp / (self.tp + self.fn) if self.tp + self.fn else 0.0
+        f1_denominator = 2 * self.tp + self.fp + self.fn
+        return {
+            'accuracy': float((self.tp + self.tn) / total) if total else 0.0,
+            'precision': float(precision),
+            'recall': float(recall),
+            'f1_score': float(2 * self.tp / f1_denominator) if f1_denominator else 0.0,
+            'roc_auc': self.roc_auc(),
+        }
+
+    def trading_metrics(self) -> Dict[str, float]:
+        if self.total_trades == 0:
+            return {
+                'total_trades': 0,
+                'initial_capital': float(self.initial_capital),
+                'final_capital': float(self.initial_capital),
+                'total_return_pct': 0.0,
+            }
+
+        std = np.sqrt(self.return_m2 / (self.total_trades - 1)) if self.total_trades > 1 else np.nan
+        sharpe_ratio = (self.return_mean / std) * np.sqrt(252) if std and not np.isnan(std) else 0.0
+
+        return {
+            'total_trades': int(self.total_trades),
+            'total_profit_loss': float(self.total_profit_loss),
+            'win_rate': float(self.winning_trades / self.total_trades * 100),
+            'avg_profit_per_trade': float(self.total_profit_loss / self.total_trades),
+            'sharpe_ratio': float(sharpe_ratio),
+            'max_drawdown': float(self.max_drawdown * 100),
+            'largest_win': float(self.largest_win),
+            'largest_loss': float(self.largest_loss),
+            'initial_capital': float(self.initial_capital),
+            'final_capital': float(self.capital),
+            'total_return_pct': float((self.capital - self.initial_capital) / self.initial_capital * 100),
+            'total_return_dollars': float(self.capital - self.initial_capital),
+            'winning_trades': int(self.winning_trades),
+            'losing_trades': int(self.losing_trades),
+            'avg_win': float(self.gross_profit / self.winning_trades) if self.winning_trades else 0.0,
+            'avg_loss': float(-self.gross_loss / self.losing_trades) if self.losing_trades else 0.0,
+            'gross_profit': float(self.gross_profit),
+            'gross_loss': float(self.gross_loss),
+            'profit_factor': float(self.gross_profit / self.gross_loss) if self.gross_loss > 0 else 0.0,
+        }
+
+
+def run_streaming_backtest(symbol: str, initial_capital: float = 10000.0,
+                           chunk_rows: Optional[int] = None) -> Dict:
+    """
+    Backtest a trained model over a symbol's history in bounded memory
+
+    Args:
+        symbol: Stock symbol
+        initial_capital: Starting capital for simulation
+        chunk_rows: Bars read per chunk (defaults to STREAM_CHUNK_ROWS)
+
+    Returns:
+        Dictionary of backtest results (same layout as backtest.main)
+    """
+    try:
+        chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+        model, metadata = load_model(symbol)
+        config = config_from_metadata(metadata)
+        feature_names = metadata.get('features_used')
+
+        metrics = StreamingBacktestMetrics(initial_capital)
+        total_samples = 0
+        chunks = 0
+
+        bars = iter_price_chunks(symbol, chunk_rows)
+        for df_features in iter_engineered_chunks(bars, config, columns=feature_names):
+            if df_features.empty:
+                continue
+            if feature_names is None:
+                feature_names = get_feature_list(df_features)
+
+            X = df_features[feature_names].values
+            y = df_features['target'].values
+            prediction_probas = model.predict_proba(X)[:, 1]
+            predictions = (prediction_probas > 0.5).astype(int)
+
+            trades_df = simulate_trading(df_features, predictions, prediction_probas, metrics.capital)
+            metrics.update(y, predictions, prediction_probas, trades_df)
+
+            total_samples += len(df_features)
+            chunks += 1
+
+        logger.info(f"Streamed {total_samples} samples in {chunks} chunks")
+
+        recent_trades = []
+        for trade in metrics.recent_trades:
+            if trade.get('date') is not None and pd.notna(trade['date']):
+                trade['date'] = str(trade['date'])
+            recent_trades.append(trade)
+
+        return {
+            'success': True,
+            'symbol': symbol,
+            'stock_symbol': symbol,
+            'backtested_at': datetime.now().isoformat(),
+            'model_version': metadata.get('model_version', 'unknown'),
+            'model_trained_at': metadata.get('trained_at', 'unknown'),
+            'data_summary': {
+                'total_samples': int(total_samples),
+                'num_features': int(len(feature_names or [])),
+                'chunk_rows': int(chunk_rows),
+                'chunks': int(chunks),
+            },
+            'prediction_metrics': metrics.prediction_metrics(),
+            'trading_metrics': metrics.trading_metrics(),
+            'recent_trades': recent_trades,
+        }
+
+    except Exception as e:
+        return handle_error(e, "BACKTEST_ERROR")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python streaming_pipeline.py <SYMBOL> [INITIAL_CAPITAL] [CHUNK_ROWS]")
+        print("Example: python streaming_pipeline.py AAPL 10000 100000")
+        sys.exit(1)
+
+    symbol = sys.argv[1].upper()
+    initial_capital = float(sys.argv[2]) if len(sys.argv) > 2 else 10000.0
+    chunk_rows = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    result = run_streaming_backtest(symbol, initial_capital, chunk_rows)
+
+    save_results(result)
+
+    sys.exit(0 if result.get('success', False) else 1)
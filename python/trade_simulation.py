@@ -0,0 +1,219 @@
+"""
+Array-based trade simulation
+
+The strategy from backtest.simulate_trading (buy at the open on an UP
+prediction with as many whole shares as the capital allows, sell at the
+close) on plain arrays. Only the share count is path-dependent, since it
+depends on the capital left by earlier trades: a tight scan over the
+signal rows computes it, and everything else (P&L, percentages, trade
+columns) is vectorized afterwards.
+
+The scan is compiled with numba when it is installed (and
+USE_NUMBA_SIMULATION is on); otherwise it runs over the candidate rows
+only, on Python floats. Both produce the same numbers as the row-by-row
+original, in the same floating-point order.
+
+scan_grid() runs the same scan for many strategy variants at once
+(parameter_sweep.py): one column per variant, each with its own signal,
+starting capital and fraction of capital per trade.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import USE_NUMBA_SIMULATION
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+TRADE_COLUMNS = [
+    'date', 'prediction', 'actual', 'confidence', 'entry_price', 'exit_price',
+    'profit_loss', 'profit_loss_pct', 'was_correct', 'capital',
+]
+
+
+def _scan_python(open_: np.ndarray, close: np.ndarray, signal: np.ndarray, capital: float) -> tuple:
+    """
+    Share count and capital after each executed trade
+
+    Returns:
+        Tuple of (row index, shares, capital after the trade) arrays
+    """
+    candidates = np.flatnonzero(signal)
+    trade_rows, trade_shares, trade_capital = [], [], []
+
+    for i, entry_price, exit_price in zip(candidates.tolist(), open_[candidates].tolist(),
+                                          close[candidates].tolist()):
+        shares = int(capital // entry_price)
+        if shares > 0:
+            capital += (exit_price - entry_price) * shares
+            trade_rows.append(i)
+            trade_shares.append(shares)
+            trade_capital.append(capital)
+
+    return (np.array(trade_rows, dtype=np.int64), np.array(trade_shares, dtype=np.int64),
+            np.array(trade_capital, dtype=np.float64))
+
+
+def _scan_loop(open_, close, signal, capital):
+    n = len(open_)
+    trade_rows = np.empty(n, dtype=np.int64)
+    trade_shares = np.empty(n, dtype=np.int64)
+    trade_capital = np.empty(n, dtype=np.float64)
+    count = 0
+
+    for i in range(n):
+        if signal[i]:
+            entry_price = open_[i]
+            shares = int(capital // entry_price)
+            if shares > 0:
+                capital += (close[i] - entry_price) * shares
+                trade_rows[count] = i
+                trade_shares[count] = shares
+                trade_capital[count] = capital
+                count += 1
+
+    return trade_rows[:count], trade_shares[:count], trade_capital[:count]
+
+
+_scan_compiled = numba.njit(cache=True)(_scan_loop) if numba is not None else None
+
+
+def scan_trades(open_: np.ndarray, close: np.ndarray, signal: np.ndarray,
+                initial_capital: float = 10000.0) -> tuple:
+    """
+    Run the compounding whole-share scan over a day-ordered series
+
+    Args:
+        open_: Entry (open) prices
+        close: Exit (close) prices
+        signal: Boolean, True where the strategy wants to trade
+        initial_capital: Starting capital in dollars
+
+    Returns:
+        Tuple of (row index, shares, capital after the trade) per executed trade
+    """
+    open_ = np.ascontiguousarray(open_, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signal = np.ascontiguousarray(signal, dtype=np.bool_)
+
+    if _scan_compiled is not None and USE_NUMBA_SIMULATION:
+        return _scan_compiled(open_, close, signal, float(initial_capital))
+    return _scan_python(open_, close, signal, float(initial_capital))
+
+
+def simulate_trades(open_: np.ndarray, close: np.ndarray, predictions: np.ndarray,
+                    confidence: np.ndarray, actual: np.ndarray, dates: Optional[np.ndarray] = None,
+                    initial_capital: float = 10000.0) -> pd.DataFrame:
+    """
+    Trades of the buy-open/sell-close strategy as backtest.simulate_trading returns them
+
+    Args:
+        open_: Open prices
+        close: Close prices
+        predictions: Model predictions (0 or 1); trades where 1
+        confidence: Prediction probabilities
+        actual: Target labels
+        dates: Bar dates (None fills the date column with None)
+        initial_capital: Starting capital in dollars
+
+    Returns:
+        DataFrame with one row per trade (empty, without columns, if none)
+    """
+    predictions = np.asarray(predictions)
+    rows, shares, capital = scan_trades(open_, close, predictions == 1, initial_capital)
+    if len(rows) == 0:
+        return pd.DataFrame()
+
+    entry_price = np.asarray(open_, dtype=np.float64)[rows]
+    exit_price = np.asarray(close, dtype=np.float64)[rows]
+    actual = np.asarray(actual)[rows].astype(np.int64)
+    prediction = predictions[rows].astype(np.int64)
+
+    columns: Dict[str, np.ndarray] = {
+        'date': np.asarray(dates)[rows] if dates is not None else np.full(len(rows), None, dtype=object),
+        'prediction': prediction,
+        'actual': actual,
+        'confidence': np.asarray(confidence, dtype=np.float64)[rows],
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'profit_loss': (exit_price - entry_price) * shares,
+        'profit_loss_pct': ((exit_price - entry_price) / entry_price) * 100,
+        'was_correct': prediction == actual,
+        'capital': capital,
+    }
+    return pd.DataFrame(columns, columns=TRADE_COLUMNS)
+
+
+def _scan_grid_numpy(open_, close, signal, capital, fraction):
+    n_rows, n_columns = signal.shape
+    shares = np.zeros((n_rows, n_columns), dtype=np.int64)
+    capital_after = np.empty((n_rows, n_columns), dtype=np.float64)
+    capital = capital.copy()
+
+    for i in range(n_rows):
+        if signal[i].any():
+            affordable = np.floor_divide(capital * fraction, open_[i])
+            row_shares = np.where(signal[i] & (affordable > 0), affordable, 0).astype(np.int64)
+            capital = capital + (close[i] - open_[i]) * row_shares
+            shares[i] = row_shares
+        capital_after[i] = capital
+
+    return shares, capital_after
+
+
+def _scan_grid_loop(open_, close, signal, capital, fraction):
+    n_rows, n_columns = signal.shape
+    shares = np.zeros((n_rows, n_columns), dtype=np.int64)
+    capital_after = np.empty((n_rows, n_columns), dtype=np.float64)
+    capital = capital.copy()
+
+    for i in range(n_rows):
+        for j in range(n_columns):
+            if signal[i, j]:
+                row_shares = int((capital[j] * fraction[j]) // open_[i])
+                if row_shares > 0:
+                    capital[j] += (close[i] - open_[i]) * row_shares
+                    shares[i, j] = row_shares
+            capital_after[i, j] = capital[j]
+
+    return shares, capital_after
+
+
+_scan_grid_compiled = numba.njit(cache=True)(_scan_grid_loop) if numba is not None else None
+
+
+def scan_grid(open_: np.ndarray, close: np.ndarray, signal: np.ndarray,
+              initial_capital: np.ndarray, fraction: np.ndarray) -> tuple:
+    """
+    Compounding whole-share scan for many strategy variants at once
+
+    A variant with fraction 1.0 and signal predictions == 1 trades exactly
+    like scan_trades().
+
+    Args:
+        open_: Entry (open) prices, one per day
+        close: Exit (close) prices, one per day
+        signal: (days x variants) booleans, True where a variant wants to trade
+        initial_capital: Starting capital per variant
+        fraction: Share of the current capital each variant puts into a trade
+
+    Returns:
+        Tuple of (days x variants) shares bought (0 = no trade) and capital after each day
+    """
+    open_ = np.ascontiguousarray(open_, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signal = np.ascontiguousarray(signal, dtype=np.bool_)
+    initial_capital = np.ascontiguousarray(initial_capital, dtype=np.float64)
+    fraction = np.ascontiguousarray(fraction, dtype=np.float64)
+
+    if _scan_grid_compiled is not None and USE_NUMBA_SIMULATION:
+        return _scan_grid_compiled(open_, close, signal, initial_capital, fraction)
+    return _scan_grid_numpy(open_, close, signal, initial_capital, fraction)
@@ -5,39 +5,48 @@ Trains XGBoost model with enhanced features
 
 import sys
 import json
+import time
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-import joblib
 from datetime import datetime
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 
 # Import feature engineering
-from feature_engineering import engineer_features, get_feature_list, get_feature_importance_report
-
-
-def load_stock_data(stock_symbol: str, data_path: str = None) -> pd.DataFrame:
+from feature_engineering import (
+    TARGET_LOOKAHEAD,
+    get_feature_importance_report,
+    get_feature_list,
+    get_feature_lookback,
+    select_date_window,
+)
+from feature_cache import cached_engineer_features, get_cache_stats
+import model_registry
+from config import TRAINING_DEFAULTS
+from dmatrix_cache import get_cache_stats as get_dmatrix_cache_stats, get_quantile_dmatrix
+from utils import load_price_data
+
+
+def load_stock_data(stock_symbol: str, data_path: str = None, start_date=None, end_date=None,
+                    warmup_rows: int = 0) -> pd.DataFrame:
     """
-    Load stock price data from CSV
+    Load stock price data from the columnar price store (or CSV)
 
     Args:
         stock_symbol: Stock ticker symbol
         data_path: Path to data directory
+        start_date: Optional first date of the training window
+        end_date: Optional last date of the training window
+        warmup_rows: Rows to load before start_date for indicator warm-up
+            (None = all history)
 
     Returns:
         DataFrame with OHLCV data
     """
-    if data_path is None:
-        data_path = Path(__file__).parent / 'data'
-
-    csv_file = Path(data_path) / f'{stock_symbol}.csv'
-
-    if not csv_file.exists():
-        raise FileNotFoundError(f"Data file not found: {csv_file}")
-
-    df = pd.read_csv(csv_file)
+    df = load_price_data(stock_symbol, data_path, start_date=start_date, end_date=end_date,
+                         warmup_rows=warmup_rows, lookahead_rows=TARGET_LOOKAHEAD)
 
     # Ensure required columns exist
     required_cols = ['date', 'open', 'high', 'low', 'close', 'volume']
@@ -49,6 +58,52 @@ def load_stock_data(stock_symbol: str, data_path: str = None) -> pd.DataFrame:
     return df
 
 
+def load_feature_frame(stock_symbol: str, config: dict) -> pd.DataFrame:
+    """
+    Load prices and engineer features for a configuration's date window
+
+    Args:
+        stock_symbol: Stock ticker symbol
+        config: Configuration dictionary (optional start_date/end_date)
+
+    Returns:
+        DataFrame with engineered features and target, limited to the window
+    """
+    # Optional date window: only the window plus indicator warm-up is read
+    start_date, end_date = config.get('start_date'), config.get('end_date')
+    df = load_stock_data(stock_symbol, start_date=start_date, end_date=end_date,
+                         warmup_rows=get_feature_lookback(config))
+    print(f"Loaded {len(df)} days of data")
+
+    df_features = cached_engineer_features(df, config)
+    return select_date_window(df_features, start_date, end_date)
+
+
+def booster_params(hyperparameters: dict, n_jobs: int = -1) -> dict:
+    """
+    Native xgboost.train parameters equivalent to train_xgboost_model's classifier
+
+    Args:
+        hyperparameters: Model hyperparameters
+        n_jobs: XGBoost threads
+
+    Returns:
+        Parameter dict for xgb.train
+    """
+    return {
+        'objective': 'binary:logistic',
+        'eval_metric': 'logloss',
+        'max_depth': hyperparameters.get('max_depth', 5),
+        'eta': hyperparameters.get('learning_rate', 0.1),
+        'subsample': hyperparameters.get('subsample', 0.8),
+        'colsample_bytree': hyperparameters.get('colsample_bytree', 0.8),
+        'min_child_weight': hyperparameters.get('min_child_weight', 1),
+        'gamma': hyperparameters.get('gamma', 0),
+        'seed': 42,
+        'nthread': n_jobs,
+    }
+
+
 def prepare_training_data(df: pd.DataFrame, config: dict, train_size: float = 0.8):
     """
     Prepare data for training
@@ -90,50 +145,129 @@ def prepare_training_data(df: pd.DataFrame, config: dict, train_size: float = 0.
     return X_train, X_test, y_train, y_test, feature_cols
 
 
-def train_xgboost_model(X_train, y_train, X_test, y_test, hyperparameters: dict):
+class TrainingBudget(xgb.callback.TrainingCallback):
+    """
+    Stop boosting once a wall-clock budget is spent
+    """
+
+    def __init__(self, max_seconds: float):
+        super().__init__()
+        self.max_seconds = max_seconds
+        self.started = None
+        self.exhausted = False
+
+    def before_training(self, model):
+        self.started = time.time()
+        return model
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.exhausted = time.time() - self.started >= self.max_seconds
+        return self.exhausted
+
+
+def train_xgboost_model(X_train, y_train, X_test, y_test, hyperparameters: dict, n_jobs: int = -1):
     """
     Train XGBoost classifier
 
+    The last `validation_fraction` of the (time-ordered) training rows is held
+    out for early stopping, so the test set is never looked at while
+    training. See config.TRAINING_DEFAULTS for the early stopping and budget
+    settings, which can be overridden in the hyperparameters.
+
     Args:
         X_train, y_train: Training data
         X_test, y_test: Test data
         hyperparameters: Model hyperparameters
+        n_jobs: XGBoost threads (-1 = all cores; lower it when several
+            models train in parallel processes)
 
     Returns:
-        Trained model
+        Tuple of (trained model, training info dict)
     """
     print("\n" + "="*60)
     print("TRAINING XGBOOST MODEL")
     print("="*60)
 
-    # Create model with hyperparameters from configuration
-    model = xgb.XGBClassifier(
-        n_estimators=hyperparameters.get('n_estimators', 100),
-        max_depth=hyperparameters.get('max_depth', 5),
-        learning_rate=hyperparameters.get('learning_rate', 0.1),
-        subsample=hyperparameters.get('subsample', 0.8),
-        colsample_bytree=hyperparameters.get('colsample_bytree', 0.8),
-        min_child_weight=hyperparameters.get('min_child_weight', 1),
-        gamma=hyperparameters.get('gamma', 0),
-        objective='binary:logistic',
-        eval_metric='logloss',
-        random_state=42,
-        n_jobs=-1
-    )
-
-    # Train with early stopping
-    model.fit(
-        X_train,
-        y_train,
-        eval_set=[(X_train, y_train), (X_test, y_test)],
-        verbose=False
+    settings = {**TRAINING_DEFAULTS, **hyperparameters}
+    n_estimators = hyperparameters.get('n_estimators', 100)
+    max_trees = settings['max_trees'] or n_estimators
+    early_stopping_rounds = settings['early_stopping_rounds'] or None
+
+    # Hold out the most recent training rows for early stopping
+    n_validation = int(len(X_train) * settings['validation_fraction']) if early_stopping_rounds else 0
+    if n_validation > 0:
+        X_fit, y_fit = X_train[:-n_validation], y_train[:-n_validation]
+        X_val, y_val = X_train[-n_validation:], y_train[-n_validation:]
+    else:
+        X_fit, y_fit = X_train, y_train
+        X_val = y_val = None
+        early_stopping_rounds = None
+
+    # Quantized matrices are cached, so retraining the same rows with other
+    # hyperparameters skips the quantile sketch; validation reuses its cuts
+    dtrain = get_quantile_dmatrix(X_fit, y_fit, n_jobs=n_jobs)
+    evals = []
+    if settings['eval_train_set']:
+        evals.append((dtrain, 'train'))
+    if X_val is not None:
+        # Early stopping watches the last eval set
+        evals.append((get_quantile_dmatrix(X_val, y_val, ref=dtrain, n_jobs=n_jobs), 'validation'))
+
+    callbacks = []
+    budget = None
+    if settings['max_training_seconds']:
+        budget = TrainingBudget(float(settings['max_training_seconds']))
+        callbacks.append(budget)
+
+    # Train with early stopping on the validation slice
+    fit_started = time.time()
+    booster = xgb.train(
+        booster_params(hyperparameters, n_jobs),
+        dtrain,
+        num_boost_round=min(n_estimators, max_trees),
+        evals=evals,
+        early_stopping_rounds=early_stopping_rounds,
+        callbacks=callbacks,
+        verbose_eval=False,
     )
+    fit_seconds = time.time() - fit_started
+
+    # Same classifier object as before for saving and prediction
+    model = xgb.XGBClassifier(n_jobs=n_jobs)
+    model.load_model(booster.save_raw('ubj'))
+
+    trees_built = model.get_booster().num_boosted_rounds()
+    best_iteration = int(model.best_iteration) if early_stopping_rounds else trees_built - 1
+    if budget is not None and budget.exhausted:
+        stopped_by = 'time_budget'
+    elif trees_built < min(n_estimators, max_trees):
+        stopped_by = 'early_stopping'
+    elif max_trees < n_estimators:
+        stopped_by = 'tree_budget'
+    else:
+        stopped_by = None
+
+    training_info = {
+        'train_size': int(len(X_fit)),
+        'validation_size': int(n_validation),
+        'n_estimators_requested': int(n_estimators),
+        'trees_built': int(trees_built),
+        'best_iteration': best_iteration,
+        'stopped_by': stopped_by,
+        'fit_seconds': round(fit_seconds, 4),
+        # Trees not built, at this run's measured cost per tree
+        'estimated_seconds_saved': round(fit_seconds / max(trees_built, 1) * (n_estimators - trees_built), 4),
+    }
+
+    print(f"\nTrees built: {trees_built}/{n_estimators}, best iteration: {best_iteration}"
+          f"{f' (stopped by {stopped_by})' if stopped_by else ''}")
+    print(f"Fit time: {fit_seconds:.2f}s, estimated time saved: {training_info['estimated_seconds_saved']:.2f}s")
 
     # Evaluate
-    train_pred = model.predict(X_train)
+    train_pred = model.predict(X_fit)
     test_pred = model.predict(X_test)
 
-    train_accuracy = accuracy_score(y_train, train_pred)
+    train_accuracy = accuracy_score(y_fit, train_pred)
     test_accuracy = accuracy_score(y_test, test_pred)
 
     print(f"\nTraining Accuracy: {train_accuracy:.4f} ({train_accuracy*100:.2f}%)")
@@ -151,50 +285,45 @@ def train_xgboost_model(X_train, y_train, X_test, y_test, hyperparameters: dict)
     print(f"\nTrue Negatives: {cm[0,0]}, False Positives: {cm[0,1]}")
     print(f"False Negatives: {cm[1,0]}, True Positives: {cm[1,1]}")
 
-    return model
+    training_info['train_accuracy'] = float(train_accuracy)
 
+    return model, training_info
 
-def save_model(model, stock_symbol: str, metadata: dict, model_path: str = None):
+
+def save_model(model, stock_symbol: str, metadata: dict, registry_dir: str = None):
     """
-    Save trained model and metadata
+    Save trained model and metadata to the model registry
 
     Args:
         model: Trained XGBoost model
         stock_symbol: Stock ticker
         metadata: Dictionary with training info
-        model_path: Path to save model
+        registry_dir: Override the registry directory
 
     Returns:
-        Path where model was saved
+        Registry entry dict (version, model_hash, model_path)
     """
-    if model_path is None:
-        model_path = Path(__file__).parent / 'models'
-
-    model_path = Path(model_path)
-    model_path.mkdir(parents=True, exist_ok=True)
-
-    # Save model
-    model_file = model_path / f'{stock_symbol}_model.pkl'
-    joblib.dump(model, model_file)
-
-    # Save metadata
-    metadata_file = model_path / f'{stock_symbol}_metadata.json'
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
+    entry = model_registry.save_model(
+        model.get_booster().save_raw(model_registry.MODEL_FORMAT),
+        stock_symbol,
+        metadata,
+        registry_dir,
+    )
 
-    print(f"\n✓ Model saved: {model_file}")
-    print(f"✓ Metadata saved: {metadata_file}")
+    print(f"\n✓ Model saved: {entry['model_path']} (v{entry['version']})")
+    print(f"✓ Registry pointer: {model_registry.pointer_path(stock_symbol, registry_dir)}")
 
-    return str(model_file)
+    return entry
 
 
-def train_model(stock_symbol: str, config_json: str):
+def train_model(stock_symbol: str, config_json: str, n_jobs: int = -1):
     """
     Main training function
 
     Args:
         stock_symbol: Stock ticker symbol
         config_json: JSON string with configuration
+        n_jobs: XGBoost threads for this model
 
     Returns:
         Dictionary with training results
@@ -208,18 +337,13 @@ def train_model(stock_symbol: str, config_json: str):
         print("="*60)
         print(f"Configuration: {config.get('name', 'Custom')}")
 
-        # 1. Load data
-        print("\n[1/5] Loading data...")
-        df = load_stock_data(stock_symbol)
-        print(f"Loaded {len(df)} days of data")
-
-        # 2. Engineer features
-        print("\n[2/5] Engineering features...")
-        df_features = engineer_features(df, config)
+        # 1. Load data and engineer features
+        print("\n[1/4] Loading data and engineering features...")
+        df_features = load_feature_frame(stock_symbol, config)
         print(f"Created {df_features.shape[1] - 6} features")
 
-        # 3. Prepare training data
-        print("\n[3/5] Preparing training data...")
+        # 2. Prepare training data
+        print("\n[2/4] Preparing training data...")
         train_split = config['hyperparameters'].get('train_test_split', 0.8)
         X_train, X_test, y_train, y_test, feature_names = prepare_training_data(
             df_features,
@@ -227,12 +351,13 @@ def train_model(stock_symbol: str, config_json: str):
             train_size=train_split
         )
 
-        # 4. Train model
-        print("\n[4/5] Training model...")
-        model = train_xgboost_model(
+        # 3. Train model
+        print("\n[3/4] Training model...")
+        model, training_info = train_xgboost_model(
             X_train, y_train,
             X_test, y_test,
-            config['hyperparameters']
+            config['hyperparameters'],
+            n_jobs=n_jobs
         )
 
         # Get feature importance
@@ -242,8 +367,8 @@ def train_model(stock_symbol: str, config_json: str):
         for idx, row in feature_importance_df.head(10).iterrows():
             print(f"  {row['feature']:25s}: {row['importance']:.4f}")
 
-        # 5. Save model
-        print("\n[5/5] Saving model...")
+        # 4. Save model
+        print("\n[4/4] Saving model...")
 
         # Calculate additional metrics
         test_pred = model.predict(X_test)
@@ -253,19 +378,33 @@ def train_model(stock_symbol: str, config_json: str):
         confidence_scores = test_pred_proba.max(axis=1)
         avg_confidence = confidence_scores.mean()
 
+        # Date ranges of the split; the test period is the default window
+        # of out-of-sample backtests (backtest.backtest_window)
+        dates = df_features['date']
+        train_dates, test_dates = dates.iloc[:len(X_train)], dates.iloc[len(X_train):]
+
         # Prepare metadata
         metadata = {
             'stock_symbol': stock_symbol,
             'trained_at': datetime.now().isoformat(),
             'model_version': '2.0_daytrading',
-            'train_size': len(X_train),
+            'train_size': training_info['train_size'],
+            'validation_size': training_info['validation_size'],
             'test_size': len(X_test),
-            'train_accuracy': float(accuracy_score(y_train, model.predict(X_train))),
+            'train_start': str(train_dates.iloc[0].date()),
+            'train_end': str(train_dates.iloc[-1].date()),
+            'test_start': str(test_dates.iloc[0].date()) if len(test_dates) else None,
+            'test_end': str(test_dates.iloc[-1].date()) if len(test_dates) else None,
+            # Price window the features were engineered over (None = all history)
+            'data_window': {'start_date': config.get('start_date'), 'end_date': config.get('end_date')},
+            'train_accuracy': training_info['train_accuracy'],
             'test_accuracy': float(accuracy_score(y_test, test_pred)),
             'avg_confidence': float(avg_confidence),
             'num_features': len(feature_names),
             'features_used': feature_names,
             'feature_importance': feature_importance_df.to_dict('records'),
+            'best_iteration': training_info['best_iteration'],
+            'training': training_info,
             'hyperparameters': config['hyperparameters'],
             'features_enabled': config.get('features_enabled', {}),
             'target_type': config.get('target_type', 'open_to_close'),
@@ -275,25 +414,34 @@ def train_model(stock_symbol: str, config_json: str):
             }
         }
 
-        model_path = save_model(model, stock_symbol, metadata)
+        registry_entry = save_model(model, stock_symbol, metadata)
 
         # Prepare results for Laravel
         results = {
             'success': True,
             'stock_symbol': stock_symbol,
-            'model_path': model_path,
+            'model_path': registry_entry['model_path'],
+            'model_hash': registry_entry['model_hash'],
+            'registry_version': registry_entry['version'],
             'train_accuracy': metadata['train_accuracy'],
             'test_accuracy': metadata['test_accuracy'],
+            'test_start': metadata['test_start'],
+            'test_end': metadata['test_end'],
             'avg_confidence': metadata['avg_confidence'],
+            'best_iteration': training_info['best_iteration'],
+            'trees_built': training_info['trees_built'],
+            'estimated_seconds_saved': training_info['estimated_seconds_saved'],
             'num_features': len(feature_names),
             'top_features': feature_importance_df.head(10).to_dict('records'),
-            'trained_at': metadata['trained_at']
+            'trained_at': metadata['trained_at'],
+            'feature_cache': get_cache_stats(),
+            'dmatrix_cache': get_dmatrix_cache_stats()
         }
 
         print("\n" + "="*60)
         print("✓ TRAINING COMPLETE")
         print("="*60)
-        print(f"Model: {stock_symbol}_model.pkl")
+        print(f"Model: {stock_symbol} v{registry_entry['version']} ({registry_entry['model_hash'][:12]})")
         print(f"Test Accuracy: {results['test_accuracy']*100:.2f}%")
         print(f"Avg Confidence: {results['avg_confidence']*100:.2f}%")
 
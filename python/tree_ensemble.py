@@ -0,0 +1,189 @@
+"""
+Flattened tree ensemble evaluated with NumPy
+
+A binary:logistic booster is exported into a few flat arrays (split
+feature, threshold, left child, default direction for missing values,
+leaf value) and evaluated level by level for a batch of rows: every row
+descends all trees at once, one level per step. Scoring needs only NumPy,
+so a compiled model can be used without importing xgboost.
+
+Node n of tree t is stored at position t * max_nodes + n. XGBoost
+allocates children in pairs, so the right child is left + 1. Leaves point
+to themselves with an infinite threshold, so rows that reached a leaf
+stay there for the remaining levels.
+
+Per row this is much cheaper than setting up an XGBoost prediction, which
+suits next-day signals; for long batches XGBoost's threaded predictor is
+faster, and RegistryModel picks between the two (COMPILED_PREDICT_MAX_ROWS).
+
+The registry writes the compiled ensemble next to each booster
+(objects/{hash}.npz); RegistryModel scores with it when present.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ARRAYS = ['feature', 'threshold', 'left', 'default_left', 'value']
+
+# Rows scored per pass; bounds the (rows x trees) index matrix
+BATCH_ROWS = 4096
+
+
+class TreeEnsemble:
+    """
+    Flattened gradient-boosted trees with XGBClassifier-style predictions
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 default_left: np.ndarray, value: np.ndarray,
+                 n_trees: int, max_nodes: int, depth: int, base_margin: float,
+                 feature_names: Optional[List[str]] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.default_left = default_left
+        self.value = value
+        self.n_trees = n_trees
+        self.max_nodes = max_nodes
+        self.depth = depth
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+        self.roots = (np.arange(n_trees, dtype=np.int32) * max_nodes)[None, :]
+
+    @classmethod
+    def from_model_json(cls, model: Dict) -> 'TreeEnsemble':
+        """
+        Flatten an XGBoost JSON model (Booster.save_raw('json'))
+
+        Only trees up to the best iteration are kept when the booster was
+        early-stopped, matching what XGBClassifier predicts with.
+
+        Raises:
+            ValueError: For anything but a numeric-split binary:logistic gbtree
+                with paired children
+        """
+        learner = model['learner']
+        objective = learner['objective']['name']
+        booster = learner['gradient_booster']
+        if objective != 'binary:logistic' or booster['name'] != 'gbtree':
+            raise ValueError(f"Unsupported model: {booster['name']} / {objective}")
+
+        trees = booster['model']['trees']
+        best_iteration = learner.get('attributes', {}).get('best_iteration')
+        if best_iteration is not None:
+            indptr = booster['model']['iteration_indptr']
+            trees = trees[:indptr[int(best_iteration) + 1]]
+
+        if any(any(tree.get('split_type', [])) for tree in trees):
+            raise ValueError("Categorical splits are not supported")
+
+        max_nodes = max(int(tree['tree_param']['num_nodes']) for tree in trees)
+        size = len(trees) * max_nodes
+        feature = np.zeros(size, dtype=np.int32)
+        threshold = np.zeros(size, dtype=np.float32)
+        left = np.zeros(size, dtype=np.int32)
+        default_left = np.zeros(size, dtype=bool)
+        value = np.zeros(size, dtype=np.float32)
+        depth = 0
+
+        for t, tree in enumerate(trees):
+            offset = t * max_nodes
+            n = int(tree['tree_param']['num_nodes'])
+            nodes = slice(offset, offset + n)
+            children_left = np.asarray(tree['left_children'], dtype=np.int32)
+            children_right = np.asarray(tree['right_children'], dtype=np.int32)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = children_left == -1
+            if np.any(children_right[~is_leaf] != children_left[~is_leaf] + 1):
+                raise ValueError(f"Tree {t} has non-adjacent children")
+            own = np.arange(offset, offset + n, dtype=np.int32)
+
+            feature[nodes] = np.where(is_leaf, 0, tree['split_indices'])
+            threshold[nodes] = np.where(is_leaf, np.inf, conditions)
+            left[nodes] = np.where(is_leaf, own, children_left + offset)
+            default_left[nodes] = is_leaf | np.asarray(tree['default_left'], dtype=bool)
+            value[nodes] = np.where(is_leaf, conditions, 0)
+
+            # Leaf depth from the parent pointers (parents precede children)
+            node_depth = np.zeros(n, dtype=np.int32)
+            for node in range(1, n):
+                node_depth[node] = node_depth[tree['parents'][node]] + 1
+            depth = max(depth, int(node_depth.max()))
+
+        # base_score is stored as a probability, e.g. "[4.8E-1]"
+        base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+        base_margin = float(np.log(base_score / (1 - base_score)))
+
+        return cls(feature, threshold, left, default_left, value,
+                   n_trees=len(trees), max_nodes=max_nodes, depth=depth,
+                   base_margin=base_margin, feature_names=learner.get('feature_names') or None)
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        """
+        Raw log-odds for each row
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        margins = np.empty(len(X), dtype=np.float32)
+
+        for start in range(0, len(X), BATCH_ROWS):
+            rows = X[start:start + BATCH_ROWS].ravel()
+            n_rows = len(rows) // X.shape[1]
+            row_offset = (np.arange(n_rows) * X.shape[1])[:, None]
+            node = np.broadcast_to(self.roots, (n_rows, self.n_trees))
+
+            for _ in range(self.depth):
+                x = rows[row_offset + self.feature[node]]
+                go_right = ~(x < self.threshold[node])
+                go_right &= ~(np.isnan(x) & self.default_left[node])
+                node = self.left[node] + go_right
+
+            margins[start:start + n_rows] = self.value[node].sum(axis=1) + np.float32(self.base_margin)
+
+        return margins
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities, shaped like XGBClassifier.predict_proba
+        """
+        probability_up = 1 / (1 + np.exp(-self.predict_margin(X)))
+        return np.vstack([1 - probability_up, probability_up]).T
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predicted class (1 = up)
+        """
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    def save(self, path: Path) -> None:
+        """
+        Write the arrays to an .npz file
+        """
+        meta = {'n_trees': self.n_trees, 'max_nodes': self.max_nodes, 'depth': self.depth,
+                'base_margin': self.base_margin, 'feature_names': self.feature_names}
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.stem}.tmp.npz")
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)),
+                 **{name: getattr(self, name) for name in ARRAYS})
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'TreeEnsemble':
+        """
+        Read an ensemble written by save()
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in ARRAYS}
+        return cls(**arrays, **meta)
+
+
+def flatten_booster(booster) -> TreeEnsemble:
+    """
+    Flatten an xgboost Booster (or anything with get_booster())
+    """
+    if hasattr(booster, 'get_booster'):
+        booster = booster.get_booster()
+    return TreeEnsemble.from_model_json(json.loads(booster.save_raw('json')))
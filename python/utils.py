@@ -3,16 +3,19 @@ Utility functions for the ML pipeline
 """
 
 import json
+import os
 import sys
 import logging
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional, Tuple
 
 import pandas as pd
 import numpy as np
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 
-from config import DATA_DIR, LOG_LEVEL
+import price_archive
+import price_store
+from config import DATA_DIR, LOG_LEVEL, PRICE_ARCHIVE_DIR
 
 # Configure logging
 logging.basicConfig(
@@ -24,13 +27,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def load_data_from_csv(symbol: str, filename: Optional[str] = None) -> pd.DataFrame:
+def load_data_from_csv(symbol: str, filename: Optional[str] = None,
+                       data_dir: Optional[Path] = None) -> pd.DataFrame:
     """
     Load stock data from CSV file
 
     Args:
         symbol: Stock symbol (e.g., 'AAPL')
         filename: Optional custom filename. Defaults to {symbol}.csv
+        data_dir: Optional data directory. Defaults to DATA_DIR
 
     Returns:
         DataFrame with stock data
@@ -42,7 +47,7 @@ def load_data_from_csv(symbol: str, filename: Optional[str] = None) -> pd.DataFr
     if filename is None:
         filename = f"{symbol}.csv"
 
-    filepath = DATA_DIR / filename
+    filepath = Path(data_dir or DATA_DIR) / filename
 
     if not filepath.exists():
         raise FileNotFoundError(f"Data file not found: {filepath}")
@@ -64,6 +69,174 @@ def load_data_from_csv(symbol: str, filename: Optional[str] = None) -> pd.DataFr
     return df
 
 
+def load_price_data(symbol: str, data_dir: Optional[Path] = None, use_archive: bool = True,
+                    start_date=None, end_date=None,
+                    warmup_rows: Optional[int] = 0, lookahead_rows: int = 0) -> pd.DataFrame:
+    """
+    Load stock data from the fastest up-to-date source
+
+    Candidates are the shared price archive (see price_archive), the
+    symbol's columnar price store (see price_store) and its CSV export;
+    the most recently written one wins, with binary formats preferred on
+    ties.
+
+    With a date range only [start_date, end_date] plus warmup_rows earlier
+    and lookahead_rows later rows are returned. The binary formats slice
+    the mapped columns before building the frame; CSV has to be parsed in
+    full and is sliced afterwards.
+
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL')
+        data_dir: Optional data directory. Defaults to DATA_DIR
+        use_archive: Consider the shared price archive
+        start_date: First date of the window (inclusive, None = unbounded)
+        end_date: Last date of the window (inclusive, None = unbounded)
+        warmup_rows: Rows to include before start_date (None = all history)
+        lookahead_rows: Rows to include after end_date
+
+    Returns:
+        DataFrame with stock data sorted by date
+
+    Raises:
+        FileNotFoundError: If no source exists for the symbol
+    """
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    source = _select_price_source(symbol, data_dir, use_archive)
+
+    if source == 'csv':
+        df = load_data_from_csv(symbol, data_dir=data_dir)
+        if start_date is None and end_date is None:
+            return df
+        dates = price_store.to_epoch_ns(df['date'])
+        begin, end = _window_rows(dates, start_date, end_date, warmup_rows, lookahead_rows)
+        logger.info(f"Using rows {begin}-{end} of {len(df)} for {start_date} to {end_date}")
+        return df.iloc[begin:end].reset_index(drop=True)
+
+    location, arrays = _read_source_arrays(symbol, data_dir, source)
+
+    logger.info(f"Loading data from {location}")
+    if start_date is not None or end_date is not None:
+        begin, end = _window_rows(arrays['date'], start_date, end_date, warmup_rows, lookahead_rows)
+        arrays = {name: values[begin:end] for name, values in arrays.items()}
+    df = price_store.arrays_to_frame(arrays)
+
+    if df.empty:
+        raise ValueError(f"No price data in {location}")
+
+    logger.info(f"Loaded {len(df)} rows from {location}")
+    return df
+
+
+def iter_price_chunks(symbol: str, chunk_rows: int, data_dir: Optional[Path] = None,
+                      use_archive: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Stream a symbol's bars in date order, chunk_rows at a time
+
+    Reads from the same source load_price_data would pick. Binary formats
+    copy one chunk of the mapped columns at a time; CSV exports are parsed
+    incrementally and must already be sorted by date.
+
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL')
+        chunk_rows: Rows per yielded DataFrame
+        data_dir: Optional data directory. Defaults to DATA_DIR
+        use_archive: Consider the shared price archive
+
+    Yields:
+        DataFrames with a datetime64 date column
+    """
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    source = _select_price_source(symbol, data_dir, use_archive)
+
+    if source == 'csv':
+        filepath = data_dir / f"{symbol}.csv"
+        if not filepath.exists():
+            raise FileNotFoundError(f"Data file not found: {filepath}")
+        logger.info(f"Streaming data from {filepath} in chunks of {chunk_rows}")
+        with pd.read_csv(filepath, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                chunk['date'] = pd.to_datetime(chunk['date'])
+                yield chunk
+        return
+
+    location, arrays = _read_source_arrays(symbol, data_dir, source)
+    logger.info(f"Streaming data from {location} in chunks of {chunk_rows}")
+    total = len(arrays['date'])
+    for begin in range(0, total, chunk_rows):
+        yield price_store.arrays_to_frame({name: values[begin:begin + chunk_rows] for name, values in arrays.items()})
+
+
+def _select_price_source(symbol: str, data_dir: Path, use_archive: bool) -> str:
+    """
+    Most recently written of 'archive', 'store' and 'csv' (binary wins ties)
+    """
+    csv_file = data_dir / f"{symbol}.csv"
+    meta_file = price_store.store_path(symbol, data_dir) / 'meta.json'
+
+    candidates = []
+    if use_archive and data_dir == DATA_DIR:
+        entry = price_archive.read_symbol_entry(symbol)
+        if entry is not None:
+            candidates.append((entry['updated_at'], 2, 'archive'))
+    if meta_file.exists():
+        candidates.append((meta_file.stat().st_mtime, 1, 'store'))
+    if csv_file.exists():
+        candidates.append((csv_file.stat().st_mtime, 0, 'csv'))
+
+    return max(candidates)[2] if candidates else 'csv'
+
+
+def _read_source_arrays(symbol: str, data_dir: Path, source: str) -> tuple:
+    """
+    (location, mapped column arrays) for the archive or a columnar store
+    """
+    if source == 'archive':
+        return f"{PRICE_ARCHIVE_DIR} [{symbol}]", price_archive.read_symbol_arrays(symbol)
+    return price_store.store_path(symbol, data_dir), price_store.read_price_arrays(symbol, data_dir)
+
+
+def _window_rows(dates: np.ndarray, start_date, end_date,
+                 warmup_rows: Optional[int], lookahead_rows: int) -> tuple:
+    """
+    Row range covering a date window widened by warm-up and lookahead rows
+    """
+    begin, end = price_archive.date_bounds(dates, start_date, end_date)
+    begin = 0 if warmup_rows is None else max(0, begin - warmup_rows)
+    end = min(len(dates), end + lookahead_rows)
+    return begin, end
+
+
+def load_price_arrays(symbol: str, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Zero-copy NumPy views of a symbol's OHLCV columns
+
+    Served from the shared price archive when it holds the symbol, else
+    from the symbol's columnar price store. Views are read-only and backed
+    by the OS page cache, so parallel workers don't duplicate the data.
+
+    Args:
+        symbol: Stock symbol (e.g., 'AAPL')
+        start_date: First date to include (inclusive)
+        end_date: Last date to include (inclusive)
+
+    Returns:
+        Dict of column name -> array, dates as int64 nanoseconds since 1970-01-01
+
+    Raises:
+        FileNotFoundError: If neither the archive nor a price store has the symbol
+    """
+    if price_archive.read_symbol_entry(symbol) is not None:
+        return price_archive.read_symbol_arrays(symbol, start_date, end_date)
+
+    arrays = price_store.read_price_arrays(symbol)
+    if start_date is None and end_date is None:
+        return arrays
+
+    begin, end = price_archive.date_bounds(arrays['date'], start_date, end_date)
+    return {name: values[begin:end] for name, values in arrays.items()}
+
+
 def calculate_metrics(y_true: np.ndarray, y_pred: np.ndarray, y_pred_proba: Optional[np.ndarray] = None) -> Dict[str, float]:
     """
     Calculate classification metrics
@@ -149,6 +322,25 @@ def calculate_trading_metrics(trades_df: pd.DataFrame) -> Dict[str, float]:
     }
 
 
+def split_threads(n_tasks: int, workers: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Choose the number of processes and XGBoost threads per model
+
+    With W processes on C cores each model gets C // W threads, so a pool
+    of trainings never oversubscribes the box.
+
+    Args:
+        n_tasks: Number of tasks that can run at once (e.g. symbols)
+        workers: Requested number of processes (defaults to the core count)
+
+    Returns:
+        Tuple of (processes, threads per model)
+    """
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, n_tasks, cores))
+    return workers, max(1, cores // workers)
+
+
 def save_results(results: Dict[str, Any], output_file: Optional[str] = None):
     """
     Save results as JSON to stdout or file
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Walk-forward validation with warm-started boosters
+
+Steps through a symbol's history in time order: each fold trains on a
+window of past rows and is tested on the rows right after it, then the
+windows move forward by `step` rows. Every `retrain_every` folds a booster
+is trained from scratch; in between, the previous fold's booster keeps
+boosting on the new training window (xgb.train(..., xgb_model=booster))
+and adds only `warm_start_rounds` trees.
+
+Quantile cuts are sketched whenever a booster is trained from scratch,
+over every row before that fold's test window and nothing after it, so
+the histogram bins never see out-of-sample feature distributions. The
+warm-started folds that follow quantize their training windows against
+the same cuts (dmatrix_cache, ref=). Sketches and fold matrices are
+cached, so reruns with other hyperparameters don't repeat them.
+
+Options go in config['walk_forward'] (defaults: config.WALK_FORWARD_PARAMS):
+
+    {"train_window": 504, "test_window": 21, "step": 21, "expanding": false,
+     "retrain_every": 12, "warm_start_rounds": 10}
+
+Usage: python walk_forward.py AAPL '{"hyperparameters": {...}, "walk_forward": {...}}'
+"""
+
+import sys
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from config import WALK_FORWARD_PARAMS
+from dmatrix_cache import get_quantile_dmatrix
+from feature_engineering import get_feature_list
+from train_model import booster_params, load_feature_frame
+from utils import calculate_metrics
+
+METRIC_KEYS = ['accuracy', 'precision', 'recall', 'f1_score', 'roc_auc']
+
+
+def iter_folds(n_rows: int, train_window: int, test_window: int, step: Optional[int] = None,
+               expanding: bool = False) -> Iterator[Tuple[int, int, int]]:
+    """
+    Walk-forward fold boundaries
+
+    Args:
+        n_rows: Rows in the (time-ordered) sample
+        train_window: Training rows per fold (the minimum when expanding)
+        test_window: Test rows per fold (the last fold may be shorter)
+        step: Rows the windows advance per fold (defaults to test_window)
+        expanding: Train on every row before the test window
+
+    Yields:
+        Tuples of (train_start, test_start, test_end) row positions
+    """
+    step = step or test_window
+    test_start = train_window
+    while test_start < n_rows:
+        train_start = 0 if expanding else test_start - train_window
+        yield train_start, test_start, min(test_start + test_window, n_rows)
+        test_start += step
+
+
+def _aggregate(fold_metrics: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """
+    Mean, standard deviation, min and max of each metric across folds
+    """
+    summary = {}
+    for key in METRIC_KEYS:
+        values = np.array([fold[key] for fold in fold_metrics if key in fold], dtype=float)
+        if len(values) == 0:
+            continue
+        summary[key] = {
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+    return summary
+
+
+def walk_forward(stock_symbol: str, config: Dict, n_jobs: int = -1) -> Dict:
+    """
+    Run walk-forward validation for one symbol
+
+    Args:
+        stock_symbol: Stock ticker symbol
+        config: Configuration dictionary (hyperparameters, features, walk_forward)
+        n_jobs: XGBoost threads
+
+    Returns:
+        Dictionary with per-fold and aggregated metrics
+    """
+    options = {**WALK_FORWARD_PARAMS, **config.get('walk_forward', {})}
+    hyperparameters = config.get('hyperparameters', {})
+    n_estimators = int(hyperparameters.get('n_estimators', 100))
+    retrain_every = max(1, int(options['retrain_every']))
+    warm_start_rounds = int(options['warm_start_rounds'])
+
+    print("\n" + "="*60)
+    print(f"WALK-FORWARD VALIDATION FOR {stock_symbol}")
+    print("="*60)
+
+    df_features = load_feature_frame(stock_symbol, config)
+    feature_names = get_feature_list(df_features)
+    X = df_features[feature_names].values
+    y = df_features['target'].values
+    dates = df_features['date'].values
+
+    folds = list(iter_folds(len(X), int(options['train_window']), int(options['test_window']),
+                            options.get('step'), bool(options['expanding'])))
+    if not folds:
+        raise ValueError(f"Not enough data for walk-forward: {len(X)} rows, "
+                         f"train_window={options['train_window']}")
+
+    print(f"Samples: {len(X)}, features: {len(feature_names)}, folds: {len(folds)}")
+
+    params = booster_params(hyperparameters, n_jobs)
+
+    reference = None
+    booster = None
+    fold_results = []
+    oos_true, oos_pred, oos_proba = [], [], []
+    started = time.time()
+
+    for fold, (train_start, test_start, test_end) in enumerate(folds):
+        warm = booster is not None and fold % retrain_every != 0
+        fold_started = time.time()
+
+        if not warm:
+            # Cuts from the past only; warm folds keep them until the next retrain
+            reference = get_quantile_dmatrix(X[:test_start], y[:test_start], feature_names, n_jobs=n_jobs)
+
+        if train_start == 0 and not warm:
+            dtrain = reference
+        else:
+            dtrain = get_quantile_dmatrix(X[train_start:test_start], y[train_start:test_start],
+                                          feature_names, ref=reference, n_jobs=n_jobs)
+
+        if warm:
+            booster = xgb.train(params, dtrain, num_boost_round=warm_start_rounds, xgb_model=booster)
+        else:
+            booster = xgb.train(params, dtrain, num_boost_round=n_estimators)
+
+        fit_seconds = time.time() - fold_started
+
+        proba = booster.inplace_predict(X[test_start:test_end])
+        pred = (proba > 0.5).astype(int)
+        y_test = y[test_start:test_end]
+
+        metrics = calculate_metrics(y_test, pred, proba)
+        fold_results.append({
+            'fold': fold,
+            'warm_started': warm,
+            'num_trees': int(booster.num_boosted_rounds()),
+            'train_start': str(dates[train_start])[:10],
+            'train_end': str(dates[test_start - 1])[:10],
+            'test_start': str(dates[test_start])[:10],
+            'test_end': str(dates[test_end - 1])[:10],
+            'train_size': int(test_start - train_start),
+            'test_size': int(test_end - test_start),
+            'fit_seconds': round(fit_seconds, 4),
+            **metrics,
+        })
+
+        oos_true.append(y_test)
+        oos_pred.append(pred)
+        oos_proba.append(proba)
+
+        print(f"Fold {fold:3d} {fold_results[-1]['test_start']}..{fold_results[-1]['test_end']} "
+              f"{'warm ' if warm else 'fresh'} trees={fold_results[-1]['num_trees']:4d} "
+              f"accuracy={metrics['accuracy']:.4f}")
+
+    elapsed = time.time() - started
+    out_of_sample = calculate_metrics(np.concatenate(oos_true), np.concatenate(oos_pred),
+                                      np.concatenate(oos_proba))
+
+    print(f"\nOut-of-sample accuracy: {out_of_sample['accuracy']*100:.2f}% over {len(folds)} folds "
+          f"({elapsed:.1f}s)")
+
+    return {
+        'success': True,
+        'stock_symbol': stock_symbol,
+        'evaluated_at': datetime.now().isoformat(),
+        'walk_forward': options,
+        'hyperparameters': hyperparameters,
+        'num_features': len(feature_names),
+        'folds': fold_results,
+        'aggregate': {
+            'num_folds': len(folds),
+            'warm_started_folds': int(sum(fold['warm_started'] for fold in fold_results)),
+            'total_fit_seconds': round(sum(fold['fit_seconds'] for fold in fold_results), 4),
+            'elapsed_seconds': round(elapsed, 4),
+            'out_of_sample': out_of_sample,
+            'per_fold': _aggregate(fold_results),
+        },
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python walk_forward.py STOCK_SYMBOL [CONFIG_JSON]")
+        print("Example: python walk_forward.py AAPL '{\"walk_forward\": {\"train_window\": 252}}'")
+        sys.exit(1)
+
+    stock_symbol = sys.argv[1]
+    config = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+
+    try:
+        results = walk_forward(stock_symbol, config)
+    except Exception as e:
+        print(f"\n❌ ERROR during walk-forward validation: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        results = {'success': False, 'error': str(e), 'stock_symbol': stock_symbol}
+
+    print("\n" + "="*60)
+    print("RESULTS (JSON)")
+    print("="*60)
+    print(json.dumps(results, indent=2, default=str))
+
+    sys.exit(0 if results.get('success', False) else 1)
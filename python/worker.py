@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Persistent worker daemon for training, backtesting and prediction
+
+Starting a fresh interpreter for every Laravel call pays for importing
+pandas, xgboost and sklearn and for reloading the model each time. The
+worker imports everything once and keeps recently used models in memory
+(model_cache.py).
+
+Requests and responses are single-line JSON objects:
+
+    {"id": 1, "op": "train", "symbol": "AAPL", "config": {...}}
+    {"id": 2, "op": "backtest", "symbol": "AAPL", "initial_capital": 10000,
+     "start_date": "2024-01-01", "end_date": "2024-06-30"}
+    {"id": 3, "op": "predict", "symbol": "AAPL", "limit": 1}
+    {"id": 4, "op": "ping"}  /  {"op": "stats"}  /  {"op": "shutdown"}
+
+Each response is the dict the matching script would print (train_model.py,
+backtest.py) plus the request id.
+
+Usage:
+    python worker.py serve [--socket PATH] [--workers N]   Unix socket, pool of N processes
+    python worker.py stdio                                 JSON lines on stdin/stdout
+    python worker.py request '{"op": "predict", ...}'      one-shot, prints the response
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socketserver
+import sys
+import threading
+import time
+import zlib
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict
+
+import config
+import backtest
+import model_cache
+from train_model import train_model
+from utils import handle_error, split_threads
+
+logger = logging.getLogger(__name__)
+
+
+def handle_request(request: Dict, n_jobs: int = -1) -> Dict:
+    """
+    Run one operation and return its JSON-serializable response
+
+    Script output (progress prints) goes to stderr so it never mixes with
+    the JSON protocol on stdout.
+
+    Args:
+        request: Request object (see module docstring)
+        n_jobs: XGBoost threads for training (-1 = all cores; pool
+            processes get their share of the cores)
+    """
+    op = request.get('op')
+    started = time.time()
+
+    try:
+        with redirect_stdout(sys.stderr):
+            if op == 'ping':
+                response = {'success': True}
+            elif op == 'stats':
+                response = {'success': True, 'model_cache': model_cache.get_cache_stats()}
+            elif op == 'train':
+                response = train_model(request['symbol'], json.dumps(request.get('config', {})), n_jobs=n_jobs)
+            elif op == 'backtest':
+                response = backtest.main(
+                    request['symbol'],
+                    float(request.get('initial_capital', 10000.0)),
+                    request.get('start_date'),
+                    request.get('end_date'),
+                )
+            elif op == 'predict':
+                response = backtest.predict(
+                    request['symbol'],
+                    int(request.get('limit', 1)),
+                    request.get('start_date'),
+                    request.get('end_date'),
+                )
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+    except Exception as e:
+        response = handle_error(e, "WORKER_ERROR")
+
+    response['id'] = request.get('id')
+    response['worker_pid'] = os.getpid()
+    response['elapsed_seconds'] = round(time.time() - started, 4)
+    return response
+
+
+def _encode(response: Dict) -> bytes:
+    return (json.dumps(response, default=str) + '\n').encode()
+
+
+def _worker_main(conn, n_jobs: int) -> None:
+    """
+    Pool process: answer requests from the pipe until it is closed
+    """
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        conn.send(handle_request(request, n_jobs))
+
+
+class WorkerPool:
+    """
+    N persistent worker processes
+
+    Requests for a symbol always go to the same worker, so that worker's
+    model cache stays warm for it; each worker handles one request at a
+    time and dead workers are restarted. The pool is capped at the core
+    count and each worker trains with its share of the cores, so
+    concurrent trainings don't oversubscribe the box.
+    """
+
+    def __init__(self, size: int = config.WORKER_POOL_SIZE):
+        self.size, self.n_jobs = split_threads(max(1, size))
+        self.context = multiprocessing.get_context()
+        self.workers = [self._spawn() for _ in range(self.size)]
+        self.locks = [threading.Lock() for _ in range(self.size)]
+        self.next_worker = 0
+
+    def _spawn(self):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child_conn, self.n_jobs), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _pick(self, request: Dict) -> int:
+        symbol = request.get('symbol')
+        if symbol:
+            return zlib.crc32(str(symbol).encode()) % self.size
+        self.next_worker = (self.next_worker + 1) % self.size
+        return self.next_worker
+
+    def submit(self, request: Dict) -> Dict:
+        index = self._pick(request)
+        with self.locks[index]:
+            process, conn = self.workers[index]
+            try:
+                conn.send(request)
+                return conn.recv()
+            except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+                logger.error(f"Worker {process.pid} died, restarting: {e}")
+                self.workers[index] = self._spawn()
+                response = handle_error(RuntimeError(f"Worker process exited: {e}"), "WORKER_ERROR")
+                response['id'] = request.get('id')
+                return response
+
+    def stats(self) -> Dict:
+        stats = {'workers': []}
+        for index in range(self.size):
+            response = self._submit_to(index, {'op': 'stats'})
+            stats['workers'].append({'pid': response.get('worker_pid'), 'model_cache': response.get('model_cache')})
+        return stats
+
+    def _submit_to(self, index: int, request: Dict) -> Dict:
+        with self.locks[index]:
+            _, conn = self.workers[index]
+            conn.send(request)
+            return conn.recv()
+
+    def close(self) -> None:
+        for process, conn in self.workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    One client connection: any number of JSON-line requests
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.wfile.write(_encode(handle_error(e, "INVALID_REQUEST")))
+                continue
+
+            op = request.get('op')
+            if op == 'shutdown':
+                self.wfile.write(_encode({'success': True, 'id': request.get('id')}))
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            if op == 'stats':
+                response = {'success': True, 'id': request.get('id'), **self.server.pool.stats()}
+            else:
+                response = self.server.pool.submit(request)
+            self.wfile.write(_encode(response))
+
+
+class _WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(socket_path: Path, workers: int) -> None:
+    """
+    Serve JSON-line requests on a Unix socket with a pool of worker processes
+    """
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        socket_path.unlink()
+
+    pool = WorkerPool(workers)
+    server = _WorkerServer(str(socket_path), _RequestHandler)
+    server.pool = pool
+    os.chmod(socket_path, 0o660)
+
+    logger.info(f"Worker listening on {socket_path} with {pool.size} processes x {pool.n_jobs} threads")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.close()
+        if socket_path.exists():
+            socket_path.unlink()
+
+
+def serve_stdio() -> None:
+    """
+    Serve JSON-line requests on stdin/stdout in this process
+    """
+    out = sys.stdout.buffer
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            out.write(_encode(handle_error(e, "INVALID_REQUEST")))
+            out.flush()
+            continue
+        if request.get('op') == 'shutdown':
+            out.write(_encode({'success': True, 'id': request.get('id')}))
+            out.flush()
+            break
+        out.write(_encode(handle_request(request)))
+        out.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Persistent worker for train/backtest/predict requests')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='Serve on a Unix socket')
+    serve_parser.add_argument('--socket', default=str(config.WORKER_SOCKET_PATH))
+    serve_parser.add_argument('--workers', type=int, default=config.WORKER_POOL_SIZE)
+
+    subparsers.add_parser('stdio', help='Serve JSON lines on stdin/stdout')
+
+    request_parser = subparsers.add_parser('request', help='Run a single request and print the response')
+    request_parser.add_argument('request_json')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve_socket(Path(args.socket), args.workers)
+    elif args.command == 'stdio':
+        serve_stdio()
+    else:
+        response = handle_request(json.loads(args.request_json))
+        print(json.dumps(response, indent=2, default=str))
+        sys.exit(0 if response.get('success', False) else 1)